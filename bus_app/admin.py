@@ -1,51 +1,124 @@
 from django.contrib import admin
-from django.urls import reverse
+from django.contrib.admin import helpers
+from django.urls import path, reverse
+from django.shortcuts import render
+from django.template.response import TemplateResponse
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
 from django.utils.html import format_html
 from django import forms
 from django.core.exceptions import ValidationError
-from django.http import HttpResponse
+from django.http import FileResponse, StreamingHttpResponse
+from django.contrib import messages
+from django.db.models import Count, OuterRef, Prefetch, Subquery
+from django.utils import timezone
 from .forms import AllotmentForm
-from .models import Bus, Student, Seat, Driver, School, Route, Allotment, Notice, Program, Stoppage, Feedback
+from .models import Bus, Student, Seat, Driver, School, Route, Allotment, Notice, Program, Stoppage, Feedback, OutboxBatch
+from .views import send_seat_allotment_email
+from .seating import assign_seat_to_student, bulk_seat_changes, occupied_seats_beyond, provision_seats, release_seat
+from .importer import ImportFileError, import_students, read_rows
+from .allocation import AllocationConflict, allocate_seats
+from .photos import photo_pool
+from .qr_sheets import bus_cards, qr_codes_zip, qr_sheet_pdf
+from .seat_charts import warm_seat_charts
+from collections import Counter
+import csv
+import io
 import openpyxl
-from io import BytesIO
+import tempfile
+
+# ✅ Feedback Admin
+@admin.register(Feedback)
+class FeedbackAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'submitted_at')
+    list_select_related = ('bus',)
+
+# ✅ Label exported for a foreign key column (joined in the same query, no __str__ lookups per row)
+EXPORT_FK_LABELS = {
+    'Bus': 'number',
+    'Seat': 'seat_number',
+    'Student': 'name',
+    'School': 'name',
+    'Route': 'name',
+    'Driver': 'name',
+    'Program': 'name',
+    'Stoppage': 'name',
+}
+EXPORT_CHUNK_SIZE = 2000
+
+
+def export_rows(queryset):
+    """Header row, then one row of strings per object, read in chunks from a single values_list query."""
+    headers, lookups = [], []
+    for field in queryset.model._meta.fields:
+        headers.append(field.name)
+        if field.is_relation:
+            lookups.append(f"{field.name}__{EXPORT_FK_LABELS.get(field.related_model.__name__, 'pk')}")
+        else:
+            lookups.append(field.attname)
+
+    yield headers
+    rows = queryset.order_by('pk').values_list(*lookups).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    for values in rows:
+        yield [str(value) if value is not None else "" for value in values]
 
-admin.site.register(Feedback)
 
 def export_to_excel(modeladmin, request, queryset):
-    model = queryset.model
-    meta = model._meta
-    field_names = [field.name for field in meta.fields]
-
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = meta.verbose_name_plural.title()
-    ws.append(field_names)
-
-    for obj in queryset:
-        row = []
-        for field in field_names:
-            value = getattr(obj, field)
-            row.append(str(value) if value is not None else "")
+    meta = queryset.model._meta
+
+    # ✅ Write-only workbook, rows go straight to disk instead of being held in memory
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet(title=meta.verbose_name_plural.title()[:31])
+    for row in export_rows(queryset):
         ws.append(row)
 
-    # ✅ Save workbook to in-memory buffer
-    output = BytesIO()
+    output = tempfile.TemporaryFile()
     wb.save(output)
     output.seek(0)
 
     filename = f"{meta.model_name}_backup.xlsx"
-    response = HttpResponse(
+    return FileResponse(
         output,
+        as_attachment=True,
+        filename=filename,
         content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
     )
-    response['Content-Disposition'] = f'attachment; filename={filename}'
+export_to_excel.short_description = "Export selected to Excel"
+
+
+class Echo:
+    """File-like object whose write() just returns the line, for streaming csv.writer output."""
+    def write(self, value):
+        return value
+
+
+def export_to_csv(modeladmin, request, queryset):
+    writer = csv.writer(Echo())
+    response = StreamingHttpResponse(
+        (writer.writerow(row) for row in export_rows(queryset)),
+        content_type='text/csv'
+    )
+    response['Content-Disposition'] = f'attachment; filename={queryset.model._meta.model_name}_backup.csv'
     return response
+export_to_csv.short_description = "Export selected to CSV"
+
 
 
+# ✅ Program Admin
+@admin.register(Program)
+class ProgramAdmin(admin.ModelAdmin):
+    list_display = ('name', 'school')
+    list_filter = ('school',)
+    search_fields = ('name',)
+    list_select_related = ('school',)  # __str__ me school.name
 
-# ✅ Register Models
-admin.site.register(Program)
-admin.site.register(Stoppage)
+# ✅ Stoppage Admin
+@admin.register(Stoppage)
+class StoppageAdmin(admin.ModelAdmin):
+    list_display = ('name', 'route')
+    list_filter = ('route',)
+    search_fields = ('name',)
+    list_select_related = ('route',)  # __str__ me route.name
 
 # ✅ School Admin
 @admin.register(School)
@@ -60,18 +133,62 @@ class SchoolAdmin(admin.ModelAdmin):
 class RouteAdmin(admin.ModelAdmin):
     list_display = ('name', 'get_stoppages', 'fare')
     search_fields = ('name',)
+    actions = ['allocate_route_seats']
+
+    def get_queryset(self, request):
+        # Poore page ke stoppages ek prefetch query me; count se column sortable
+        return super().get_queryset(request).annotate(stoppage_count=Count('stoppages')).prefetch_related(
+            Prefetch('stoppages', queryset=Stoppage.objects.only('id', 'name', 'route_id').order_by('id'))
+        )
+
     def get_stoppages(self, obj):
         return ", ".join(stoppage.name for stoppage in obj.stoppages.all())
+    get_stoppages.short_description = "Stoppages"
+    get_stoppages.admin_order_field = "stoppage_count"
+
+    @admin.action(description="Allocate seats to unseated students")
+    def allocate_route_seats(self, request, queryset):
+        # Pehle preview (dry run), "Allocate" dabane par wahi routes dobara apply
+        group_gender = bool(request.POST.get('group_gender'))
+        apply = 'apply' in request.POST
+        try:
+            plan = allocate_seats(queryset, group_gender=group_gender, dry_run=not apply,
+                                  send_emails=bool(request.POST.get('send_emails')))
+        except AllocationConflict as e:
+            messages.error(request, str(e))
+            return None
+        summary = plan.summary()
+        if apply:
+            messages.success(request, f"{summary['placed']} students seated, {summary['unplaced']} could not be placed. "
+                                      f"Utilization {summary['utilization_before']}% -> {summary['utilization_after']}%.")
+            return None
+
+        return TemplateResponse(request, 'admin/allocate_seats.html', {
+            **self.admin_site.each_context(request),
+            'title': 'Allocate seats',
+            'opts': self.model._meta,
+            'routes': queryset,
+            'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+            'group_gender': group_gender,
+            'summary': summary,
+            'bus_rows': plan.bus_stats(),
+            'unplaced': Counter(reason for _, reason in plan.unplaced).most_common(),
+        })
 
 # ✅ Driver Admin
 class DriverAdmin(admin.ModelAdmin):
     list_display = ('name', 'contact_number', 'bus_assigned')
-    actions = [export_to_excel]
+    actions = [export_to_excel, export_to_csv]
+
+    def get_queryset(self, request):
+        # Latest allotment ki bus number ek subquery column, per-row lookup nahi
+        latest = Allotment.objects.filter(driver=OuterRef('pk')).order_by('-assigned_date', '-pk')
+        return super().get_queryset(request).annotate(bus_number=Subquery(latest.values('bus__number')[:1]))
 
     def bus_assigned(self, obj):
-        allotment = Allotment.objects.filter(driver=obj).first()
-        return allotment.bus.number if allotment else "No Bus Assigned"
+        return obj.bus_number or "No Bus Assigned"
     bus_assigned.short_description = "Assigned Bus"
+    bus_assigned.admin_order_field = "bus_number"
 
 admin.site.register(Driver, DriverAdmin)
 
@@ -80,41 +197,73 @@ class BusAdmin(admin.ModelAdmin):
     list_display = ('number', 'identifier_number', 'get_route', 'pollution_paid', 'insurance_paid', 'tax_paid', 'permit', 'seating_chart_button')
     list_filter = ('pollution_paid', 'insurance_paid', 'tax_paid', 'permit')
     search_fields = ('number', 'identifier_number')
-    actions = [export_to_excel]
+    list_select_related = ('current_route',)
+    actions = [export_to_excel, export_to_csv, 'feedback_qr_sheet', 'feedback_qr_zip', 'refresh_seating_charts']
 
     def get_route(self, obj):
-        allotment = Allotment.objects.filter(bus=obj).first()
-        return allotment.route.name if allotment and allotment.route else "No Route"
+        return obj.current_route.name if obj.current_route else "No Route"
     get_route.short_description = "Route"
-    get_route.admin_order_field = "route"
+    get_route.admin_order_field = "current_route__name"
 
     def seating_chart_button(self, obj):
         url = reverse('bus_seating_chart', kwargs={'bus_number': obj.number})
         return format_html('<a class="button" href="{}" target="_blank">View Seating Chart</a>', url)
     seating_chart_button.short_description = "Seating Chart"
 
+    # ✅ Printable feedback QR codes (bus_app/qr_sheets.py), rendered in the shared photo pool
+    def _qr_download(self, request, queryset, write, filename, content_type):
+        cards = bus_cards(queryset.values_list('pk', flat=True))
+        if not cards:
+            self.message_user(request, "None of the selected buses has an identifier number.", messages.WARNING)
+            return None
+        output = tempfile.TemporaryFile()
+        # Har request pe naya ProcessPoolExecutor nahi; PHOTO_WORKERS=0 ho to inline
+        write(cards, output, pool=photo_pool())
+        output.seek(0)
+        return FileResponse(output, as_attachment=True, filename=filename, content_type=content_type)
+
+    @admin.action(description="Download feedback QR sheet (PDF)")
+    def feedback_qr_sheet(self, request, queryset):
+        return self._qr_download(request, queryset, qr_sheet_pdf, 'bus_feedback_qr.pdf', 'application/pdf')
+
+    @admin.action(description="Download feedback QR codes (ZIP of PNGs)")
+    def feedback_qr_zip(self, request, queryset):
+        return self._qr_download(request, queryset, qr_codes_zip, 'bus_feedback_qr.zip', 'application/zip')
+
+    @admin.action(description="Refresh seating charts")
+    def refresh_seating_charts(self, request, queryset):
+        # Isi process ke cache me, batches me pause ke saath (purane version wale grid apne aap expire)
+        written = warm_seat_charts(list(queryset.order_by('pk').values_list('pk', flat=True)))
+        self.message_user(request, f"✅ {written} seating chart(s) refreshed.", messages.SUCCESS)
+
 admin.site.register(Bus, BusAdmin)
 
 # ✅ Student Form
 class StudentForm(forms.ModelForm):
-    program = forms.ChoiceField(label="Select Program", required=False)
-    stoppage = forms.ChoiceField(label="Select Stoppage", required=False)
-
     class Meta:
         model = Student
         fields = ['name', 'roll_number', 'crm_id', 'school', 'program', 'fee_paid', 'fee_amount',
                   'email', 'contact_number', 'route', 'gender', 'assigned_bus', 'assigned_seat', 'stoppage', 'photo']
+        labels = {'program': "Select Program", 'stoppage': "Select Stoppage"}
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        if self.instance and self.instance.school:
-            self.fields['program'].choices = [(program.name, program.name) for program in self.instance.school.programs.all()]
-        else:
-            self.fields['program'].choices = []
-        if self.instance and self.instance.route and self.instance.route.stoppages.exists():
-            self.fields['stoppage'].choices = [(stop.id, stop.name) for stop in self.instance.route.stoppages.all()]
-        else:
-            self.fields['stoppage'].choices = []
+        self.fields['assigned_bus'].queryset = Bus.objects.select_related('current_route')
+        self.fields['assigned_seat'].queryset = Seat.objects.select_related('bus__current_route')
+        # Sirf chuni hui school ke programs / route ke stoppages (POST me nayi school bhi ho sakti hai)
+        school_id = self.data.get(self.add_prefix('school')) if self.is_bound else self.instance.school_id
+        route_id = self.data.get(self.add_prefix('route')) if self.is_bound else self.instance.route_id
+        self.fields['program'].queryset = Program.objects.filter(school_id=school_id).select_related('school') \
+            if school_id else Program.objects.none()
+        self.fields['stoppage'].queryset = Stoppage.objects.filter(route_id=route_id).select_related('route') \
+            if route_id else Stoppage.objects.none()
+        self.fields['program'].label_from_instance = lambda program: program.name
+        self.fields['stoppage'].label_from_instance = lambda stoppage: stoppage.name
+
+class StudentImportForm(forms.Form):
+    file = forms.FileField(help_text="Excel (.xlsx) or CSV with a header row: name, roll_number, crm_id, gender, school, "
+                                     "program, fee_paid, fee_amount, email, contact_number, route, stoppage")
+    dry_run = forms.BooleanField(required=False, help_text="Only validate, save nothing.")
 
 # ✅ Student Admin
 class StudentAdmin(admin.ModelAdmin):
@@ -123,11 +272,13 @@ class StudentAdmin(admin.ModelAdmin):
                     'fee_amount', 'email', 'contact_number', 'gender', 'route', 'stoppage', 'allot_bus_link')
     list_filter = ('route', 'school', 'program', 'fee_paid', 'gender')
     search_fields = ('roll_number', 'crm_id')
-    actions = [export_to_excel]
+    list_select_related = ('school', 'route', 'program__school', 'stoppage__route')
+    actions = [export_to_excel, export_to_csv]
 
     def photo_preview(self, obj):
         if obj.photo:
-            return format_html('<img src="{}" width="50" height="50" style="border-radius: 5px;"/>', obj.photo.url)
+            return format_html('<img src="{}" width="50" height="50" loading="lazy" style="border-radius: 5px; object-fit: cover;"/>',
+                               obj.photo_thumbnail_url())
         return "No Photo"
     photo_preview.short_description = "Photo"
 
@@ -136,37 +287,115 @@ class StudentAdmin(admin.ModelAdmin):
         return format_html('<a href="{}" class="button">Allot Bus</a>', url)
     allot_bus_link.short_description = "Allot Bus"
 
+    # ✅ Spreadsheet import (changelist "Import students" button)
+    def get_urls(self):
+        return [
+            path('import/', self.admin_site.admin_view(self.import_students_view), name='bus_app_student_import'),
+        ] + super().get_urls()
+
+    def import_students_view(self, request):
+        form = StudentImportForm(request.POST or None, request.FILES or None)
+        result = report_url = None
+        if request.method == 'POST' and form.is_valid():
+            upload = form.cleaned_data['file']
+            try:
+                result = import_students(read_rows(upload, upload.name), dry_run=form.cleaned_data['dry_run'])
+            except ImportFileError as e:
+                form.add_error('file', str(e))
+            else:
+                if result.errors:
+                    report = io.StringIO()
+                    result.write_error_report(report)
+                    report_name = default_storage.save(
+                        f"import_reports/students-{timezone.now():%Y%m%d-%H%M%S}.csv", ContentFile(report.getvalue().encode())
+                    )
+                    report_url = default_storage.url(report_name)
+                verb = "can be imported" if form.cleaned_data['dry_run'] else "imported"
+                messages.success(request, f"{result.created} of {result.rows} students {verb}, {len(result.errors)} rejected.")
+
+        return render(request, 'admin/import_students.html', {
+            **self.admin_site.each_context(request),
+            'title': 'Import students',
+            'opts': self.model._meta,
+            'form': form,
+            'result': result,
+            'errors': result.errors[:200] if result else [],
+            'report_url': report_url,
+        })
+
 admin.site.register(Student, StudentAdmin)
 
 # ✅ Seat Admin
 class SeatAdminForm(forms.ModelForm):
-    seat_count = forms.IntegerField(required=False, help_text="Enter number of seats to create")
+    seat_count = forms.IntegerField(required=False, min_value=1,
+                                    help_text="Set the bus to exactly this many seats (missing seats are added, extra vacant seats removed)")
     class Meta:
         model = Seat
         fields = ["seat_number", "bus", "student", "seat_count"]
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Form kholte waqt ka occupant POST me wapas aaye, taaki claim usi ke against ho
+        self.fields["student"].show_hidden_initial = True
+    def shown_student_id(self):
+        """Occupant the clerk saw when the form was opened (None for a vacant seat)."""
+        if self.add_initial_prefix("student") not in self.data:
+            return self.initial.get("student")  # Browser ke bina POST: abhi ka occupant
+        value = self["student"].field.hidden_widget().value_from_datadict(self.data, self.files, self.add_initial_prefix("student"))
+        return int(value) if value and str(value).isdigit() else None
+    def clean(self):
+        cleaned_data = super().clean()
+        seat_count = cleaned_data.get("seat_count")
+        bus = cleaned_data.get("bus")
+        if seat_count and bus and occupied_seats_beyond([bus], seat_count).exists():
+            raise ValidationError("Some seats above this count are occupied. Free them before shrinking the bus.")
+        return cleaned_data
     def save(self, commit=True):
-        seat_count = self.cleaned_data.get("seat_count", 1)
+        seat_count = self.cleaned_data.get("seat_count")
         bus = self.cleaned_data.get("bus")
         if seat_count and bus:
-            for i in range(1, seat_count + 1):
-                Seat.objects.create(seat_number=i, bus=bus)
-        return self.instance
+            provision_seats([bus], seat_count)  # ✅ One bulk_create for the whole bus
+            return self.instance
+        return super().save(commit=commit)
     def save_m2m(self):
         pass
 
 class SeatAdmin(admin.ModelAdmin):
     form = SeatAdminForm
     list_display = ("seat_number", "bus", "get_route", "student")
+    list_select_related = ("bus__current_route", "student")
     fields = ["seat_number", "bus", "student", "seat_count"]
 
     def save_model(self, request, obj, form, change):
         if form.cleaned_data.get("seat_count"):
             return
-        super().save_model(request, obj, form, change)
+        if "student" not in form.changed_data:
+            super().save_model(request, obj, form, change)
+            return
+
+        # ✅ Occupant change goes through the same race-free path as assign_seat
+        new_student = obj.student
+        previous_student_id = form.shown_student_id()
+        with bulk_seat_changes():
+            obj.student_id = previous_student_id
+            other_fields = [field for field in form.changed_data if field != "student"]
+            if not change:
+                super().save_model(request, obj, form, change)
+            elif other_fields:
+                # student column ko save() se mat likho, warna beech me aaya occupant overwrite ho jaata
+                obj.save(update_fields=other_fields)
+            if not new_student:
+                if previous_student_id and not release_seat(obj, previous_student_id):
+                    messages.error(request, f"Seat {obj.seat_number} changed meanwhile and was not freed.")
+            # Pehle claim (form me dikha occupant hi abhi bhi ho tab), release sirf jeetne par
+            elif assign_seat_to_student(new_student, obj, replacing=previous_student_id):
+                send_seat_allotment_email(new_student, obj)
+            else:
+                messages.error(request, f"Seat {obj.seat_number} was taken by someone else meanwhile, {new_student} was not assigned.")
 
     def get_route(self, obj):
         return obj.get_route()
     get_route.short_description = 'Route'
+    get_route.admin_order_field = 'bus__current_route__name'
 
 admin.site.register(Seat, SeatAdmin)
 
@@ -175,8 +404,9 @@ class AllotmentAdmin(admin.ModelAdmin):
     form = AllotmentForm
     list_display = ("bus", "driver", "route", "assigned_date")
     search_fields = ("bus__number", "driver__name", "route__name")
+    list_select_related = ("bus__current_route", "driver", "route")
     filter_horizontal = ("stoppages",)
-    actions = [export_to_excel]
+    actions = [export_to_excel, export_to_csv]
 
     class Media:
         js = ("admin/js/allotment.js",)
@@ -187,7 +417,22 @@ admin.site.register(Allotment, AllotmentAdmin)
 @admin.register(Notice)
 class NoticeAdmin(admin.ModelAdmin):
     list_display = ('type', 'bus', 'route', 'created_at')
+    list_select_related = ('bus__current_route', 'route')
     def save_model(self, request, obj, form, change):
         super().save_model(request, obj, form, change)
         if hasattr(obj, 'send_notice'):
-            obj.send_notice()
+            obj.send_notice()  # ✅ Sirf queue hota hai, send_outbox worker bhejega
+
+# ✅ Outbox Admin
+@admin.register(OutboxBatch)
+class OutboxBatchAdmin(admin.ModelAdmin):
+    list_display = ('message', 'recipient_count', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status',)
+    list_select_related = ('message',)
+    readonly_fields = ('message', 'recipients', 'recipient_count', 'attempts', 'sent_at', 'last_error')
+    actions = ['retry_now']
+
+    @admin.action(description="Retry selected batches now")
+    def retry_now(self, request, queryset):
+        count = queryset.exclude(status='sent').update(status='pending', attempts=0, next_attempt_at=timezone.now())
+        messages.success(request, f"{count} batch(es) queued for retry.")
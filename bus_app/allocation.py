@@ -0,0 +1,250 @@
+import heapq
+
+from django.db import connection
+from django.db.models import F
+
+from .models import Allotment, Route, Seat, Stoppage, Student
+from .outbox import queue_seat_allotment_emails
+from .reports import mark_report_dirty
+from .seating import bulk_seat_changes
+
+# ✅ Batch seat allocation: every unseated student of a route gets a bus and a seat in one pass.
+# Students are only put on buses whose current Allotment stops at their stoppage.
+GENDER_ORDER = {"Female": 0, "Male": 1, "Other": 2}
+
+
+class AllocationConflict(Exception):
+    """Seats or students changed between planning and writing; nothing was saved."""
+
+
+class BusPlan:
+    def __init__(self, allotment, stoppage_ids):
+        self.bus = allotment.bus
+        self.route = allotment.route
+        self.stoppage_ids = stoppage_ids  # Empty: allotment me stoppages nahi chune, poora route
+        self.vacant = []
+        self.free = 0
+        self.students = []
+        self.placements = []
+
+    def serves(self, stoppage_id):
+        return stoppage_id is None or not self.stoppage_ids or stoppage_id in self.stoppage_ids
+
+    def place(self, student):
+        self.students.append(student)
+        self.free -= 1
+
+    def stats(self):
+        occupied = self.bus.seats_total - len(self.vacant)
+        after = occupied + len(self.placements)
+        return {
+            "bus": self.bus.number,
+            "route": self.route.name,
+            "seats_total": self.bus.seats_total,
+            "occupied_before": occupied,
+            "placed": len(self.placements),
+            "occupied_after": after,
+            "utilization": round(after * 100 / self.bus.seats_total, 1) if self.bus.seats_total else 0.0,
+        }
+
+
+class EligibleBuses:
+    """Max-heap of BusPlans by free seats. Several heaps share buses, so stale entries are fixed when they surface."""
+
+    def __init__(self, buses):
+        self.heap = [(-bus.free, bus.bus.number, bus) for bus in buses]
+        heapq.heapify(self.heap)
+
+    def emptiest(self):
+        while self.heap:
+            free, number, bus = self.heap[0]
+            if bus.free <= 0:
+                heapq.heappop(self.heap)
+            elif -free != bus.free:
+                heapq.heapreplace(self.heap, (-bus.free, number, bus))
+            else:
+                return bus
+        return None
+
+
+class AllocationPlan:
+    """Result of plan_allocation(): (student, seat) placements per bus plus the students that did not fit."""
+
+    def __init__(self, routes, buses, students, group_gender):
+        self.routes = routes
+        self.buses = buses
+        self.students = students
+        self.group_gender = group_gender
+        self.unplaced = []  # (student, reason)
+
+    def placements(self):
+        return [placement for bus in self.buses for placement in bus.placements]
+
+    def bus_stats(self):
+        return [bus.stats() for bus in self.buses]
+
+    def summary(self):
+        rows = self.bus_stats()
+        seats_total = sum(row["seats_total"] for row in rows)
+        before = sum(row["occupied_before"] for row in rows)
+        after = sum(row["occupied_after"] for row in rows)
+        return {
+            "routes": len(self.routes),
+            "buses": len(rows),
+            "students": len(self.students),
+            "placed": after - before,
+            "unplaced": len(self.unplaced),
+            "seats_total": seats_total,
+            "occupied_before": before,
+            "occupied_after": after,
+            "utilization_before": round(before * 100 / seats_total, 1) if seats_total else 0.0,
+            "utilization_after": round(after * 100 / seats_total, 1) if seats_total else 0.0,
+        }
+
+
+def stoppage_names(routes):
+    """Stoppage id -> name for the stoppages of `routes` (only needed for the unplaced messages)."""
+    return dict(Stoppage.objects.filter(route__in=routes).values_list("pk", "name"))
+
+
+def current_bus_plans(routes):
+    """One BusPlan per bus whose latest Allotment is on one of `routes`, with its vacant seats in seat order."""
+    allotments = (
+        Allotment.objects.filter(route__in=routes, bus__current_route=F("route"))
+        .select_related("bus__current_route", "route")
+        .prefetch_related("stoppages")
+        .order_by("bus__number", "-assigned_date", "-pk")
+    )
+    buses = {}
+    for allotment in allotments:
+        if allotment.bus_id not in buses:  # Sirf latest allotment ginti me
+            buses[allotment.bus_id] = BusPlan(allotment, {stoppage.pk for stoppage in allotment.stoppages.all()})
+
+    seats = Seat.objects.filter(bus_id__in=buses, student__isnull=True).order_by("bus_id", "seat_number")
+    for seat in seats.only("id", "bus_id", "seat_number"):
+        bus = buses[seat.bus_id]
+        seat.bus = bus.bus  # Email template bus/route padhta hai, dobara query nahi
+        bus.vacant.append(seat)
+        bus.free += 1
+    return list(buses.values())
+
+
+def plan_allocation(routes=None, group_gender=False):
+    """
+    Decide a bus and seat for every unseated student on `routes` (all routes when
+    None) without writing anything.
+
+    Students whose stoppage is served by the fewest buses are placed first, each
+    on the eligible bus with the most free seats (their current assigned_bus if it
+    still has room). Inside a bus the seats are filled in seat order, grouped by
+    stoppage, and by gender first when `group_gender` is set so every gender sits
+    in one contiguous block.
+    """
+    routes = list(Route.objects.all() if routes is None else routes)
+    buses = current_bus_plans(routes)
+    stoppages = stoppage_names(routes)
+    students = list(
+        Student.objects.filter(route__in=routes, assigned_seat__isnull=True, seats__isnull=True)
+        .only("id", "name", "email", "gender", "route_id", "stoppage_id", "assigned_bus_id")
+        .order_by("pk")
+    )
+    plan = AllocationPlan(routes, buses, students, group_gender)
+    route_names = {route.pk: route.name for route in routes}
+
+    buses_by_route = {}
+    for bus in buses:
+        buses_by_route.setdefault(bus.route.pk, []).append(bus)
+
+    # Same route + stoppage wale students ke eligible buses ek hi baar nikalo
+    groups = {}
+    for student in students:
+        stoppage_id = student.stoppage_id
+        group = groups.get((student.route_id, stoppage_id))
+        if group is None:
+            route_buses = buses_by_route.get(student.route_id, [])
+            eligible = {bus.bus.pk: bus for bus in route_buses if bus.serves(stoppage_id)}
+            group = groups[student.route_id, stoppage_id] = (route_buses, eligible, EligibleBuses(eligible.values()))
+        route_buses, eligible, heap = group
+        if not route_buses:
+            plan.unplaced.append((student, f"No bus is allotted to route {route_names[student.route_id]}."))
+        elif not eligible:
+            plan.unplaced.append((student, f"No bus on route {route_names[student.route_id]} stops at {stoppages.get(stoppage_id, stoppage_id)}."))
+
+    # Kam option wale pehle, taaki unki bus dusre na bhar dein
+    placeable = [student for student in students if groups[student.route_id, student.stoppage_id][1]]
+    placeable.sort(key=lambda student: len(groups[student.route_id, student.stoppage_id][1]))
+    for student in placeable:
+        _, eligible, heap = groups[student.route_id, student.stoppage_id]
+        current = eligible.get(student.assigned_bus_id)
+        chosen = current if current is not None and current.free > 0 else heap.emptiest()
+        if chosen is None:
+            plan.unplaced.append((student, "All buses serving this stoppage are full."))
+        else:
+            chosen.place(student)
+
+    def seat_order(student):
+        gender = GENDER_ORDER.get(student.gender, len(GENDER_ORDER)) if group_gender else 0
+        return gender, student.stoppage_id or 0, student.name.lower(), student.pk
+
+    for bus in buses:
+        bus.placements = list(zip(sorted(bus.students, key=seat_order), bus.vacant))
+    return plan
+
+
+def _claim(model, columns, values, condition):
+    """
+    UPDATE model SET <columns> = %s WHERE id=%s AND <condition> for every row of
+    `values` as one prepared statement (executemany); returns the rows changed.
+    """
+    qn = connection.ops.quote_name
+    assignments = ", ".join(f"{qn(name)} = %s" for name in columns)
+    sql = f"UPDATE {qn(model._meta.db_table)} SET {assignments} WHERE {qn('id')} = %s AND {condition}"
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, values)
+        return cursor.rowcount
+
+
+def apply_allocation(plan, send_emails=True):
+    """
+    Write the plan's placements in one transaction: one prepared UPDATE run for
+    every seat and one for every student, instead of a save() per object.
+
+    Every seat is claimed only if it is still vacant and every student only if
+    still unseated (the same compare-and-set as assign_seat_to_student); if
+    anything changed since planning, AllocationConflict is raised and the whole
+    allocation is rolled back. Returns the number of students seated.
+    """
+    placements = plan.placements()
+    if not placements:
+        return 0
+
+    qn = connection.ops.quote_name
+    with bulk_seat_changes() as touched:
+        claimed = _claim(Seat, ["student_id"], [(student.pk, seat.pk) for student, seat in placements],
+                         f"{qn('student_id')} IS NULL")
+        seated = _claim(Student, ["assigned_bus_id", "assigned_seat_id"],
+                        [(seat.bus_id, seat.pk, student.pk) for student, seat in placements],
+                        f"{qn('assigned_seat_id')} IS NULL")
+        if claimed != len(placements) or seated != len(placements):
+            raise AllocationConflict("Seats or students changed while allocating, nothing was saved. Run it again.")
+
+        bus_ids = {seat.bus_id for _, seat in placements}
+        touched.update(bus_ids)
+        # Raw UPDATE koi signal nahi bhejta
+        mark_report_dirty("students_per_bus", bus_ids | {student.assigned_bus_id for student, _ in placements})
+        if send_emails:
+            queue_seat_allotment_emails(placements)
+
+    for student, seat in placements:
+        seat.student = student
+        student.assigned_bus_id = seat.bus_id
+        student.assigned_seat_id = seat.pk
+    return len(placements)
+
+
+def allocate_seats(routes=None, group_gender=False, dry_run=False, send_emails=True):
+    """plan_allocation() and, unless dry_run, apply_allocation(). Returns the plan."""
+    plan = plan_allocation(routes, group_gender=group_gender)
+    if not dry_run:
+        apply_allocation(plan, send_emails=send_emails)
+    return plan
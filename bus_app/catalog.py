@@ -0,0 +1,97 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.http import HttpResponse, HttpResponseNotModified
+from django.urls import reverse
+from django.utils.http import parse_etags
+
+# ✅ Reference data (schools, programs, routes, stoppages) served from a versioned cache.
+# The version lives in the database (CatalogVersion) and signals bump it in the same
+# transaction as the change, so every worker process moves to the new cache keys
+# and old entries are simply never read again. The version itself is cached for
+# CATALOG_VERSION_TIMEOUT seconds, so a warm request makes no query at all; the
+# bumping process drops it at once, other processes (LocMem) within that timeout.
+VERSION_ROW = 1
+VERSION_KEY = "catalog:version"
+
+
+def catalog_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        from .models import CatalogVersion
+
+        row = CatalogVersion.objects.filter(pk=VERSION_ROW).values_list("version", flat=True).first()
+        version = format(row or 0, "x")
+        cache.set(VERSION_KEY, version, getattr(settings, "CATALOG_VERSION_TIMEOUT", 10))
+    return version
+
+
+def bump_catalog_version():
+    from .models import CatalogVersion
+
+    if not CatalogVersion.objects.filter(pk=VERSION_ROW).update(version=F("version") + 1):
+        CatalogVersion.objects.get_or_create(pk=VERSION_ROW, defaults={"version": 1})
+    # Commit ke baad hi: pehle hata diya to koi request purana version phir cache kar degi
+    transaction.on_commit(lambda: cache.delete(VERSION_KEY))
+
+
+def catalog_url():
+    """Versioned URL of the bootstrap catalog; a new version means a new URL, so browsers can keep it long."""
+    return f"{reverse('catalog')}?v={catalog_version()}"
+
+
+def build_catalog(version=None):
+    """Whole School -> Programs and Route -> Stoppages tree as compact nested lists."""
+    from .models import Program, Route, School, Stoppage
+
+    programs = {}
+    for school_id, name in Program.objects.order_by("school_id", "name").values_list("school_id", "name"):
+        programs.setdefault(school_id, []).append(name)
+    stoppages = {}
+    for route_id, name in Stoppage.objects.order_by("route_id", "id").values_list("route_id", "name"):
+        stoppages.setdefault(route_id, []).append(name)
+
+    return {
+        "v": version or catalog_version(),
+        "schools": [[name, programs.get(pk, [])] for pk, name in School.objects.order_by("name").values_list("id", "name")],
+        "routes": [[name, stoppages.get(pk, [])] for pk, name in Route.objects.order_by("name").values_list("id", "name")],
+    }
+
+
+def cached_json(name, builder, version=None):
+    """
+    (body, etag) for the JSON payload returned by builder(), cached under the
+    catalog version (the current one when None). The ETag is a hash of the exact
+    body, so it is strong.
+    """
+    # Name me user input (school/route) hota hai, isliye key me uska hash
+    key = f"catalog:{version or catalog_version()}:{hashlib.md5(name.encode()).hexdigest()}"
+    entry = cache.get(key)
+    if entry is None:
+        body = json.dumps(builder(), separators=(",", ":"), ensure_ascii=False)
+        etag = '"%s"' % hashlib.sha256(body.encode()).hexdigest()[:32]
+        entry = (body, etag)
+        cache.set(key, entry, getattr(settings, "CATALOG_CACHE_TIMEOUT", 24 * 60 * 60))
+    return entry
+
+
+def catalog_response(request, name, builder, max_age=None, version=None):
+    """JSON response for a catalog payload with ETag / Cache-Control and 304 handling."""
+    body, etag = cached_json(name, builder, version)
+    if max_age is None:
+        max_age = getattr(settings, "CATALOG_MAX_AGE", 300)
+    cache_control = f"public, max-age={max_age}"
+
+    # Weak comparison: gzip_page (GZipMiddleware) bheji hui ETag ko W/"..." bana deta hai
+    client_etags = {tag.removeprefix("W/") for tag in parse_etags(request.headers.get("If-None-Match", ""))}
+    if etag in client_etags or "*" in client_etags:
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(body, content_type="application/json")
+    response["ETag"] = etag
+    response["Cache-Control"] = cache_control
+    return response
@@ -1,5 +1,5 @@
 from django import forms
-from .models import Student, School, Route, Bus, Driver, Notice, Allotment, Stoppage, Feedback
+from .models import Student, School, Program, Route, Bus, Seat, Driver, Notice, Allotment, Stoppage, Feedback
 import re
 
 
@@ -110,6 +110,11 @@ class AllotmentForm(forms.ModelForm):
             'route': forms.Select(attrs={'id': 'route-select'}),
             'stoppages': forms.CheckboxSelectMultiple(attrs={'id': 'stoppage-checkboxes'})
         }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['bus'].queryset = Bus.objects.select_related('current_route')
+        self.fields['stoppages'].queryset = Stoppage.objects.select_related('route')
 #add drivers
 import re
 from django import forms
@@ -152,6 +157,14 @@ class StudentForm(forms.ModelForm):
             'assigned_seat': forms.Select(),
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Bus/Seat labels me route aata hai, ek hi query me laao (Program/Stoppage me school/route)
+        self.fields['assigned_bus'].queryset = Bus.objects.select_related('current_route')
+        self.fields['assigned_seat'].queryset = Seat.objects.select_related('bus__current_route')
+        self.fields['program'].queryset = Program.objects.select_related('school')
+        self.fields['stoppage'].queryset = Stoppage.objects.select_related('route')
+
 
 #add routes
 class RouteForm(forms.ModelForm):
@@ -177,6 +190,10 @@ class NoticeForm(forms.ModelForm):
         model = Notice
         fields = ['type', 'bus', 'route', 'message']
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['bus'].queryset = Bus.objects.select_related('current_route')
+
 class FeedbackForm(forms.ModelForm):
     bus = forms.ModelChoiceField(
         queryset=Bus.objects.exclude(identifier_number__isnull=True).exclude(identifier_number=''),
@@ -0,0 +1,248 @@
+import csv
+import io
+import os
+
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+
+from .models import Program, Route, School, Stoppage, Student
+from .reports import rebuild_reports
+from .search import index_objects
+
+# ✅ Bulk student import from admission spreadsheets (XLSX or CSV), row by row.
+BATCH_SIZE = 1000
+
+# Header (lowercased, spaces -> _) -> Student field
+COLUMNS = {
+    "name": "name", "student_name": "name",
+    "roll_number": "roll_number", "roll_no": "roll_number", "roll": "roll_number",
+    "crm_id": "crm_id", "crm": "crm_id",
+    "gender": "gender",
+    "school": "school", "school_name": "school",
+    "program": "program", "programme": "program", "course": "program",
+    "fee_paid": "fee_paid",
+    "fee_amount": "fee_amount", "fee": "fee_amount",
+    "email": "email", "email_id": "email",
+    "contact_number": "contact_number", "contact": "contact_number", "mobile": "contact_number", "phone": "contact_number",
+    "route": "route", "route_name": "route",
+    "stoppage": "stoppage", "stop": "stoppage",
+}
+GENDERS = {"m": "Male", "male": "Male", "f": "Female", "female": "Female", "o": "Other", "other": "Other"}
+TRUE_VALUES = {"1", "y", "yes", "true", "paid"}
+
+
+class ImportFileError(Exception):
+    pass
+
+
+class ImportResult:
+    def __init__(self):
+        self.rows = 0
+        self.created = 0
+        self.errors = []  # (row number, roll number/email, message)
+
+    def error(self, row_number, data, message):
+        self.errors.append((row_number, data.get("roll_number") or data.get("crm_id") or data.get("email") or "", message))
+
+    def write_error_report(self, out):
+        writer = csv.writer(out)
+        writer.writerow(["Row", "Student", "Error"])
+        writer.writerows(self.errors)
+
+
+def _header_key(value):
+    return str(value or "").strip().lower().replace(" ", "_").replace("-", "_").replace(".", "")
+
+
+def _cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)  # Excel roll/phone numbers 12345.0 aate hain
+    return str(value).strip()
+
+
+def read_rows(file, filename):
+    """
+    Yield (row number, {field: text}) for every non-empty data row of an .xlsx or
+    .csv file opened in binary mode, streaming (openpyxl read-only mode / csv
+    reader). Row 1 is the header.
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == ".xlsx":
+        import openpyxl
+
+        try:
+            workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+        except Exception as e:
+            raise ImportFileError(f"Could not read the Excel file: {e}")
+        try:
+            yield from _mapped_rows(workbook.active.iter_rows(values_only=True))
+        finally:
+            workbook.close()
+    elif extension == ".csv":
+        yield from _mapped_rows(csv.reader(io.TextIOWrapper(file, encoding="utf-8-sig", newline="")))
+    else:
+        raise ImportFileError("Upload an .xlsx or .csv file.")
+
+
+def _mapped_rows(rows):
+    rows = iter(rows)
+    header = next(rows, None)
+    if header is None:
+        raise ImportFileError("The file is empty.")
+    fields = [COLUMNS.get(_header_key(column)) for column in header]
+    missing = {"name", "email"} - set(fields)
+    if missing:
+        raise ImportFileError(f"Missing column(s): {', '.join(sorted(missing))}")
+
+    for row_number, row in enumerate(rows, start=2):
+        data = {field: _cell(value) for field, value in zip(fields, row) if field}
+        if any(data.values()):
+            yield row_number, data
+
+
+class LookupMaps:
+    """Case-insensitive name -> object maps of the reference tables, plus existing unique keys."""
+
+    def __init__(self):
+        self.schools = {name.lower(): pk for pk, name in School.objects.values_list("pk", "name")}
+        self.programs = {
+            (school_id, name.lower()): pk for pk, school_id, name in Program.objects.values_list("pk", "school_id", "name")
+        }
+        self.routes = {name.lower(): pk for pk, name in Route.objects.values_list("pk", "name")}
+        self.stoppages = {
+            (route_id, name.lower()): pk for pk, route_id, name in Stoppage.objects.values_list("pk", "route_id", "name")
+        }
+        # Pehle se maujood students: har row pe exists() query nahi
+        self.roll_numbers, self.crm_ids, self.emails = set(), set(), set()
+        for roll_number, crm_id, email in Student.objects.values_list("roll_number", "crm_id", "email").iterator(5000):
+            self.remember(roll_number, crm_id, email)
+
+    def remember(self, roll_number, crm_id, email):
+        if roll_number:
+            self.roll_numbers.add(roll_number)
+        if crm_id:
+            self.crm_ids.add(crm_id)
+        self.emails.add(email.lower())
+
+
+def build_student(data, lookups):
+    """Validated, unsaved Student for one row; raises ValidationError with the reason."""
+    name = data.get("name", "")
+    roll_number = data.get("roll_number") or None
+    crm_id = data.get("crm_id") or None
+    email = data.get("email", "")
+    if not name:
+        raise ValidationError("Name is required.")
+    if not roll_number and not crm_id:
+        raise ValidationError("Either Roll Number or CRM ID is required.")
+    validate_email(email)
+
+    if roll_number and roll_number in lookups.roll_numbers:
+        raise ValidationError(f"Roll number {roll_number} already exists.")
+    if crm_id and crm_id in lookups.crm_ids:
+        raise ValidationError(f"CRM ID {crm_id} already exists.")
+    if email.lower() in lookups.emails:
+        raise ValidationError(f"Email {email} already exists.")
+
+    gender = GENDERS.get(data.get("gender", "").lower()) if data.get("gender") else "Male"
+    if gender is None:
+        raise ValidationError(f"Unknown gender {data['gender']!r}.")
+
+    school_id = program_id = route_id = stoppage_id = None
+    if data.get("school"):
+        school_id = lookups.schools.get(data["school"].lower())
+        if school_id is None:
+            raise ValidationError(f"Unknown school {data['school']!r}.")
+    if data.get("program"):
+        program_id = lookups.programs.get((school_id, data["program"].lower()))
+        if program_id is None:
+            raise ValidationError(f"Program {data['program']!r} not found in school {data.get('school') or '-'}.")
+    if data.get("route"):
+        route_id = lookups.routes.get(data["route"].lower())
+        if route_id is None:
+            raise ValidationError(f"Unknown route {data['route']!r}.")
+    if data.get("stoppage"):
+        stoppage_id = lookups.stoppages.get((route_id, data["stoppage"].lower()))
+        if stoppage_id is None:
+            raise ValidationError(f"Stoppage {data['stoppage']!r} not found on route {data.get('route') or '-'}.")
+
+    student = Student(
+        name=name[:100],
+        roll_number=roll_number,
+        crm_id=crm_id,
+        gender=gender,
+        school_id=school_id,
+        program_id=program_id,
+        fee_paid=data.get("fee_paid", "").lower() in TRUE_VALUES,
+        fee_amount=data.get("fee_amount") or None,
+        email=email,
+        contact_number=data.get("contact_number") or "0000000000",
+        route_id=route_id,
+        stoppage_id=stoppage_id,
+    )
+    # FKs lookup maps se aaye hain, unki exists() query dobara nahi
+    student.clean_fields(exclude=["photo", "school", "program", "route", "stoppage", "assigned_bus", "assigned_seat"])
+
+    lookups.remember(roll_number, crm_id, email)  # Same file me duplicate bhi pakdo
+    return student
+
+
+def _save_batch(batch, result):
+    """bulk_create one batch; if the database rejects it (a row added meanwhile), save row by row."""
+    try:
+        with transaction.atomic():
+            students = Student.objects.bulk_create([student for _, student, _ in batch])
+        result.created += len(students)
+        return [student.pk for student in students]
+    except IntegrityError:
+        pass
+
+    ids = []
+    for row_number, student, data in batch:
+        try:
+            with transaction.atomic():
+                Student.objects.bulk_create([student])
+            ids.append(student.pk)
+            result.created += 1
+        except IntegrityError as e:
+            result.error(row_number, data, f"Could not save: {e}")
+    return ids
+
+
+def import_students(rows, batch_size=BATCH_SIZE, dry_run=False):
+    """
+    Validate (row number, data) pairs from read_rows() and insert the valid ones
+    with bulk_create, one transaction per batch. Returns an ImportResult.
+    """
+    result = ImportResult()
+    lookups = LookupMaps()
+    created_ids = []
+    batch = []
+
+    def flush():
+        if batch and not dry_run:
+            created_ids.extend(_save_batch(batch, result))
+        elif batch:
+            result.created += len(batch)
+        batch.clear()
+
+    for row_number, data in rows:
+        result.rows += 1
+        try:
+            student = build_student(data, lookups)
+        except ValidationError as e:
+            result.error(row_number, data, "; ".join(e.messages))
+            continue
+        batch.append((row_number, student, data))
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+
+    if created_ids:
+        # bulk_create signals nahi bhejta: reports aur search index yahin update
+        rebuild_reports()
+        index_objects("student", created_ids)
+    return result
@@ -0,0 +1,56 @@
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from bus_app.allocation import AllocationConflict, allocate_seats
+from bus_app.models import Route
+
+
+class Command(BaseCommand):
+    help = (
+        "Give every unseated student of the selected routes a bus serving their stoppage and a seat, "
+        "in one pass, and queue their confirmation emails."
+    )
+
+    def add_arguments(self, parser):
+        target = parser.add_mutually_exclusive_group(required=True)
+        target.add_argument("--route", action="append", dest="routes", metavar="NAME",
+                            help="Route name to allocate (can be repeated).")
+        target.add_argument("--all", action="store_true", help="Allocate every route.")
+        parser.add_argument("--group-gender", action="store_true",
+                            help="Seat each gender in one contiguous block per bus.")
+        parser.add_argument("--dry-run", action="store_true", help="Only show the plan and utilization, save nothing.")
+        parser.add_argument("--no-email", action="store_true", help="Do not queue confirmation emails.")
+
+    def handle(self, *args, **options):
+        routes = None
+        if not options["all"]:
+            routes = list(Route.objects.filter(name__in=options["routes"]))
+            missing = set(options["routes"]) - {route.name for route in routes}
+            if missing:
+                raise CommandError(f"Unknown route(s): {', '.join(sorted(missing))}")
+
+        try:
+            plan = allocate_seats(
+                routes,
+                group_gender=options["group_gender"],
+                dry_run=options["dry_run"],
+                send_emails=not options["no_email"],
+            )
+        except AllocationConflict as e:
+            raise CommandError(str(e))
+
+        for row in plan.bus_stats():
+            self.stdout.write(
+                f"{row['bus']} ({row['route']}): {row['occupied_before']} -> {row['occupied_after']}"
+                f"/{row['seats_total']} seats, +{row['placed']} ({row['utilization']}%)"
+            )
+        for reason, count in Counter(reason for _, reason in plan.unplaced).most_common():
+            self.stdout.write(self.style.WARNING(f"{count} not placed: {reason}"))
+
+        summary = plan.summary()
+        verb = "can be seated" if options["dry_run"] else "seated"
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {summary['placed']} of {summary['students']} unseated students {verb} on {summary['buses']} bus(es), "
+            f"utilization {summary['utilization_before']}% -> {summary['utilization_after']}%."
+        ))
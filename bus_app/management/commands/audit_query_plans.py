@@ -0,0 +1,179 @@
+import re
+from urllib.parse import urlencode
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from bus_app.models import Bus, Driver, Route, School, Seat, Student
+
+SCAN = re.compile(r"^SCAN (\w+)(?: AS \w+)?$")  # "SCAN t USING (COVERING) INDEX ..." reads an index, not the table
+TABLE = re.compile(r"^(?:SCAN|SEARCH) (\w+)")
+LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+# Plans that stay flagged on purpose: path -> why no index removes them.
+# Sorting on a name that lives in a LEFT JOINed table (school, program, route, driver)
+# can't be served by an index on the listed table, so SQLite sorts. That costs
+# ~0.15-0.3s per /students/ page at 100k students; avoiding it would mean copying
+# the names onto every row.
+JOINED_SORT = "sort on a joined column"
+ACCEPTED = {
+    "/students/?sort=school": JOINED_SORT,
+    "/students/?sort=program": JOINED_SORT,
+    "/buses/?sort=-route": JOINED_SORT,
+    "/allotments/?sort=driver": JOINED_SORT,
+    "/allotments/?sort=route": JOINED_SORT,
+}
+
+
+def audited_views():
+    """
+    (url name, kwargs, query strings) of every list, report and AJAX view, with
+    arguments taken from the database so each one runs its real queries.
+    """
+    bus = Bus.objects.exclude(identifier_number=None).order_by("pk").first() or Bus.objects.order_by("pk").first()
+    student = Student.objects.exclude(school=None).order_by("pk").first() or Student.objects.order_by("pk").first()
+    seat = Seat.objects.filter(student__isnull=False).order_by("pk").first() or Seat.objects.order_by("pk").first()
+    driver = Driver.objects.order_by("pk").first()
+    route = Route.objects.order_by("pk").first()
+    school = School.objects.order_by("pk").first()
+
+    views = [
+        ("home", {}, [""]),
+        ("bus_list", {}, ["", "sort=-route", "search=1"]),
+        ("allotment_list", {}, ["", "sort=driver", "sort=route"]),
+        ("driver_list", {}, ["", "sort=contact"]),
+        ("student_list", {}, ["", "sort=school", "sort=program", "search=a"]),
+        ("route_list", {}, ["", "sort=fare"]),
+        ("stoppage_list", {}, ["", "sort=route"]),
+        ("notice_list", {}, ["", "sort=type"]),
+        ("all_feedbacks", {}, [""]),
+        ("feedback_form", {}, [""]),
+        ("reports", {}, [""]),
+        ("reports_api", {}, [""]),
+        ("outbox_stats", {}, [""]),
+        ("catalog", {}, [""]),
+        ("get_schools", {}, [""]),
+        ("get_routes", {}, [""]),
+        ("filter_suggestions", {"param": "student_name"}, ["", "q=a"]),
+        ("filter_suggestions", {"param": "driver"}, ["q=a"]),
+    ]
+    if bus:
+        views += [
+            ("bus_detail", {"number": bus.number}, [""]),
+            ("bus_seating_chart", {"bus_number": bus.number}, [""]),
+            ("feedback_form", {}, [urlencode({"bus": bus.identifier_number or ""})]),
+        ]
+    if student:
+        views += [
+            ("student_detail", {"id": student.pk}, [""]),
+            ("allot_bus", {"student_id": student.pk}, [""]),
+            ("student_list", {}, [urlencode({"student_name": student.name}), urlencode({"search": student.name})]),
+        ]
+        if bus:
+            views.append(("select_seat", {"student_id": student.pk, "bus_id": bus.pk}, [""]))
+    if seat:
+        views.append(("seat_details", {"seat_id": seat.pk}, [""]))
+    if driver:
+        views.append(("driver_detail", {"license_number": driver.D_license_number}, [""]))
+    if route:
+        views += [
+            ("get_stoppages", {}, [urlencode({"route": route.name})]),
+            ("get_stoppages_by_route", {}, [urlencode({"route_id": route.pk})]),
+        ]
+    if school:
+        views += [
+            ("get_programs", {}, [urlencode({"school": school.name})]),
+            ("student_list", {}, [urlencode({"school_name": school.name})]),
+        ]
+    return views
+
+
+class Command(BaseCommand):
+    help = (
+        "Request every list, report and AJAX view as a superuser, run EXPLAIN QUERY PLAN on each SELECT "
+        "they issue and flag full table scans and temporary B-trees on tables with at least --min-rows rows. "
+        "Run it against a seeded database (see `manage.py generate_campus`)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths", nargs="*", metavar="PATH", help="Only these URL paths, e.g. /students/?sort=school")
+        parser.add_argument("--min-rows", type=int, default=1000, help="Ignore plans that only touch smaller tables.")
+        parser.add_argument("--verbose-plans", action="store_true", help="Print the plan of every query, not just flagged ones.")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("EXPLAIN QUERY PLAN output is parsed for SQLite only.")
+        user = get_user_model().objects.filter(is_superuser=True).first()
+        if user is None:
+            raise CommandError("Create a superuser first (the views need a logged-in user).")
+
+        paths = options["paths"] or [
+            reverse(name, kwargs=kwargs) + (f"?{query}" if query else "")
+            for name, kwargs, queries in audited_views() for query in queries
+        ]
+        queries = self.capture(user, paths)
+
+        row_counts = {}
+        flagged = 0
+        for sql, seen_in in queries.values():
+            plan = [row[-1] for row in self.explain(sql)]
+            tables = {match.group(1) for detail in plan if (match := TABLE.match(detail))}
+            for table in tables - row_counts.keys():
+                row_counts[table] = self.count(table)
+            largest = max((row_counts[table] or 0 for table in tables), default=0)
+
+            issues = [detail for detail in plan if (match := SCAN.match(detail)) and (row_counts.get(match.group(1)) or 0) >= options["min_rows"]]
+            if largest >= options["min_rows"]:
+                issues += [detail for detail in plan if detail.startswith("USE TEMP B-TREE")]
+            accepted = {ACCEPTED.get(path) for path in seen_in}
+            if issues and None not in accepted:
+                self.stdout.write(f"accepted: {', '.join(sorted(seen_in))}: {'; '.join(sorted(accepted))}")
+                continue
+            if not issues and not options["verbose_plans"]:
+                continue
+            flagged += bool(issues)
+            style = self.style.WARNING if issues else (lambda text: text)
+            self.stdout.write(style(f"{'⚠️ ' if issues else ''}{', '.join(sorted(seen_in))}"))
+            self.stdout.write(f"  {sql[:400]}{'...' if len(sql) > 400 else ''}")
+            for detail in plan:
+                self.stdout.write(f"    {'!!' if detail in issues else '  '} {detail}")
+
+        summary = f"{len(paths)} request(s), {len(queries)} distinct SELECT(s), {flagged} with a full scan or temp B-tree."
+        self.stdout.write(self.style.WARNING(summary) if flagged else self.style.SUCCESS(f"✅ {summary}"))
+
+    def capture(self, user, paths):
+        """
+        {shape: (sql, {paths that ran it})} for every SELECT the requests issue; queries
+        that differ only in their literals (ids, session keys, timestamps) are one shape.
+        """
+        client = Client()
+        client.force_login(user)
+        queries = {}
+        for path in paths:
+            # Request ke side effects (session wagaira) rollback
+            with transaction.atomic(), CaptureQueriesContext(connection) as captured:
+                response = client.get(path)
+                transaction.set_rollback(True)
+            if response.status_code >= 400:
+                self.stderr.write(f"{path}: HTTP {response.status_code}")
+            for query in captured:
+                if query["sql"].lstrip().upper().startswith("SELECT"):
+                    queries.setdefault(LITERAL.sub("?", query["sql"]), (query["sql"], set()))[1].add(path)
+        return queries
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+            return cursor.fetchall()
+
+    def count(self, table):
+        with connection.cursor() as cursor:
+            try:
+                cursor.execute(f'SELECT COUNT(*) FROM "{table}"')
+            except DatabaseError:
+                return None  # Subquery alias (U0), asli table nahi
+            return cursor.fetchone()[0]
@@ -0,0 +1,61 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from bus_app.models import Student
+from bus_app.photos import DERIVATIVES, STAGED_PREFIX, init_worker, rebuild_photo, store_normalized_photo
+
+BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate the thumbnail and medium derivatives of existing student photos in parallel worker processes, "
+        "and normalize uploads whose background job never finished."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true", help="Regenerate every photo, not only those missing a derivative.")
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="Worker processes (default: CPU count).")
+
+    def handle(self, *args, **options):
+        students = Student.objects.exclude(photo="").exclude(photo__isnull=True)
+        if not options["all"]:
+            missing = Q(photo__startswith=STAGED_PREFIX)  # Adhoora upload: derivatives purani photo ke ho sakte hain
+            for field in DERIVATIVES:
+                missing |= Q(**{field: ""})
+            students = students.filter(missing)
+        rows = list(students.order_by("pk").values_list("pk", "photo"))
+        if not rows:
+            self.stdout.write(self.style.SUCCESS("✅ Every photo already has its derivatives."))
+            return
+
+        started = time.perf_counter()
+        done = failed = 0
+        updated = []
+        with ProcessPoolExecutor(max_workers=max(options["workers"], 1), initializer=init_worker) as pool:
+            names = pool.map(rebuild_photo, [photo for _, photo in rows], chunksize=16)
+            for (pk, photo), result in zip(rows, names):
+                if result is None:
+                    failed += 1
+                    continue
+                if photo.startswith(STAGED_PREFIX):
+                    # Normalized photo + derivatives, staged file hat jaata hai
+                    store_normalized_photo(pk, photo, result)
+                    done += 1
+                    continue
+                updated.append(Student(pk=pk, **result))
+                done += 1
+                if len(updated) >= BATCH_SIZE:
+                    Student.objects.bulk_update(updated, list(DERIVATIVES))
+                    updated = []
+                    self.stdout.write(f"{done}/{len(rows)} photos done")
+        if updated:
+            Student.objects.bulk_update(updated, list(DERIVATIVES))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {done} photo(s) processed, {failed} unreadable, in {time.perf_counter() - started:.1f}s."
+        ))
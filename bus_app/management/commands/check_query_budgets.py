@@ -0,0 +1,58 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client
+from django.urls import NoReverseMatch, Resolver404, resolve, reverse
+
+from bus_app.metrics import QueryBudgetExceeded, query_budget
+
+
+class Command(BaseCommand):
+    help = (
+        "Request views as a superuser and fail when one runs more SQL queries than its QUERY_BUDGETS entry. "
+        "Views that need URL arguments are checked only when their path is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths", nargs="*", metavar="PATH", help="URL paths to check, e.g. /allot-bus/5/")
+
+    def handle(self, *args, **options):
+        budgets = getattr(settings, "QUERY_BUDGETS", {})
+        paths = options["paths"]
+        if not paths:
+            for name in budgets:
+                try:
+                    paths.append(reverse(name))
+                except NoReverseMatch:
+                    self.stdout.write(f"{name}: skipped (needs URL arguments, pass its path)")
+
+        user = get_user_model().objects.filter(is_superuser=True).first()
+        if user is None:
+            raise CommandError("Create a superuser first (the views need a logged-in user).")
+
+        failures = 0
+        for path in paths:
+            try:
+                name = resolve(path.split("?")[0]).view_name
+            except Resolver404:
+                raise CommandError(f"{path}: no such URL.")
+            if name not in budgets:
+                self.stdout.write(f"{path}: no budget for {name!r}")
+                continue
+            client = Client()
+            client.force_login(user)
+            # Request ke side effects (session wagaira) rollback
+            with transaction.atomic():
+                try:
+                    with query_budget(budgets[name], label=name) as captured:
+                        response = client.get(path)
+                    self.stdout.write(f"{path}: {len(captured)}/{budgets[name]} queries (HTTP {response.status_code})")
+                except QueryBudgetExceeded as e:
+                    failures += 1
+                    self.stderr.write(str(e))
+                transaction.set_rollback(True)
+
+        if failures:
+            raise CommandError(f"{failures} view(s) over their query budget.")
+        self.stdout.write(self.style.SUCCESS("✅ All checked views are within their query budgets."))
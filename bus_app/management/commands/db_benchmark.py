@@ -0,0 +1,188 @@
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, close_old_connections, connection, connections, transaction
+
+from bus_app.models import Bus, Feedback, Route, Seat, Student
+from bus_app.seating import assign_seat_to_student, release_seat
+
+# Django's defaults: rollback journal, a new connection per request, deferred BEGIN, 5s busy timeout
+BASELINE = {"CONN_MAX_AGE": 0, "CONN_HEALTH_CHECKS": False, "OPTIONS": {}}
+SAMPLE = 2000  # seats / students the seat moves pick from
+
+
+def _register(rng, ids, tag, n):
+    with transaction.atomic():
+        Student.objects.create(
+            name=f"Benchmark {n}", roll_number=f"BM{tag}{n}", email=f"bm{tag}{n}@benchmark.invalid",
+            route_id=rng.choice(ids["routes"]), gender=rng.choice(("Male", "Female")),
+        )
+
+
+def _feedback(rng, ids, tag, n):
+    Feedback.objects.create(bus_id=rng.choice(ids["buses"]), message=f"Benchmark feedback {n}")
+
+
+def _move_seat(rng, ids, tag, n):
+    # Clerk ek student ko dusri seat pe shift karta hai: read, phir write, ek hi transaction me
+    seat_id, bus_id = rng.choice(ids["seats"])
+    release_seat(Seat(pk=seat_id, bus_id=bus_id))
+    assign_seat_to_student(Student(pk=rng.choice(ids["students"])), Seat(pk=seat_id, bus_id=bus_id))
+
+
+def _bus_list(rng, ids, tag, n):
+    offset = rng.randrange(max(len(ids["buses"]) - 25, 1))
+    list(Bus.objects.select_related("current_route").order_by("number")[offset:offset + 25])
+
+
+def _route_students(rng, ids, tag, n):
+    students = Student.objects.filter(route_id=rng.choice(ids["routes"]))
+    students.count()
+    list(students.order_by("name").values("name", "roll_number", "assigned_bus__number")[:25])
+
+
+# ✅ A "request" is one of these, like the registration / feedback / list pages do
+WRITES = (_register, _feedback, _move_seat)
+READS = (_bus_list, _route_students)
+
+
+def run_process(threads, duration, write_ratio, seed, ids):
+    """Worker process: `threads` threads send requests until the deadline; returns the merged counters."""
+    tag = uuid.uuid4().hex[:6].upper()
+    deadline = time.perf_counter() + duration
+    stats = {"reads": 0, "writes": 0, "locked": 0, "latencies": []}
+    lock = threading.Lock()
+
+    def worker(thread_seed):
+        rng = random.Random(thread_seed)
+        local = {"reads": 0, "writes": 0, "locked": 0, "latencies": []}
+        n = 0
+        try:
+            while time.perf_counter() < deadline:
+                write = rng.random() < write_ratio
+                n += 1
+                started = time.perf_counter()
+                close_old_connections()  # request_started / request_finished do the same
+                try:
+                    rng.choice(WRITES if write else READS)(rng, ids, f"{tag}{thread_seed % 1000:03d}", n)
+                except OperationalError as e:
+                    if "locked" not in str(e):
+                        raise
+                    local["locked"] += 1
+                    continue
+                finally:
+                    close_old_connections()
+                local["writes" if write else "reads"] += 1
+                local["latencies"].append(time.perf_counter() - started)
+        finally:
+            connection.close()
+            with lock:
+                for key in ("reads", "writes", "locked"):
+                    stats[key] += local[key]
+                stats["latencies"] += local["latencies"]
+
+    rng = random.Random(seed)
+    pool = [threading.Thread(target=worker, args=(rng.randrange(10**9),)) for _ in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Concurrency benchmark for the SQLite profile: several processes x threads send mixed "
+        "read/write traffic (registrations, feedback, seat moves, list pages) to a throw-away copy of the "
+        "database, first with Django's defaults and then with the production profile (settings.SQLITE_PRODUCTION), "
+        "and report throughput and 'database is locked' errors."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=2)
+        parser.add_argument("--threads", type=int, default=4, help="Threads per process.")
+        parser.add_argument("--duration", type=float, default=10.0, help="Seconds per profile.")
+        parser.add_argument("--write-ratio", type=float, default=0.2, help="Share of requests that write.")
+        parser.add_argument("--profile", choices=("baseline", "production", "both"), default="both")
+        parser.add_argument("--seed", type=int, default=None)
+
+    def handle(self, *args, **options):
+        if options["processes"] < 1 or options["threads"] < 1 or options["duration"] <= 0:
+            raise CommandError("--processes, --threads and --duration must be positive.")
+        if not 0 <= options["write_ratio"] <= 1:
+            raise CommandError("--write-ratio must be between 0 and 1.")
+        if connection.vendor != "sqlite" or connection.is_in_memory_db():
+            raise CommandError("The benchmark needs a file-based SQLite database.")
+
+        ids = {
+            "buses": list(Bus.objects.values_list("pk", flat=True)),
+            "routes": list(Route.objects.values_list("pk", flat=True)),
+            "seats": list(Seat.objects.order_by("?").values_list("pk", "bus_id")[:SAMPLE]),
+            "students": list(Student.objects.order_by("?").values_list("pk", flat=True)[:SAMPLE]),
+        }
+        if not all(ids.values()):
+            raise CommandError("Needs buses, routes, seats and students (see `manage.py generate_campus`).")
+
+        profiles = ["baseline", "production"] if options["profile"] == "both" else [options["profile"]]
+        rng = random.Random(options["seed"])
+        rows = [self.run_profile(profile, options, rng.randrange(10**9), ids) for profile in profiles]
+
+        self.stdout.write(f"{'profile':<12}{'req/s':>9}{'reads':>9}{'writes':>9}{'locked':>9}{'p50 ms':>9}{'p95 ms':>9}")
+        for row in rows:
+            self.stdout.write(
+                f"{row['profile']:<12}{row['rate']:>9.0f}{row['reads']:>9}{row['writes']:>9}"
+                f"{row['locked']:>9}{row['p50']:>9.1f}{row['p95']:>9.1f}"
+            )
+
+    def run_profile(self, profile, options, seed, ids):
+        settings_dict = connections.settings["default"]
+        saved = dict(settings_dict)
+        directory = tempfile.mkdtemp(prefix="bus_app_db_benchmark_")
+        copy = os.path.join(directory, "benchmark.sqlite3")
+        try:
+            # Asli database ko nahi chhedna, uski copy pe traffic
+            with sqlite3.connect(copy) as target:
+                connection.ensure_connection()
+                connection.connection.backup(target)
+                if profile == "baseline":
+                    target.execute("PRAGMA journal_mode=DELETE")  # WAL file ke andar yaad rehta hai
+            connections.close_all()
+            settings_dict.update(NAME=copy, **(BASELINE if profile == "baseline" else settings.SQLITE_PRODUCTION))
+
+            processes, threads = options["processes"], options["threads"]
+            self.stdout.write(f"{profile}: {processes} process(es) x {threads} thread(s) for {options['duration']:g}s...")
+            started = time.perf_counter()
+            with ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("fork")) as pool:
+                results = [
+                    pool.submit(run_process, threads, options["duration"], options["write_ratio"], seed + i, ids)
+                    for i in range(processes)
+                ]
+                results = [future.result() for future in results]
+            elapsed = time.perf_counter() - started
+        finally:
+            connections.close_all()
+            settings_dict.clear()
+            settings_dict.update(saved)
+            shutil.rmtree(directory, ignore_errors=True)
+
+        latencies = sorted(latency for result in results for latency in result["latencies"])
+        reads = sum(result["reads"] for result in results)
+        writes = sum(result["writes"] for result in results)
+
+        def percentile(p):
+            return latencies[min(int(len(latencies) * p), len(latencies) - 1)] * 1000 if latencies else 0.0
+
+        return {
+            "profile": profile, "reads": reads, "writes": writes, "rate": (reads + writes) / elapsed,
+            "locked": sum(result["locked"] for result in results), "p50": percentile(0.5), "p95": percentile(0.95),
+        }
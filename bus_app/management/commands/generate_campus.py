@@ -0,0 +1,272 @@
+import random
+import re
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Max
+
+from bus_app.catalog import bump_catalog_version
+from bus_app.models import Allotment, Bus, Driver, Feedback, Notice, Program, Route, School, Seat, Stoppage, Student
+from bus_app.reports import rebuild_reports
+from bus_app.search import rebuild_index
+from bus_app.seating import SeatLayout, SeatLayoutError
+
+FIRST_NAMES = [
+    "Aarav", "Vivaan", "Aditya", "Arjun", "Reyansh", "Kabir", "Rohan", "Ishaan", "Karan", "Rahul",
+    "Ananya", "Diya", "Priya", "Isha", "Meera", "Saanvi", "Kavya", "Riya", "Neha", "Pooja",
+    "Sneha", "Aman", "Nikhil", "Tanvi", "Shreya", "Yash", "Harsh", "Simran", "Anjali", "Dev",
+]
+LAST_NAMES = [
+    "Sharma", "Verma", "Gupta", "Singh", "Yadav", "Jain", "Agarwal", "Mishra", "Tiwari", "Pandey",
+    "Chauhan", "Rathore", "Tomar", "Saxena", "Kushwah", "Bhadoriya", "Dubey", "Shukla", "Rajput", "Joshi",
+]
+AREAS = [
+    "Lashkar", "Morar", "Thatipur", "City Centre", "Hazira", "Phool Bagh", "Gola Ka Mandir", "Kampoo",
+    "DD Nagar", "Tansen Nagar", "Jhansi Road", "Padav", "Bahodapur", "Sithouli", "Maharaj Bada", "Naka",
+]
+DISCIPLINES = ["Engineering", "Management", "Law", "Pharmacy", "Science", "Commerce", "Arts", "Nursing", "Design", "Agriculture"]
+PROGRAMS = ["B.Tech", "M.Tech", "BBA", "MBA", "BCA", "MCA", "B.Sc", "M.Sc", "B.Com", "BA", "LLB", "B.Pharm", "Diploma", "PhD"]
+NOTICES = [
+    "Bus will be 15 minutes late tomorrow due to road work.",
+    "Transport fee for the next semester is due by the end of the month.",
+    "Route timings change from Monday, please check the new schedule.",
+    "Bus will not run on the upcoming public holiday.",
+]
+FEEDBACK = [
+    "Driver was on time and polite.",
+    "Bus was overcrowded today.",
+    "AC not working, please check.",
+    "Please add a stop near the market.",
+    "Very smooth ride, thank you.",
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a synthetic campus (schools, programs, routes with stoppages, drivers, buses with seats, "
+        "allotments, seated students, notices, feedback) with bulk inserts, for scale testing. "
+        "Every generated name/number carries --tag, so runs do not collide with real data or each other."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--students", type=int, default=10000)
+        parser.add_argument("--schools", type=int, default=8)
+        parser.add_argument("--programs", type=int, default=6, help="Programs per school.")
+        parser.add_argument("--routes", type=int, default=25)
+        parser.add_argument("--stoppages", type=int, default=12, help="Stoppages per route.")
+        parser.add_argument("--buses", type=int, default=None, help="Default: enough buses to seat --seated of the students.")
+        parser.add_argument("--layout", default="10x2+3", help='Seat layout of every bus, e.g. 10x2+3 (50 seats).')
+        parser.add_argument("--seated", type=float, default=0.8, help="Share of students that get a seat (0..1).")
+        parser.add_argument("--notices", type=int, default=200)
+        parser.add_argument("--feedback", type=int, default=1000)
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--tag", default=None, help="Up to 4 letters/digits marking the generated rows (default G<seed>).")
+        parser.add_argument("--batch-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        try:
+            layout = SeatLayout.parse(options["layout"])
+        except SeatLayoutError as e:
+            raise CommandError(str(e))
+        tag = (options["tag"] or f"G{options['seed']}").upper()
+        if not re.fullmatch(r"[A-Z0-9]{1,4}", tag):
+            raise CommandError("--tag must be 1-4 letters or digits.")
+        if min(options["students"], options["schools"], options["programs"], options["stoppages"]) < 0 or options["routes"] < 1:
+            raise CommandError("Counts must not be negative and at least one route is needed.")
+        if not 0 <= options["seated"] <= 1:
+            raise CommandError("--seated must be between 0 and 1.")
+        if Route.objects.filter(name__endswith=f"[{tag}]").exists():
+            raise CommandError(f"A campus tagged {tag} already exists, pick another --seed or --tag.")
+
+        self.rng = random.Random(options["seed"])
+        self.tag = tag
+        self.batch_size = options["batch_size"]
+        seated = int(options["students"] * options["seated"])
+        bus_count = options["buses"]
+        if bus_count is None:
+            bus_count = max(1, -(-seated // layout.seat_count)) if layout.seat_count else 1
+        if bus_count > 9999:
+            raise CommandError("At most 9999 buses per campus (bus numbers are 10 characters).")
+
+        started = self.last_step = time.perf_counter()
+        with transaction.atomic():
+            schools = self.create_schools(options["schools"], options["programs"])
+            routes = self.create_routes(options["routes"], options["stoppages"])
+            buses = self.create_fleet(bus_count, routes, layout)
+            self.step("Generated schools, routes and fleet")
+            students = self.create_students(options["students"], seated, schools, routes, buses)
+            self.step("Generated students and seats")
+            self.create_notices_and_feedback(options["notices"], options["feedback"], buses, routes)
+            self.step("Generated notices and feedback")
+
+            # bulk_create signals nahi bhejta: derived data ek baar me rebuild
+            bus_ids = [bus.pk for bus in buses]
+            Bus.refresh_seat_counts(bus_ids)
+            Bus.refresh_current_routes(bus_ids)
+            rebuild_reports()
+            bump_catalog_version()
+        self.step("Refreshed seat counters, current routes and reports")
+        rebuild_index()
+        self.step("Rebuilt search index")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Campus {tag}: {len(schools)} schools, {len(routes)} routes, {len(buses)} buses "
+            f"({layout} seats), {students} students ({seated} seated) in {time.perf_counter() - started:.1f}s."
+        ))
+
+    def step(self, label):
+        now = time.perf_counter()
+        self.stdout.write(f"{label} ({now - self.last_step:.1f}s).")
+        self.last_step = now
+
+    def bulk(self, model, objects):
+        return model.objects.bulk_create(objects, batch_size=self.batch_size)
+
+    def insert(self, model, fields, rows):
+        """
+        INSERT `rows` (tuples in `fields` order, attnames) with one prepared statement
+        run per --batch-size rows (executemany). No model instances and no SQL
+        compiled per 999-parameter chunk as in bulk_create; every other column gets
+        its field default. Like bulk_create, no signals are sent.
+        """
+        qn = connection.ops.quote_name
+        given = [model._meta.get_field(name) for name in fields]
+        rest = [field for field in model._meta.concrete_fields if field not in given and not field.primary_key]
+        defaults = tuple(field.get_db_prep_save(field.get_default(), connection) for field in rest)
+        columns = ", ".join(qn(field.column) for field in given + rest)
+        placeholders = ", ".join(["%s"] * (len(given) + len(rest)))
+        sql = f"INSERT INTO {qn(model._meta.db_table)} ({columns}) VALUES ({placeholders})"
+        with connection.cursor() as cursor:
+            for start in range(0, len(rows), self.batch_size):
+                cursor.executemany(sql, [row + defaults for row in rows[start:start + self.batch_size]])
+
+    def next_id(self, model):
+        # Poora run ek transaction me hai; koi aur isi waqt insert kare to unique id pe IntegrityError, aadha data nahi
+        return (model.objects.aggregate(last=Max("pk"))["last"] or 0) + 1
+
+    def create_schools(self, count, programs_per_school):
+        schools = self.bulk(School, [
+            School(name=f"SCHOOL OF {DISCIPLINES[i % len(DISCIPLINES)].upper()} {i + 1} [{self.tag}]")
+            for i in range(count)
+        ])
+        programs = []
+        for school in schools:
+            for name in self.rng.sample(PROGRAMS, min(programs_per_school, len(PROGRAMS))):
+                programs.append(Program(school=school, name=name))
+        programs = self.bulk(Program, programs)
+        self.programs = {}
+        for program in programs:
+            self.programs.setdefault(program.school_id, []).append(program.pk)
+        return schools
+
+    def create_routes(self, count, stoppages_per_route):
+        routes = self.bulk(Route, [
+            Route(name=f"{AREAS[i % len(AREAS)]} Route {i + 1} [{self.tag}]", fare=self.rng.choice([8000, 10000, 12000, 15000]))
+            for i in range(count)
+        ])
+        stoppages = []
+        for route in routes:
+            areas = self.rng.sample(AREAS, min(stoppages_per_route, len(AREAS)))
+            for k in range(stoppages_per_route):
+                stoppages.append(Stoppage(route=route, name=f"{areas[k % len(areas)]} Stop {k + 1}"))
+        # Stoppage id order = route par stop ka order
+        stoppages = self.bulk(Stoppage, stoppages)
+        self.stoppages = {}
+        for stoppage in stoppages:
+            self.stoppages.setdefault(stoppage.route_id, []).append(stoppage)
+        return routes
+
+    def create_fleet(self, count, routes, layout):
+        drivers = self.bulk(Driver, [
+            Driver(
+                name=f"{self.rng.choice(FIRST_NAMES)} {self.rng.choice(LAST_NAMES)}",
+                address=f"{self.rng.choice(AREAS)}, Gwalior",
+                D_license_number=f"DL{self.tag}{i:06d}",
+                contact_number=f"+91{self.tag}{i:06d}",
+                reference_by=self.rng.choice(LAST_NAMES),
+            )
+            for i in range(count)
+        ])
+        buses = self.bulk(Bus, [
+            Bus(number=f"{self.tag}B{i:04d}", identifier_number=f"{self.tag}-{i:04d}",
+                seats_left=layout.left, seats_right=layout.right,
+                pollution_paid=True, insurance_paid=True, tax_paid=True, permit=True)
+            for i in range(count)
+        ])
+        self.route_of_bus = {bus.pk: routes[i % len(routes)] for i, bus in enumerate(buses)}
+
+        allotments = self.bulk(Allotment, [
+            Allotment(bus=bus, driver=driver, route=self.route_of_bus[bus.pk])
+            for bus, driver in zip(buses, drivers)
+        ])
+        self.bulk(Allotment.stoppages.through, [
+            Allotment.stoppages.through(allotment_id=allotment.pk, stoppage_id=stoppage.pk)
+            for allotment in allotments
+            for stoppage in self.stoppages.get(allotment.route_id, [])
+        ])
+
+        self.seat_count = layout.seat_count
+        return buses
+
+    def create_students(self, count, seated, schools, routes, buses):
+        # Pehle `seated` students bus-wise seat 1, 2, 3... par baithte hain, baaki bina seat ke.
+        # Ids pehle se tay: student i ki seat = seat i, isliye dono taraf ke FK insert ke saath hi
+        seats = [(bus, n) for bus in buses for n in range(1, self.seat_count + 1)]
+        seated = min(seated, len(seats))
+        first_student, first_seat = self.next_id(Student), self.next_id(Seat)
+        fields = (
+            "id", "name", "roll_number", "gender", "school_id", "program_id", "fee_paid", "fee_amount", "email",
+            "contact_number", "route_id", "stoppage_id", "assigned_bus_id", "assigned_seat_id",
+        )
+        for start in range(0, count, self.batch_size):
+            batch = []
+            for i in range(start, min(start + self.batch_size, count)):
+                school = self.rng.choice(schools) if schools else None
+                if i < seated:
+                    bus = seats[i][0]
+                    route = self.route_of_bus[bus.pk]
+                else:
+                    bus, route = None, self.rng.choice(routes) if routes else None
+                stoppages = self.stoppages.get(route.pk, []) if route else []
+                programs = self.programs.get(school.pk) if school else None
+                batch.append((
+                    first_student + i,
+                    f"{self.rng.choice(FIRST_NAMES)} {self.rng.choice(LAST_NAMES)}",
+                    f"{self.tag}{i:07d}",
+                    self.rng.choices(["Male", "Female", "Other"], weights=[55, 43, 2])[0],
+                    school.pk if school else None,
+                    self.rng.choice(programs) if programs else None,
+                    self.rng.random() < 0.85,
+                    str(route.fare) if route else None,
+                    f"{self.tag.lower()}.{i}@students.example.edu",
+                    f"9{self.rng.randrange(10 ** 8, 10 ** 9)}",
+                    route.pk if route else None,
+                    self.rng.choice(stoppages).pk if stoppages else None,
+                    bus.pk if bus else None,
+                    first_seat + i if bus else None,
+                ))
+            self.insert(Student, fields, batch)
+
+        # SQLite ke FK deferred hain: seat -> student aur student -> seat commit pe check hote hain
+        self.insert(Seat, ("id", "bus_id", "seat_number", "student_id"), [
+            (first_seat + index, bus.pk, n, first_student + index if index < seated else None)
+            for index, (bus, n) in enumerate(seats)
+        ])
+        return count
+
+    def create_notices_and_feedback(self, notice_count, feedback_count, buses, routes):
+        notices = []
+        for _ in range(notice_count):
+            kind = self.rng.choice(["Bus", "Route", "All"])
+            notices.append(Notice(
+                type=kind,
+                bus=self.rng.choice(buses) if kind == "Bus" and buses else None,
+                route=self.rng.choice(routes) if kind == "Route" and routes else None,
+                message=self.rng.choice(NOTICES),
+            ))
+        self.bulk(Notice, notices)
+        self.bulk(Feedback, [
+            Feedback(bus=self.rng.choice(buses) if buses else None, message=self.rng.choice(FEEDBACK))
+            for _ in range(feedback_count)
+        ])
@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from bus_app.importer import BATCH_SIZE, ImportFileError, import_students, read_rows
+
+
+class Command(BaseCommand):
+    help = "Import students from an admissions spreadsheet (.xlsx or .csv, header in the first row)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("file")
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+        parser.add_argument("--dry-run", action="store_true", help="Only validate, save nothing.")
+        parser.add_argument("--errors", metavar="PATH", help="Write rejected rows to this CSV file.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            with open(options["file"], "rb") as file:
+                result = import_students(read_rows(file, options["file"]), options["batch_size"], options["dry_run"])
+        except (OSError, ImportFileError) as e:
+            raise CommandError(str(e))
+
+        if result.errors:
+            for row_number, student, message in result.errors[:20]:
+                self.stderr.write(f"Row {row_number} {student}: {message}")
+            if len(result.errors) > 20:
+                self.stderr.write(f"... and {len(result.errors) - 20} more")
+            if options["errors"]:
+                with open(options["errors"], "w", newline="", encoding="utf-8") as out:
+                    result.write_error_report(out)
+                self.stdout.write(f"Error report written to {options['errors']}")
+
+        verb = "would be imported" if options["dry_run"] else "imported"
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {result.created} of {result.rows} students {verb}, {len(result.errors)} rejected "
+            f"({time.perf_counter() - started:.1f}s)."
+        ))
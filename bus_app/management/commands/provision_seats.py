@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from bus_app.models import Bus
+from bus_app.seating import SeatLayout, SeatLayoutError, provision_seats
+
+
+class Command(BaseCommand):
+    help = "Create (or grow/shrink) the seats of one or more buses from a layout template in one transaction."
+
+    def add_arguments(self, parser):
+        size = parser.add_mutually_exclusive_group(required=True)
+        size.add_argument("--layout", help='Layout template "ROWSxLEFT+RIGHT", e.g. 10x2+3 for 50 seats.')
+        size.add_argument("--seats", type=int, help="Exact number of seats per bus.")
+        target = parser.add_mutually_exclusive_group(required=True)
+        target.add_argument("--bus", action="append", dest="buses", metavar="NUMBER",
+                            help="Bus number to provision (can be repeated).")
+        target.add_argument("--all", action="store_true", help="Provision every bus in the fleet.")
+
+    def handle(self, *args, **options):
+        try:
+            # Layout ho to bus ki left/right width bhi set hoti hai (chart usi se banta hai)
+            layout = SeatLayout.parse(options["layout"]) if options["layout"] else None
+        except SeatLayoutError as e:
+            raise CommandError(str(e))
+        seat_count = layout.seat_count if layout else options["seats"]
+        if seat_count is None or seat_count < 0:
+            raise CommandError("Seat count must be zero or more.")
+
+        buses = Bus.objects.all() if options["all"] else Bus.objects.filter(number__in=options["buses"])
+        bus_ids = list(buses.values_list("id", flat=True))
+        if not options["all"] and len(bus_ids) != len(set(options["buses"])):
+            found = set(Bus.objects.filter(pk__in=bus_ids).values_list("number", flat=True))
+            raise CommandError(f"Unknown bus number(s): {', '.join(sorted(set(options['buses']) - found))}")
+
+        try:
+            created, removed = provision_seats(bus_ids, layout or seat_count)
+        except SeatLayoutError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {len(bus_ids)} bus(es) set to {seat_count} seats: {created} created, {removed} removed."
+        ))
@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from bus_app.models import Bus
+from bus_app.qr import ERROR_CORRECTIONS
+from bus_app.qr_sheets import GRIDS, bus_cards, default_workers, qr_codes_zip, qr_sheet_pdf, worker_pool
+
+
+class Command(BaseCommand):
+    help = "Generate the per-bus feedback QR codes as a printable PDF sheet or a zip of PNG/SVG files."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--bus", action="append", metavar="NUMBER", help="Bus number or identifier number (repeatable, default: every bus).")
+        parser.add_argument("--output", "-o", help="Output file (default: bus_feedback_qr.pdf / .zip).")
+        parser.add_argument("--format", choices=("pdf", "zip"), default="pdf")
+        parser.add_argument("--image-format", choices=("png", "svg"), default="png", help="Files inside the zip.")
+        parser.add_argument("--per-page", type=int, choices=sorted(GRIDS), default=4, help="Cards per A4 page.")
+        parser.add_argument("--ec", choices=sorted(ERROR_CORRECTIONS), help="QR error correction (default: QR_ERROR_CORRECTION).")
+        parser.add_argument("--site-url", help="Site the codes link to (default: QR_SITE_URL).")
+        parser.add_argument("--workers", type=int, default=default_workers(), help="Worker processes (default: CPU count).")
+
+    def handle(self, *args, **options):
+        buses = None
+        if options["bus"]:
+            buses = []
+            for number in options["bus"]:
+                pk = (Bus.objects.filter(number=number) | Bus.objects.filter(identifier_number=number)) \
+                    .values_list("pk", flat=True).first()
+                if pk is None:
+                    raise CommandError(f"No bus {number!r}.")
+                buses.append(pk)
+        cards = bus_cards(buses, options["site_url"])
+        if not cards:
+            raise CommandError("No bus with an identifier number, nothing to print.")
+
+        output = options["output"] or f"bus_feedback_qr.{options['format']}"
+        started = time.perf_counter()
+        # w+b: Pillow PDF append pichhle pages wapas padhta hai
+        with worker_pool(options["workers"]) as pool, open(output, "w+b") as out:
+            if options["format"] == "pdf":
+                qr_sheet_pdf(cards, out, options["per_page"], options["ec"], pool)
+            else:
+                qr_codes_zip(cards, out, options["image_format"], options["ec"], pool)
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {len(cards)} bus QR code(s) written to {output} in {time.perf_counter() - started:.1f}s."
+        ))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from bus_app.models import ReportStat
+from bus_app.reports import rebuild_reports
+
+
+class Command(BaseCommand):
+    help = "Recompute the reporting snapshot shown on the reports dashboard from scratch."
+
+    def handle(self, *args, **options):
+        rebuild_reports()
+        self.stdout.write(self.style.SUCCESS(f"✅ Reports rebuilt ({ReportStat.objects.count()} rows)."))
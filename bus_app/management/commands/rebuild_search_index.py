@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from bus_app.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index (students, drivers, buses, allotments, notices)."
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        counts = rebuild_index()
+        if not counts:
+            self.stdout.write(self.style.WARNING("Full-text search needs SQLite FTS5; list pages use icontains search."))
+            return
+        for kind, count in counts.items():
+            self.stdout.write(f"{kind}: {count}")
+        self.stdout.write(self.style.SUCCESS(f"✅ Search index rebuilt in {time.perf_counter() - started:.2f}s."))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from bus_app.models import Bus
+from bus_app.seat_charts import invalidate_seat_charts
+
+
+class Command(BaseCommand):
+    help = "Recompute the stored seat occupancy counters of every bus from the Seat table and drop their cached seating charts."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--bus", action="append", dest="buses", metavar="NUMBER",
+                            help="Only repair this bus number (can be repeated).")
+
+    def handle(self, *args, **options):
+        bus_ids = None
+        if options["buses"]:
+            bus_ids = list(Bus.objects.filter(number__in=options["buses"]).values_list("id", flat=True))
+
+        Bus.refresh_seat_counts(bus_ids)
+        invalidate_seat_charts(bus_ids)  # Counter galat the to charts bhi ho sakte hain
+
+        buses = Bus.objects.all() if bus_ids is None else Bus.objects.filter(pk__in=bus_ids)
+        for bus in buses.order_by("number").only("number", *Bus.SEAT_COUNTER_FIELDS):
+            self.stdout.write(
+                f"{bus.number}: {bus.seats_occupied}/{bus.seats_total} occupied "
+                f"(M {bus.seats_male}, F {bus.seats_female}, O {bus.seats_other})"
+            )
+        self.stdout.write(self.style.SUCCESS("✅ Seat counters repaired."))
@@ -0,0 +1,137 @@
+import os
+import random
+import threading
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections
+from django.db.models import Count, F
+
+from bus_app.models import Bus, Seat, Student
+from bus_app.seating import assign_seat_to_student, provision_seats
+
+
+class Command(BaseCommand):
+    help = (
+        "Contention stress test for seat assignment: many threads race to book the seats of a "
+        "throw-away bus, then the result is checked for double bookings. Runs against the SQLite "
+        "file given with --database (or, with --scratch, the configured database) and removes its "
+        "data afterwards unless --keep is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument("--seats", type=int, default=40)
+        parser.add_argument("--students", type=int, default=120, help="More students than seats means real contention.")
+        parser.add_argument("--seed", type=int, default=None)
+        parser.add_argument("--keep", action="store_true", help="Keep the stress bus and students for inspection.")
+        target = parser.add_mutually_exclusive_group()
+        target.add_argument("--database", metavar="PATH", help="Migrated SQLite file to run against, e.g. a copy of the real one.")
+        target.add_argument("--scratch", action="store_true", help="Confirm the configured database is a scratch one.")
+
+    def handle(self, *args, **options):
+        if options["threads"] < 1 or options["seats"] < 1 or options["students"] < 1:
+            raise CommandError("--threads, --seats and --students must be positive.")
+        if not options["database"] and not options["scratch"]:
+            raise CommandError("seat_stress writes to the database: pass --database PATH (a scratch SQLite copy) "
+                               "or --scratch if the configured database is a scratch one.")
+        if not options["database"]:
+            return self.run_stress(options)
+        if not os.path.isfile(options["database"]):
+            raise CommandError(f"No such database file: {options['database']}")
+
+        # Default connection ko scratch file pe, db_benchmark ki tarah; baad me wapas
+        settings_dict = connections.settings["default"]
+        saved = dict(settings_dict)
+        connections.close_all()
+        settings_dict.update(NAME=options["database"])
+        try:
+            return self.run_stress(options)
+        finally:
+            connections.close_all()
+            settings_dict.clear()
+            settings_dict.update(saved)
+
+    def run_stress(self, options):
+        rng = random.Random(options["seed"])
+        tag = uuid.uuid4().hex[:6].upper()
+
+        bus = Bus.objects.create(number=f"ZZ{tag}")
+        provision_seats([bus], options["seats"])
+        seat_ids = list(bus.seats.values_list("id", flat=True))
+        Student.objects.bulk_create([
+            Student(name=f"Stress {i}", roll_number=f"ST{tag}{i:05d}", email=f"st{tag}{i:05d}@stress.invalid")
+            for i in range(options["students"])
+        ])
+        students = list(Student.objects.filter(roll_number__startswith=f"ST{tag}"))
+        rng.shuffle(students)
+
+        queue = list(students)
+        queue_lock = threading.Lock()
+        stats = {"assigned": 0, "taken": 0, "locked": 0, "attempts": 0}
+        stats_lock = threading.Lock()
+
+        def worker(seed):
+            picker = random.Random(seed)
+            local = dict.fromkeys(stats, 0)
+            try:
+                while True:
+                    with queue_lock:
+                        if not queue:
+                            break
+                        student = queue.pop()
+                    candidates = list(seat_ids)
+                    picker.shuffle(candidates)
+                    for seat_id in candidates:
+                        local["attempts"] += 1
+                        try:
+                            ok = assign_seat_to_student(student, Seat(pk=seat_id, bus_id=bus.pk))
+                        except OperationalError:
+                            local["locked"] += 1
+                            continue
+                        if ok:
+                            local["assigned"] += 1
+                            break
+                        local["taken"] += 1
+            finally:
+                connection.close()
+                with stats_lock:
+                    for key, value in local.items():
+                        stats[key] += value
+
+        threads = [threading.Thread(target=worker, args=(rng.random(),)) for _ in range(options["threads"])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        student_ids = [student.pk for student in students]
+        double_booked = (
+            Student.objects.filter(pk__in=student_ids, assigned_seat__isnull=False)
+            .values("assigned_seat").annotate(holders=Count("id")).filter(holders__gt=1).count()
+        )
+        mismatched = (
+            Student.objects.filter(pk__in=student_ids, assigned_seat__isnull=False)
+            .exclude(assigned_seat__student=F("pk")).count()
+        )
+        occupied = bus.seats.filter(student__isnull=False).count()
+        bus.refresh_from_db()
+
+        self.stdout.write(f"Threads: {options['threads']}  seats: {len(seat_ids)}  students: {len(students)}")
+        self.stdout.write(f"Attempts: {stats['attempts']}  assigned: {stats['assigned']}  "
+                          f"seat taken: {stats['taken']}  lock errors: {stats['locked']}")
+        self.stdout.write(f"Elapsed: {elapsed:.2f}s  ->  {stats['assigned'] / elapsed:.1f} assignments/s, "
+                          f"{stats['attempts'] / elapsed:.1f} attempts/s")
+        self.stdout.write(f"Occupied seats: {occupied}  counter: {bus.seats_occupied}")
+        self.stdout.write(f"Double bookings: {double_booked}  student/seat mismatches: {mismatched}")
+
+        if not options["keep"]:
+            Student.objects.filter(pk__in=student_ids).delete()
+            bus.delete()
+
+        if double_booked or mismatched or occupied != stats["assigned"] or bus.seats_occupied != occupied:
+            raise CommandError("❌ Seat assignment is not race-free.")
+        self.stdout.write(self.style.SUCCESS("✅ No double bookings."))
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from bus_app.outbox import deliver_due_batches, outbox_stats
+
+
+class Command(BaseCommand):
+    help = "Deliver queued outbox emails (notices etc.) in BCC batches. Runs forever unless --once is given."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Send what is due now and exit.")
+        parser.add_argument("--poll", type=float, default=10.0, help="Seconds to wait when the outbox is empty.")
+        parser.add_argument("--limit", type=int, default=None, help="Maximum batches per pass.")
+        parser.add_argument("--stats", action="store_true", help="Print queue depth and send latency and exit.")
+
+    def handle(self, *args, **options):
+        if options["stats"]:
+            for key, value in outbox_stats().items():
+                self.stdout.write(f"{key}: {value}")
+            return
+
+        while True:
+            stats = deliver_due_batches(limit=options["limit"])
+            if any(stats.values()):
+                self.stdout.write(f"Sent {stats['sent']}, retry later {stats['retry']}, failed {stats['failed']}")
+            if options["once"]:
+                break
+            if not any(stats.values()):
+                time.sleep(options["poll"])
@@ -0,0 +1,150 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.template import base as template_base
+from django.test.utils import CaptureQueriesContext
+
+# ✅ Per-request SQL / template / wall time instrumentation (RequestMetricsMiddleware).
+# Aggregates are kept per process and per resolved URL name.
+_state = threading.local()
+_lock = threading.Lock()
+_totals = {}
+_original_template_render = None
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.started = time.perf_counter()
+        self.wall_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper() hook: har query yahan se guzarti hai
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - started
+            self.queries += 1
+
+    def finish(self):
+        self.wall_time = time.perf_counter() - self.started
+        return self
+
+
+def current_metrics():
+    return getattr(_state, "metrics", None)
+
+
+@contextmanager
+def collect_metrics():
+    """Collect RequestMetrics for everything run inside the block on this thread."""
+    metrics = RequestMetrics()
+    previous, _state.metrics = current_metrics(), metrics
+    try:
+        with connections[DEFAULT_DB_ALIAS].execute_wrapper(metrics):
+            yield metrics
+    finally:
+        metrics.finish()
+        _state.metrics = previous
+
+
+def _timed_template_render(self, context):
+    metrics = current_metrics()
+    if metrics is None:
+        return _original_template_render(self, context)
+    # Include/extends ke nested render dobara count na ho
+    metrics.template_depth += 1
+    started = time.perf_counter()
+    try:
+        return _original_template_render(self, context)
+    finally:
+        metrics.template_depth -= 1
+        if not metrics.template_depth:
+            metrics.template_time += time.perf_counter() - started
+
+
+def install_template_timer():
+    global _original_template_render
+    with _lock:
+        if _original_template_render is None:
+            _original_template_render = template_base.Template.render
+            template_base.Template.render = _timed_template_render
+
+
+def record(name, metrics):
+    with _lock:
+        row = _totals.setdefault(name, {
+            "name": name, "requests": 0, "queries": 0, "max_queries": 0,
+            "sql_time": 0.0, "template_time": 0.0, "wall_time": 0.0, "max_wall_time": 0.0,
+        })
+        row["requests"] += 1
+        row["queries"] += metrics.queries
+        row["max_queries"] = max(row["max_queries"], metrics.queries)
+        row["sql_time"] += metrics.sql_time
+        row["template_time"] += metrics.template_time
+        row["wall_time"] += metrics.wall_time
+        row["max_wall_time"] = max(row["max_wall_time"], metrics.wall_time)
+
+
+def metrics_summary():
+    """Per URL name averages (times in ms), slowest average wall time first."""
+    with _lock:
+        rows = [dict(row) for row in _totals.values()]
+    summary = []
+    for row in rows:
+        requests = row["requests"]
+        summary.append({
+            "name": row["name"],
+            "requests": requests,
+            "avg_queries": round(row["queries"] / requests, 1),
+            "max_queries": row["max_queries"],
+            "avg_sql_ms": round(row["sql_time"] * 1000 / requests, 2),
+            "avg_template_ms": round(row["template_time"] * 1000 / requests, 2),
+            "avg_wall_ms": round(row["wall_time"] * 1000 / requests, 2),
+            "max_wall_ms": round(row["max_wall_time"] * 1000, 2),
+        })
+    return sorted(summary, key=lambda row: -row["avg_wall_ms"])
+
+
+def reset_metrics():
+    with _lock:
+        _totals.clear()
+
+
+# ✅ Query budgets (settings.QUERY_BUDGETS maps URL names to a max query count)
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+@contextmanager
+def query_budget(budget, using=DEFAULT_DB_ALIAS, label="block"):
+    """Fail with the executed SQL when the block runs more than `budget` queries."""
+    with CaptureQueriesContext(connections[using]) as captured:
+        yield captured
+    if len(captured) > budget:
+        queries = "\n".join(f"{i}. {query['sql']}" for i, query in enumerate(captured.captured_queries, 1))
+        raise QueryBudgetExceeded(f"{label} ran {len(captured)} queries, budget is {budget}:\n{queries}")
+
+
+class QueryBudgetMixin:
+    """
+    TestCase mixin: self.assertQueryBudget("bus_list") requests the URL with
+    self.client and fails when it runs more queries than QUERY_BUDGETS allows.
+    """
+
+    def assertQueryBudget(self, url_name, *args, budget=None, data=None, **kwargs):
+        from django.conf import settings
+        from django.urls import reverse
+
+        if budget is None:
+            budget = settings.QUERY_BUDGETS[url_name]
+        with query_budget(budget, label=url_name):
+            response = self.client.get(reverse(url_name, args=args, kwargs=kwargs), data)
+        self.assertLess(response.status_code, 400)
+        return response
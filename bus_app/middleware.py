@@ -1,8 +1,13 @@
 # your_app/middleware.py
 from django.shortcuts import redirect
 from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from .metrics import collect_metrics, install_template_timer, record
+import logging
 import re
 
+logger = logging.getLogger(__name__)
+
 # ✅ Add all URLs you want to exempt from login here
 EXEMPT_URLS = [
     re.compile(settings.LOGIN_URL.lstrip('/')),  # /login/
@@ -11,6 +16,7 @@ EXEMPT_URLS = [
     re.compile('api/get-routes/?$'),
     re.compile('api/get-programs/?$'),
     re.compile('api/get-stoppages/?$'),
+    re.compile('api/catalog/?$'),
     re.compile('api/register-student/?$'),
     re.compile('success/?$'),
     re.compile('about/?$'),
@@ -33,3 +39,38 @@ class LoginRequiredMiddleware:
                 return redirect(settings.LOGIN_URL)
 
         return self.get_response(request)
+
+
+# ✅ Opt-in request metrics (settings.REQUEST_METRICS = True)
+class RequestMetricsMiddleware:
+    """
+    Records query count, SQL time, template render time and wall time of every
+    request per resolved URL name (see metrics.py), adds them to the response
+    as X-Query-Count / Server-Timing headers and logs views over their QUERY_BUDGETS.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_METRICS', False):
+            raise MiddlewareNotUsed
+        install_template_timer()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with collect_metrics() as metrics:
+            response = self.get_response(request)
+
+        match = getattr(request, 'resolver_match', None)
+        name = (match.view_name if match else None) or 'unresolved'
+        record(name, metrics)
+
+        response['X-Query-Count'] = str(metrics.queries)
+        response['Server-Timing'] = (
+            f'sql;dur={metrics.sql_time * 1000:.1f};desc="{metrics.queries} queries", '
+            f'tpl;dur={metrics.template_time * 1000:.1f}, '
+            f'total;dur={metrics.wall_time * 1000:.1f}'
+        )
+        budget = getattr(settings, 'QUERY_BUDGETS', {}).get(name)
+        if budget is not None and metrics.queries > budget:
+            response['X-Query-Budget-Exceeded'] = f"{metrics.queries}/{budget}"
+            logger.warning("%s ran %d queries (budget %d)", name, metrics.queries, budget)
+        return response
@@ -0,0 +1,64 @@
+# Generated by Django 5.1.5 on 2026-10-18 15:47
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def populate_seat_counts(apps, schema_editor):
+    Bus = apps.get_model("bus_app", "Bus")
+    Seat = apps.get_model("bus_app", "Seat")
+    rows = (
+        Seat.objects.order_by()
+        .values("bus_id")
+        .annotate(
+            seats_total=Count("id"),
+            seats_occupied=Count("id", filter=Q(student__isnull=False)),
+            seats_male=Count("id", filter=Q(student__gender="Male")),
+            seats_female=Count("id", filter=Q(student__gender="Female")),
+            seats_other=Count("id", filter=Q(student__gender="Other")),
+        )
+    )
+    fields = ["seats_total", "seats_occupied", "seats_male", "seats_female", "seats_other"]
+    counts = {row["bus_id"]: row for row in rows}
+    buses = list(Bus.objects.all())
+    for bus in buses:
+        row = counts.get(bus.pk, {})
+        for field in fields:
+            setattr(bus, field, row.get(field, 0))
+    Bus.objects.bulk_update(buses, fields, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bus_app", "0046_route_fare"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="bus",
+            name="seats_female",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="bus",
+            name="seats_male",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="bus",
+            name="seats_occupied",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="bus",
+            name="seats_other",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="bus",
+            name="seats_total",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_seat_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.1.5 on 2026-10-18 15:51
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bus_app", "0047_bus_seats_female_bus_seats_male_bus_seats_occupied_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OutboxMessage",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("subject", models.CharField(max_length=255)),
+                ("body", models.TextField()),
+                ("html", models.BooleanField(default=False)),
+                ("from_email", models.CharField(blank=True, max_length=254)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("notice", models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name="outbox_messages", to="bus_app.notice")),
+            ],
+        ),
+        migrations.CreateModel(
+            name="OutboxBatch",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("recipients", models.TextField()),
+                ("recipient_count", models.PositiveIntegerField(default=0)),
+                ("status", models.CharField(choices=[("pending", "Pending"), ("sending", "Sending"), ("sent", "Sent"), ("failed", "Failed")], default="pending", max_length=10)),
+                ("attempts", models.PositiveIntegerField(default=0)),
+                ("next_attempt_at", models.DateTimeField(default=django.utils.timezone.now)),
+                ("last_error", models.TextField(blank=True)),
+                ("sent_at", models.DateTimeField(blank=True, null=True)),
+                ("message", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="batches", to="bus_app.outboxmessage")),
+            ],
+            options={
+                "verbose_name_plural": "Outbox batches",
+                "indexes": [models.Index(fields=["status", "next_attempt_at"], name="bus_app_out_status_650feb_idx")],
+            },
+        ),
+    ]
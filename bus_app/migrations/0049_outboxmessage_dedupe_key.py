@@ -0,0 +1,18 @@
+# Generated by Django 5.1.5 on 2026-10-18 15:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bus_app", "0048_outboxmessage_outboxbatch"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="outboxmessage",
+            name="dedupe_key",
+            field=models.CharField(blank=True, db_index=True, max_length=100),
+        ),
+    ]
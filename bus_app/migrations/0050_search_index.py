@@ -0,0 +1,80 @@
+from django.db import migrations
+
+# Search index ka code yahan copy hai (aaj ke bus_app.search nahi), taaki ye migration
+# hamesha isi point ke historical models pe chale: yahan Student.program abhi text hai
+TABLE = "bus_app_search_index"
+KINDS = {"student": 1, "driver": 2, "bus": 3, "allotment": 4, "notice": 5}
+BATCH_SIZE = 2000
+
+
+def join_text(*parts):
+    return " ".join(str(part) for part in parts if part)
+
+
+def documents(apps):
+    """(kind, object id, document text) for every searchable object."""
+    model = lambda name: apps.get_model("bus_app", name)
+    for pk, *fields in model("Student").objects.values_list(
+        "pk", "name", "roll_number", "crm_id", "school__name", "program"
+    ).iterator(BATCH_SIZE):
+        yield "student", pk, join_text(*fields)
+    for pk, *fields in model("Driver").objects.values_list(
+        "pk", "name", "D_license_number", "contact_number"
+    ).iterator(BATCH_SIZE):
+        yield "driver", pk, join_text(*fields)
+
+    rows = model("Bus").objects.order_by("pk").values_list("pk", "number", "identifier_number", "allotments__route__name")
+    current, parts = None, []
+    for pk, number, identifier, route_name in rows.iterator(BATCH_SIZE):
+        if pk != current:
+            if current is not None:
+                yield "bus", current, join_text(*parts)
+            current, parts = pk, [number, identifier]
+        if route_name and route_name not in parts:
+            parts.append(route_name)
+    if current is not None:
+        yield "bus", current, join_text(*parts)
+
+    for pk, *fields in model("Allotment").objects.values_list(
+        "pk", "bus__number", "bus__identifier_number", "driver__name", "route__name"
+    ).iterator(BATCH_SIZE):
+        yield "allotment", pk, join_text(*fields)
+    for pk, message in model("Notice").objects.values_list("pk", "message").iterator(BATCH_SIZE):
+        yield "notice", pk, message
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    insert = f"INSERT INTO {TABLE}(rowid, body) VALUES (%s, %s)"
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5("
+            "body, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        )
+        cursor.execute(f"DELETE FROM {TABLE}")
+        batch = []
+        for kind, pk, body in documents(apps):
+            batch.append((pk * 8 + KINDS[kind], body))
+            if len(batch) >= BATCH_SIZE:
+                cursor.executemany(insert, batch)
+                batch = []
+        if batch:
+            cursor.executemany(insert, batch)
+        cursor.execute(f"INSERT INTO {TABLE}({TABLE}) VALUES ('optimize')")
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute("DROP TABLE IF EXISTS bus_app_search_index")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bus_app", "0049_outboxmessage_dedupe_key"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 5.1.5 on 2026-10-18 16:02
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import Count
+
+
+# Snapshot ka code yahan copy hai (aaj ke bus_app.reports nahi), taaki ye migration hamesha
+# isi point ke historical models pe chale: yahan Student.program abhi text hai
+GENDERS = ("Male", "Female", "Other")
+TOTALS = {"buses": "Bus", "routes": "Route", "students": "Student", "schools": "School", "drivers": "Driver"}
+# metric -> (counted model, group-by field, labelling model or None, label field)
+GROUPED = {
+    "gender": ("Student", "gender", None, None),
+    "buses_per_route": ("Allotment", "route_id", "Route", "name"),
+    "students_per_bus": ("Student", "assigned_bus_id", "Bus", "number"),
+    "students_per_route": ("Student", "route_id", "Route", "name"),
+    "students_per_school": ("Student", "school_id", "School", "name"),
+    "students_per_program": ("Student", "program", None, None),
+}
+
+
+def report_rows(apps):
+    """(metric, key, label, value) for every snapshot row."""
+    model = lambda name: apps.get_model("bus_app", name)
+    for key, model_name in TOTALS.items():
+        yield "totals", key, key.title(), model(model_name).objects.count()
+    for metric, (model_name, field, label_model_name, label_field) in GROUPED.items():
+        rows = model(model_name).objects.exclude(**{f"{field}__isnull": True})
+        counts = dict(rows.order_by().values_list(field).annotate(count=Count("pk")))
+        if label_model_name:
+            for pk, label in model(label_model_name).objects.values_list("pk", label_field):
+                yield metric, pk, label, counts.get(pk, 0)
+        elif metric == "gender":
+            for gender in GENDERS:
+                yield metric, gender, gender, counts.get(gender, 0)
+        else:
+            for value, count in counts.items():
+                if value:
+                    yield metric, value, value, count
+
+
+def populate_reports(apps, schema_editor):
+    ReportStat = apps.get_model("bus_app", "ReportStat")
+    now = django.utils.timezone.now()
+    ReportStat.objects.bulk_create(
+        [
+            ReportStat(metric=metric, key=str(key), label=str(label or "")[:255], value=value, updated_at=now)
+            for metric, key, label, value in report_rows(apps)
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bus_app", "0050_search_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ReportStat",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("metric", models.CharField(max_length=50)),
+                ("key", models.CharField(max_length=100)),
+                ("label", models.CharField(blank=True, max_length=255)),
+                ("value", models.PositiveIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                "constraints": [models.UniqueConstraint(fields=("metric", "key"), name="unique_report_stat")],
+            },
+        ),
+        migrations.RunPython(populate_reports, migrations.RunPython.noop),
+    ]
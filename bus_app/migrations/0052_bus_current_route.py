@@ -0,0 +1,28 @@
+# Generated by Django 5.1.5 on 2026-10-18 16:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def populate_current_routes(apps, schema_editor):
+    Bus = apps.get_model("bus_app", "Bus")
+    Allotment = apps.get_model("bus_app", "Allotment")
+    latest = Allotment.objects.filter(bus=OuterRef("pk")).order_by("-assigned_date", "-pk").values("route_id")[:1]
+    Bus.objects.update(current_route=Subquery(latest))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bus_app", "0051_reportstat"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="bus",
+            name="current_route",
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name="current_buses", to="bus_app.route"),
+        ),
+        migrations.RunPython(populate_current_routes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.5 on 2026-10-18 16:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bus_app', '0052_bus_current_route'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='student',
+            name='photo_medium',
+            field=models.ImageField(blank=True, editable=False, upload_to='student_photos/'),
+        ),
+        migrations.AddField(
+            model_name='student',
+            name='photo_thumbnail',
+            field=models.ImageField(blank=True, editable=False, upload_to='student_photos/'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.1.5 on 2026-10-18 17:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bus_app', '0053_student_photo_derivatives'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='allotment',
+            index=models.Index(fields=['assigned_date'], name='bus_app_all_assigne_dd87f1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='driver',
+            index=models.Index(fields=['name'], name='bus_app_dri_name_5908d9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feedback',
+            index=models.Index(fields=['submitted_at'], name='bus_app_fee_submitt_78c6ad_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notice',
+            index=models.Index(fields=['created_at'], name='bus_app_not_created_cd7e2e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notice',
+            index=models.Index(fields=['type'], name='bus_app_not_type_66b808_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reportstat',
+            index=models.Index(fields=['metric', 'label', 'key'], name='bus_app_rep_metric_2a5916_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='seat',
+            index=models.Index(fields=['bus', 'student'], name='bus_app_sea_bus_id_6a0d93_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['name'], name='bus_app_stu_name_f1f1e7_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['school', 'name'], name='bus_app_stu_school__c459ee_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['gender'], name='bus_app_stu_gender_a0af5c_idx'),
+        ),
+    ]
@@ -0,0 +1,185 @@
+# Generated by Django 5.1.5 on 2026-10-18 18:10
+
+import logging
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.utils import timezone
+
+BATCH_SIZE = 2000
+logger = logging.getLogger(__name__)
+
+
+class NameMatcher:
+    """
+    Stored Student.program / Student.stoppage text -> Program / Stoppage id. The old
+    forms stored the name, the str() ("Name (Parent)") or, for stoppages, the id.
+    Text that matches nothing gives None; no Program / Stoppage is made up for it.
+    """
+
+    def __init__(self, model, parent_field, match_ids=False):
+        self.model, self.parent_field, self.match_ids = model, parent_field, match_ids
+        self.exact, self.labelled, self.by_name, self.ids = {}, {}, {}, set()
+        for pk, parent_id, name, parent_name in model.objects.values_list(
+            "pk", f"{parent_field}_id", "name", f"{parent_field}__name"
+        ):
+            self.add(pk, parent_id, name, parent_name)
+
+    def add(self, pk, parent_id, name, parent_name=None):
+        self.exact[parent_id, name.lower()] = pk
+        if parent_name:
+            self.labelled[f"{name} ({parent_name})".lower()] = pk
+        self.by_name.setdefault(name.lower(), set()).add(pk)
+        self.ids.add(pk)
+
+    def match(self, parent_id, text):
+        key = text.lower()
+        pk = self.exact.get((parent_id, key)) or self.labelled.get(key)
+        if pk is None and self.match_ids and key.isdigit() and int(key) in self.ids:
+            pk = int(key)
+        if pk is None and parent_id is None and len(self.by_name.get(key, ())) == 1:
+            pk = next(iter(self.by_name[key]))  # School/route nahi, par naam sirf ek jagah hai
+        return pk
+
+
+def map_names_to_keys(apps, schema_editor):
+    Student = apps.get_model("bus_app", "Student")
+    matchers = {
+        "program": ("program_fk_id", "school_id", NameMatcher(apps.get_model("bus_app", "Program"), "school")),
+        "stoppage": ("stoppage_fk_id", "route_id", NameMatcher(apps.get_model("bus_app", "Stoppage"), "route", match_ids=True)),
+    }
+    unmatched = {}  # (field, text) -> student ids, FK NULL reh jaata hai
+
+    last_pk = 0
+    while True:
+        rows = list(
+            Student.objects.filter(pk__gt=last_pk).order_by("pk")
+            .values("pk", "school_id", "program", "route_id", "stoppage")[:BATCH_SIZE]
+        )
+        if not rows:
+            break
+        last_pk = rows[-1]["pk"]
+        # Har target id ke liye ek UPDATE ... WHERE id IN (...), row-by-row save nahi
+        targets = {}
+        for row in rows:
+            for field, (fk_field, parent_field, matcher) in matchers.items():
+                text = (row[field] or "").strip()
+                if not text:
+                    continue
+                target = matcher.match(row[parent_field], text)
+                if target is None:
+                    unmatched.setdefault((field, text), []).append(row["pk"])
+                else:
+                    targets.setdefault((fk_field, target), []).append(row["pk"])
+        for (fk_field, target), pks in targets.items():
+            Student.objects.filter(pk__in=pks).update(**{fk_field: target})
+
+    # Text column hat jaayega: jo match nahi hua wo yahan se haath se theek karna hai
+    for (field, text), pks in sorted(unmatched.items()):
+        logger.warning(
+            "Student.%s %r matches no %s, left empty for %d student(s): ids %s%s",
+            field, text, field.title(), len(pks), ", ".join(map(str, pks[:20])), " ..." if len(pks) > 20 else "",
+        )
+
+
+def map_keys_to_names(apps, schema_editor):
+    Student = apps.get_model("bus_app", "Student")
+    Program = apps.get_model("bus_app", "Program")
+    Stoppage = apps.get_model("bus_app", "Stoppage")
+    Student.objects.update(
+        program=Subquery(Program.objects.filter(pk=OuterRef("program_fk_id")).values("name")[:1]),
+        stoppage=Subquery(Stoppage.objects.filter(pk=OuterRef("stoppage_fk_id")).values("name")[:1]),
+    )
+
+
+# Search index / report snapshot ka code yahan copy hai (aaj ke bus_app.search/reports nahi),
+# taaki ye migration hamesha isi historical Student pe chale
+SEARCH_TABLE = "bus_app_search_index"
+STUDENT_KIND = 1  # rowid = student id * 8 + 1
+REPORT_LABELS = {  # metric -> (Student group-by field, labelling model, parent of the label)
+    "students_per_program": ("program_id", "Program", "school__name"),
+    "students_per_stoppage": ("stoppage_id", "Stoppage", "route__name"),
+}
+
+
+def reindex_students(apps, schema_editor):
+    # Student document me ab program ka naam FK se aata hai
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    Student = apps.get_model("bus_app", "Student")
+    rows = Student.objects.order_by("pk").values_list("pk", "name", "roll_number", "crm_id", "school__name", "program__name")
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+            "body, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        )
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid % 8 = {STUDENT_KIND}")
+        batch = []
+        for pk, *fields in rows.iterator(BATCH_SIZE):
+            batch.append((pk * 8 + STUDENT_KIND, " ".join(str(field) for field in fields if field)))
+            if len(batch) >= BATCH_SIZE:
+                cursor.executemany(f"INSERT INTO {SEARCH_TABLE}(rowid, body) VALUES (%s, %s)", batch)
+                batch = []
+        if batch:
+            cursor.executemany(f"INSERT INTO {SEARCH_TABLE}(rowid, body) VALUES (%s, %s)", batch)
+
+
+def rebuild_program_reports(apps, schema_editor):
+    # Purani students_per_program rows program ke text se keyed thi; ab id se, aur stoppage wali nayi
+    Student = apps.get_model("bus_app", "Student")
+    ReportStat = apps.get_model("bus_app", "ReportStat")
+    now = timezone.now()
+    ReportStat.objects.filter(metric__in=REPORT_LABELS).delete()
+    for metric, (field, label_model_name, parent) in REPORT_LABELS.items():
+        counts = dict(Student.objects.exclude(**{f"{field}__isnull": True}).order_by().values_list(field).annotate(count=Count("pk")))
+        owners = apps.get_model("bus_app", label_model_name).objects.values_list("pk", "name", parent)
+        ReportStat.objects.bulk_create(
+            [
+                ReportStat(metric=metric, key=str(pk), label=(f"{name} ({parent_name})" if parent_name else name)[:255],
+                           value=counts.get(pk, 0), updated_at=now)
+                for pk, name, parent_name in owners.iterator(BATCH_SIZE)
+            ],
+            batch_size=500,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bus_app", "0054_query_plan_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="student",
+            name="program_fk",
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name="students", to="bus_app.program"),
+        ),
+        migrations.AddField(
+            model_name="student",
+            name="stoppage_fk",
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name="students", to="bus_app.stoppage"),
+        ),
+        migrations.RunPython(map_names_to_keys, map_keys_to_names),
+        migrations.RemoveField(
+            model_name="student",
+            name="program",
+        ),
+        migrations.RemoveField(
+            model_name="student",
+            name="stoppage",
+        ),
+        migrations.RenameField(
+            model_name="student",
+            old_name="program_fk",
+            new_name="program",
+        ),
+        migrations.RenameField(
+            model_name="student",
+            old_name="stoppage_fk",
+            new_name="stoppage",
+        ),
+        migrations.RunPython(reindex_students, migrations.RunPython.noop),
+        migrations.RunPython(rebuild_program_reports, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.5 on 2026-10-18 17:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bus_app', '0055_student_program_stoppage_fk'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bus',
+            name='seats_version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.5 on 2026-10-18 17:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bus_app', '0057_catalogversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bus',
+            name='seats_left',
+            field=models.PositiveSmallIntegerField(default=2, editable=False),
+        ),
+        migrations.AddField(
+            model_name='bus',
+            name='seats_right',
+            field=models.PositiveSmallIntegerField(default=3, editable=False),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.1.5 on 2026-10-18 17:44
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def release_duplicate_keys(apps, schema_editor):
+    # Har key sirf apne sabse naye message pe rehti hai, purane messages key chhod dete hain
+    OutboxMessage = apps.get_model("bus_app", "OutboxMessage")
+    latest = OutboxMessage.objects.exclude(dedupe_key="").values("dedupe_key").annotate(latest=Max("pk")).values("latest")
+    OutboxMessage.objects.exclude(dedupe_key="").exclude(pk__in=latest).update(dedupe_key="")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bus_app', '0058_bus_seat_layout'),
+    ]
+
+    operations = [
+        migrations.RunPython(release_duplicate_keys, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='outboxmessage',
+            constraint=models.UniqueConstraint(condition=models.Q(('dedupe_key', ''), _negated=True), fields=('dedupe_key',), name='unique_outbox_dedupe_key'),
+        ),
+    ]
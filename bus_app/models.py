@@ -1,5 +1,6 @@
-from django.db import models
-from django.core.mail import send_mail
+from django.db import models, transaction
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.utils import timezone
 
 # ✅ School Model (With Programs in JSONField)
 
@@ -41,6 +42,9 @@ class Driver(models.Model):
     contact_number = models.CharField(max_length=15, unique=True)
     reference_by = models.CharField(max_length=50)
 
+    class Meta:
+        indexes = [models.Index(fields=['name'])]  # driver_list default sort + name dropdown
+
     def __str__(self):
         return self.name
 
@@ -70,21 +74,89 @@ class Bus(models.Model):
     # ✅ Route Assigned (Remove this field, as we are fetching from Allotment)
     # route = models.ForeignKey(Route, on_delete=models.SET_NULL, null=True, blank=True)
 
+    # ✅ Route of the latest Allotment (kept in sync by refresh_current_routes, never edit by hand)
+    current_route = models.ForeignKey(Route, on_delete=models.SET_NULL, null=True, blank=True, editable=False, related_name="current_buses")
+
+    # ✅ Seat occupancy counters (kept in sync by refresh_seat_counts, never edit by hand)
+    seats_total = models.PositiveIntegerField(default=0, editable=False)
+    seats_occupied = models.PositiveIntegerField(default=0, editable=False)
+    seats_male = models.PositiveIntegerField(default=0, editable=False)
+    seats_female = models.PositiveIntegerField(default=0, editable=False)
+    seats_other = models.PositiveIntegerField(default=0, editable=False)
+
+    # ✅ Seats left and right of the aisle in each row (set by seating.provision_seats from a layout, drawn by the chart)
+    seats_left = models.PositiveSmallIntegerField(default=2, editable=False)
+    seats_right = models.PositiveSmallIntegerField(default=3, editable=False)
+
+    # ✅ Bumped whenever the seating chart changes (seat_charts.invalidate_seat_charts); part of its cache key
+    seats_version = models.PositiveIntegerField(default=0, editable=False)
+
+    SEAT_COUNTER_FIELDS = ['seats_total', 'seats_occupied', 'seats_male', 'seats_female', 'seats_other']
+
     def get_route(self):
-        allotment = Allotment.objects.filter(bus=self).first()
-        return allotment.route if allotment else None
+        # select_related('current_route') ho to koi query nahi
+        return self.current_route
 
     def total_seats(self):
-        return self.seats.count()
+        return self.seats_total
 
     def occupied_seats(self):
-        return self.seats.filter(student__isnull=False).count()
+        return self.seats_occupied
 
     def vacant_seats(self):
-        return self.total_seats() - self.occupied_seats()
+        return self.seats_total - self.seats_occupied
+
+    @classmethod
+    def refresh_seat_counts(cls, bus_ids=None):
+        """
+        Recompute the seat counters of the given buses (all buses when None)
+        from a single grouped query over Seat.
+        """
+        seats = Seat.objects.all()
+        buses = cls.objects.all()
+        if bus_ids is not None:
+            bus_ids = {bus_id for bus_id in bus_ids if bus_id is not None}
+            if not bus_ids:
+                return
+            seats = seats.filter(bus_id__in=bus_ids)
+            buses = buses.filter(pk__in=bus_ids)
+
+        with transaction.atomic():
+            rows = seats.order_by().values('bus_id').annotate(
+                seats_total=Count('id'),
+                seats_occupied=Count('id', filter=Q(student__isnull=False)),
+                seats_male=Count('id', filter=Q(student__gender='Male')),
+                seats_female=Count('id', filter=Q(student__gender='Female')),
+                seats_other=Count('id', filter=Q(student__gender='Other')),
+            )
+            counts = {row['bus_id']: row for row in rows}
+
+            changed = []
+            for bus in buses.select_for_update().only('id', *cls.SEAT_COUNTER_FIELDS):
+                row = counts.get(bus.pk, {})
+                values = {field: row.get(field, 0) for field in cls.SEAT_COUNTER_FIELDS}
+                if any(getattr(bus, field) != value for field, value in values.items()):
+                    for field, value in values.items():
+                        setattr(bus, field, value)
+                    changed.append(bus)
+            if changed:
+                cls.objects.bulk_update(changed, cls.SEAT_COUNTER_FIELDS)
+
+    @classmethod
+    def refresh_current_routes(cls, bus_ids=None):
+        """Point current_route of the given buses (all when None) at the route of their latest Allotment, in one UPDATE."""
+        buses = cls.objects.all()
+        if bus_ids is not None:
+            bus_ids = {bus_id for bus_id in bus_ids if bus_id is not None}
+            if not bus_ids:
+                return
+            buses = buses.filter(pk__in=bus_ids)
+        latest = Allotment.objects.filter(bus=OuterRef('pk')).order_by('-assigned_date', '-pk').values('route_id')[:1]
+        buses.update(current_route=Subquery(latest))
 
     def __str__(self):
-        return f"{self.number} ({self.get_route().name if self.get_route() else 'No Route'})"
+        route = self.get_route()
+        return f"{self.number} ({route.name if route else 'No Route'})"
 
 # ✅ Seat Model
 class Seat(models.Model):
@@ -94,10 +166,10 @@ class Seat(models.Model):
 
     class Meta:
         unique_together = ('bus', 'seat_number')
+        indexes = [models.Index(fields=['bus', 'student'])]  # Vacant seats of a bus (student IS NULL)
 
     def get_route(self):
-        allotment = Allotment.objects.filter(bus=self.bus).first()
-        return allotment.route if allotment else "No Route"
+        return self.bus.get_route() or "No Route"
 
     def __str__(self):
         return f"Seat {self.seat_number} - {self.bus.number} ({self.get_route()})"
@@ -111,7 +183,7 @@ class Student(models.Model):
     gender = models.CharField(max_length=10, choices=[('Male', 'Male'), ('Female', 'Female'), ('Other', 'Other')], default="Male")
 
     school = models.ForeignKey(School, on_delete=models.SET_NULL, null=True, blank=True, related_name="students")
-    program = models.CharField(max_length=100, blank=True, null=True)  # Directly storing program name
+    program = models.ForeignKey(Program, on_delete=models.SET_NULL, null=True, blank=True, related_name="students")
 
     fee_paid = models.BooleanField(default=False)
     fee_amount = models.CharField(max_length=10, blank=True, null=True)
@@ -120,16 +192,38 @@ class Student(models.Model):
     contact_number = models.CharField(max_length=15, default="0000000000")
 
     route = models.ForeignKey(Route, on_delete=models.SET_NULL, null=True, blank=True, related_name="students")
-    stoppage = models.CharField(max_length=100, blank=True, null=True)  # Directly storing stoppage name
+    stoppage = models.ForeignKey(Stoppage, on_delete=models.SET_NULL, null=True, blank=True, related_name="students")
 
     assigned_bus = models.ForeignKey(Bus, null=True, blank=True, on_delete=models.SET_NULL, related_name="students")
     assigned_seat = models.ForeignKey(Seat, null=True, blank=True, on_delete=models.SET_NULL, related_name='students')
 
     photo = models.ImageField(upload_to="student_photos/", null=True, blank=True)
+    # ✅ Derivatives of photo (photos.py makes them in the background, never edit by hand)
+    photo_thumbnail = models.ImageField(upload_to="student_photos/", blank=True, editable=False)
+    photo_medium = models.ImageField(upload_to="student_photos/", blank=True, editable=False)
+
+    class Meta:
+        # student_list sort/filter/dropdowns and the gender report counts (program/stoppage FKs are indexed already)
+        indexes = [
+            models.Index(fields=['name']),
+            models.Index(fields=['school', 'name']),  # ?school_name= filter, still in name order
+            models.Index(fields=['gender']),
+        ]
 
     def __str__(self):
         return self.name
 
+    def photo_thumbnail_url(self):
+        # Derivative abhi bana nahi to original hi dikhao
+        if self.photo_thumbnail:
+            return self.photo_thumbnail.url
+        return self.photo.url if self.photo else ""
+
+    def photo_medium_url(self):
+        if self.photo_medium:
+            return self.photo_medium.url
+        return self.photo.url if self.photo else ""
+
 
     def save(self, *args, **kwargs):
         if not self.roll_number and not self.crm_id:
@@ -147,6 +241,9 @@ class Allotment(models.Model):
     route = models.ForeignKey(Route, on_delete=models.CASCADE, null=True, blank=True)
     stoppages = models.ManyToManyField(Stoppage)
 
+    class Meta:
+        indexes = [models.Index(fields=['assigned_date'])]  # allotment_list / reports, latest first
+
     def __str__(self):
         return f"Bus {self.bus.number} -> Driver {self.driver.name} - {self.route.name}"
 
@@ -165,14 +262,20 @@ class Notice(models.Model):
     message = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [models.Index(fields=['created_at']), models.Index(fields=['type'])]  # notice_list sorts
+
     def __str__(self):
         return f"Notice for {self.get_type_display()}"
 
     def send_notice(self):
         """
-        🚀 Send notice email to related students
+        🚀 Queue the notice email for the related students.
+        The send_outbox worker delivers it in BCC batches, so this returns immediately.
         """
-        students = []
+        from .outbox import queue_email
+
+        students = Student.objects.none()
 
         if self.type == "Bus" and self.bus:
             students = Student.objects.filter(assigned_bus=self.bus)
@@ -183,22 +286,94 @@ class Notice(models.Model):
         elif self.type == "All":
             students = Student.objects.all()
 
-        email_list = [student.email for student in students if student.email]
+        email_list = students.exclude(email="").values_list("email", flat=True)
 
-        if email_list:
-            send_mail(
-                subject="🚍 Important Transport Notice 🚍",
-                message=self.message,
-                from_email="universityitm698@gmail.com",
-                recipient_list=email_list,
-                fail_silently=True,
-            )
+        return queue_email(
+            subject="🚍 Important Transport Notice 🚍",
+            body=self.message,
+            recipients=email_list.iterator(),
+            notice=self,
+        )
 
 class Feedback(models.Model):
     bus = models.ForeignKey(Bus, on_delete=models.CASCADE, null=True, blank=True)
     message = models.TextField()
     submitted_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [models.Index(fields=['submitted_at'])]  # feedback_list, latest first
+
     def __str__(self):
         return f"Feedback - Bus {self.bus.identifier_number if self.bus else 'Unknown'}"
 
+
+
+# ✅ Email Outbox (delivered later by the send_outbox worker)
+class OutboxMessage(models.Model):
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html = models.BooleanField(default=False)
+    from_email = models.CharField(max_length=254, blank=True)
+    notice = models.ForeignKey(Notice, on_delete=models.SET_NULL, null=True, blank=True, related_name="outbox_messages")
+    dedupe_key = models.CharField(max_length=100, blank=True, db_index=True)  # Same key within the window is queued once
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        # Ek key ka ek hi live message; window ke bahar wala message apni key chhod deta hai
+        constraints = [
+            models.UniqueConstraint(fields=['dedupe_key'], condition=~Q(dedupe_key=''), name='unique_outbox_dedupe_key'),
+        ]
+
+    def __str__(self):
+        return self.subject
+
+class OutboxBatch(models.Model):
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    )
+
+    message = models.ForeignKey(OutboxMessage, on_delete=models.CASCADE, related_name="batches")
+    recipients = models.TextField()  # One email address per line, sent as BCC
+    recipient_count = models.PositiveIntegerField(default=0)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'next_attempt_at'])]
+        verbose_name_plural = "Outbox batches"
+
+    def recipient_list(self):
+        return [email for email in self.recipients.splitlines() if email]
+
+    def __str__(self):
+        return f"{self.message.subject} ({self.recipient_count} recipients, {self.get_status_display()})"
+
+
+# ✅ Reporting snapshot (kept up to date by reports.py, read by reports_view)
+class ReportStat(models.Model):
+    metric = models.CharField(max_length=50)
+    key = models.CharField(max_length=100)
+    label = models.CharField(max_length=255, blank=True)
+    value = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['metric', 'key'], name='unique_report_stat')]
+        indexes = [models.Index(fields=['metric', 'label', 'key'])]  # reports_view reads them in this order
+
+    def __str__(self):
+        return f"{self.metric}: {self.label or self.key} = {self.value}"
+
+
+# ✅ Catalog version (bumped by catalog.py on every School/Program/Route/Stoppage change, one row)
+class CatalogVersion(models.Model):
+    version = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"Catalog v{self.version}"
@@ -0,0 +1,258 @@
+import math
+import time
+from datetime import timedelta
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import IntegrityError, transaction
+from django.db.models import Q, Sum
+from django.template.loader import get_template
+from django.utils import timezone
+
+from .models import OutboxBatch, OutboxMessage
+
+# ✅ Outbox tuning defaults (override with OUTBOX_* in settings.py)
+DEFAULTS = {
+    "BATCH_SIZE": 50,  # BCC recipients per email
+    "SEND_INTERVAL": 1.0,  # seconds between two batches
+    "MAX_ATTEMPTS": 5,
+    "RETRY_BACKOFF": 60,  # seconds, doubled after every failure
+    "DEDUPE_WINDOW": 600,  # seconds in which the same dedupe_key is queued only once
+}
+LEASE = timedelta(minutes=10)  # a batch stuck in "sending" this long is picked up again
+
+
+def outbox_setting(name):
+    return getattr(settings, f"OUTBOX_{name}", DEFAULTS[name])
+
+
+def release_stale_keys(keys):
+    """
+    Free dedupe keys whose message is older than OUTBOX_DEDUPE_WINDOW, so the
+    unique constraint only blocks a key while it is still inside the window.
+    """
+    since = timezone.now() - timedelta(seconds=outbox_setting("DEDUPE_WINDOW"))
+    for start in range(0, len(keys), 500):
+        OutboxMessage.objects.filter(dedupe_key__in=keys[start:start + 500], created_at__lt=since).update(dedupe_key="")
+
+
+def queue_email(subject, body, recipients, html=False, notice=None, from_email=None, dedupe_key=""):
+    """
+    Store an email in the outbox, split into BCC batches of OUTBOX_BATCH_SIZE recipients.
+    Returns the OutboxMessage, or None when there is nobody to send to or a message
+    with the same dedupe_key was queued within OUTBOX_DEDUPE_WINDOW.
+    """
+    batch_size = outbox_setting("BATCH_SIZE")
+    seen = set()
+    batches = []
+    chunk = []
+    for email in recipients:
+        email = (email or "").strip()
+        if not email or email.lower() in seen:
+            continue
+        seen.add(email.lower())
+        chunk.append(email)
+        if len(chunk) == batch_size:
+            batches.append(chunk)
+            chunk = []
+    if chunk:
+        batches.append(chunk)
+    if not batches:
+        return None
+
+    with transaction.atomic():
+        if dedupe_key:
+            release_stale_keys([dedupe_key])
+        try:
+            # Savepoint: dusre sender ne same key pehle insert kar di to unique constraint rok deta hai
+            with transaction.atomic():
+                message = OutboxMessage.objects.create(
+                    subject=subject,
+                    body=body,
+                    html=html,
+                    from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+                    notice=notice,
+                    dedupe_key=dedupe_key,
+                )
+        except IntegrityError:
+            return None
+        OutboxBatch.objects.bulk_create(
+            [OutboxBatch(message=message, recipients="\n".join(chunk), recipient_count=len(chunk)) for chunk in batches],
+            batch_size=500,
+        )
+    return message
+
+
+@lru_cache(maxsize=None)
+def _cached_template(name):
+    return get_template(name)
+
+
+def compiled_template(name):
+    # Production me template ek hi baar parse hota hai; DEBUG me har baar loader se taaki edit turant dikhe
+    if settings.DEBUG:
+        return get_template(name)
+    return _cached_template(name)
+
+
+def seat_allotment_email(student, seat):
+    """(subject, html body, dedupe key) of the seat confirmation email."""
+    bus = seat.bus
+    body = compiled_template("emails/seat_allotment.html").render({
+        "student": student,
+        "seat": seat,
+        "bus": bus,
+        "route": bus.get_route(),
+    })
+    return f"Bus Seat Allotment Confirmation for {student.name}", body, f"seat-allotment:{student.pk}:{seat.pk}"
+
+
+def queue_seat_allotment_email(student, seat):
+    """Queue the seat confirmation email; the view and the Seat signal share one dedupe key."""
+    subject, body, dedupe_key = seat_allotment_email(student, seat)
+    return queue_email(subject=subject, body=body, recipients=[student.email], html=True, dedupe_key=dedupe_key)
+
+
+def queue_seat_allotment_emails(placements):
+    """
+    Queue the seat confirmation email for many (student, seat) pairs with two
+    bulk_creates instead of a few queries per student. Pairs queued within
+    OUTBOX_DEDUPE_WINDOW are skipped, like queue_email(). Returns the number queued.
+    """
+    placements = [(student, seat) for student, seat in placements if student.email]
+    keys = [f"seat-allotment:{student.pk}:{seat.pk}" for student, seat in placements]
+    release_stale_keys(keys)
+    recent = set()
+    for start in range(0, len(keys), 500):
+        recent.update(OutboxMessage.objects.filter(
+            dedupe_key__in=keys[start:start + 500]
+        ).values_list("dedupe_key", flat=True))
+
+    messages, recipients = [], []
+    for student, seat in placements:
+        subject, body, dedupe_key = seat_allotment_email(student, seat)
+        if dedupe_key in recent:
+            continue
+        messages.append(OutboxMessage(
+            subject=subject, body=body, html=True, from_email=settings.DEFAULT_FROM_EMAIL, dedupe_key=dedupe_key,
+        ))
+        recipients.append(student.email)
+
+    try:
+        with transaction.atomic():
+            messages = OutboxMessage.objects.bulk_create(messages, batch_size=500)
+            OutboxBatch.objects.bulk_create(
+                [OutboxBatch(message=message, recipients=email, recipient_count=1) for message, email in zip(messages, recipients)],
+                batch_size=500,
+            )
+    except IntegrityError:
+        # Beech me kisi aur ne inme se koi key queue kar di: ek-ek karke, wo wali skip ho jayegi
+        return sum(
+            queue_email(subject=message.subject, body=message.body, recipients=[email], html=True, dedupe_key=message.dedupe_key)
+            is not None
+            for message, email in zip(messages, recipients)
+        )
+    return len(messages)
+
+
+def due_batches(now=None):
+    now = now or timezone.now()
+    return OutboxBatch.objects.filter(
+        Q(status="pending") | Q(status="sending"), next_attempt_at__lte=now
+    ).order_by("next_attempt_at", "id")
+
+
+def claim(batch, now):
+    """Mark a due batch as being sent; False if another worker got it first."""
+    return OutboxBatch.objects.filter(
+        Q(status="pending") | Q(status="sending"), pk=batch.pk, next_attempt_at__lte=now
+    ).update(status="sending", next_attempt_at=now + LEASE) == 1
+
+
+def build_email(batch, connection):
+    message = batch.message
+    email = EmailMessage(
+        subject=message.subject,
+        body=message.body,
+        from_email=message.from_email or settings.DEFAULT_FROM_EMAIL,
+        to=[message.from_email or settings.DEFAULT_FROM_EMAIL],
+        bcc=batch.recipient_list(),
+        connection=connection,
+    )
+    if message.html:
+        email.content_subtype = "html"
+    return email
+
+
+def deliver_due_batches(limit=None, connection=None, sleep=time.sleep):
+    """
+    Send every due outbox batch over one reused mail connection, waiting
+    OUTBOX_SEND_INTERVAL seconds between batches. Failed batches are retried with
+    exponential backoff and marked failed after OUTBOX_MAX_ATTEMPTS.
+    Returns a dict with the number of sent, retried and failed batches.
+    """
+    stats = {"sent": 0, "retry": 0, "failed": 0}
+    send_interval = outbox_setting("SEND_INTERVAL")
+    max_attempts = outbox_setting("MAX_ATTEMPTS")
+    retry_backoff = outbox_setting("RETRY_BACKOFF")
+    # List bana lo, SQLite me open cursor ke saath same table update karna safe nahi
+    batches = list(due_batches().select_related("message")[:limit or 500])
+
+    connection = connection or get_connection(fail_silently=False)
+    first = True
+    try:
+        for batch in batches:
+            now = timezone.now()
+            if not claim(batch, now):
+                continue
+            if not first and send_interval:
+                sleep(send_interval)
+            first = False
+
+            attempts = batch.attempts + 1
+            try:
+                connection.open()  # Already open ho to wahi SMTP session reuse hota hai
+                build_email(batch, connection).send()
+            except Exception as e:
+                connection.close()  # Broken SMTP session ko agle batch ke liye reopen karo
+                if attempts >= max_attempts:
+                    status, next_attempt_at = "failed", now
+                    stats["failed"] += 1
+                else:
+                    status = "pending"
+                    next_attempt_at = timezone.now() + timedelta(seconds=retry_backoff * 2 ** (attempts - 1))
+                    stats["retry"] += 1
+                OutboxBatch.objects.filter(pk=batch.pk).update(
+                    status=status, attempts=attempts, next_attempt_at=next_attempt_at, last_error=str(e)[:2000]
+                )
+            else:
+                OutboxBatch.objects.filter(pk=batch.pk).update(
+                    status="sent", attempts=attempts, sent_at=timezone.now(), last_error=""
+                )
+                stats["sent"] += 1
+    finally:
+        connection.close()
+    return stats
+
+
+def outbox_stats(sample=500):
+    """Queue depth and send latency (queued -> sent) of the most recent `sample` sent batches."""
+    now = timezone.now()
+    waiting = OutboxBatch.objects.filter(status__in=["pending", "sending"])
+    oldest = waiting.order_by("message__created_at").values_list("message__created_at", flat=True).first()
+
+    latencies = sorted(
+        (sent_at - created_at).total_seconds()
+        for sent_at, created_at in OutboxBatch.objects.filter(status="sent")
+        .order_by("-sent_at").values_list("sent_at", "message__created_at")[:sample]
+    )
+    return {
+        "pending_batches": waiting.count(),
+        "pending_recipients": waiting.aggregate(total=Sum("recipient_count"))["total"] or 0,
+        "failed_batches": OutboxBatch.objects.filter(status="failed").count(),
+        "oldest_pending_age": round((now - oldest).total_seconds(), 1) if oldest else 0,
+        "latency_avg": round(sum(latencies) / len(latencies), 2) if latencies else None,
+        "latency_p95": latencies[math.ceil(len(latencies) * 0.95) - 1] if latencies else None,
+        "latency_sample": len(latencies),
+    }
@@ -0,0 +1,293 @@
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadhandler import SkipFile, TemporaryFileUploadHandler
+from django.db import close_old_connections, transaction
+from django.template.defaultfilters import filesizeformat
+from PIL import features, Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# ✅ Student photo derivatives: a small square thumbnail (lists/admin) and a medium
+# image (detail page), generated once per upload and stored next to the original
+# as "<name>.thumb.webp" / "<name>.medium.webp".
+DERIVATIVES = {
+    "photo_thumbnail": ("thumb", (96, 96), True),  # 2x of the 48-50px list previews, cropped square
+    "photo_medium": ("medium", (480, 480), False),  # fits inside, aspect ratio kept
+}
+WEBP = features.check("webp")
+FORMAT, EXTENSION, SAVE_OPTIONS = (
+    ("WEBP", "webp", {"quality": 80, "method": 4}) if WEBP
+    else ("JPEG", "jpg", {"quality": 82, "optimize": True, "progressive": True})
+)
+
+# ✅ Upload limits for register_student (override with PHOTO_* in settings.py)
+DEFAULTS = {
+    "WORKERS": 2,  # background processes, 0 = do the work inline
+    "MAX_UPLOAD_SIZE": 10 * 1024 * 1024,  # bytes accepted from the browser
+    "MAX_PIXELS": 40_000_000,  # width x height, rejects decompression bombs before decoding
+    "MAX_DIMENSION": 1600,  # longest side of the stored photo
+    "MAX_BYTES": 400 * 1024,  # stored photo size, JPEG quality is lowered until it fits
+}
+STAGED_PREFIX = "student_photos/uploads/"  # uploads not normalized yet
+UPLOAD_FORMATS = {"JPEG", "MPO", "PNG", "WEBP", "GIF", "BMP", "TIFF"}
+STORED_QUALITIES = (85, 78, 70, 60, 50)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+class PhotoRejected(ValueError):
+    pass
+
+
+def photo_setting(name):
+    return getattr(settings, f"PHOTO_{name}", DEFAULTS[name])
+
+
+def derivative_name(name, suffix):
+    return f"{os.path.splitext(name)[0]}.{suffix}.{EXTENSION}"
+
+
+def _encode(image):
+    if FORMAT == "JPEG" and image.mode != "RGB":
+        image = image.convert("RGB")
+    elif image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+    out = io.BytesIO()
+    image.save(out, FORMAT, **SAVE_OPTIONS)
+    return out.getvalue()
+
+
+def _load(file, max_size):
+    """Open an image file at (at least) max_size, upright per its EXIF orientation."""
+    with Image.open(file) as image:
+        # JPEG ko DCT scaling se chhota decode karo, poora 12MP decode nahi
+        image.draft("RGB", max_size)
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    return image
+
+
+def _save_derivatives(image, name):
+    largest = max(size for _, size, _ in DERIVATIVES.values())
+    # Ek baar sabse bade size tak chhota karo, baaki sizes usi se
+    image = image.copy()
+    image.thumbnail(largest, Image.Resampling.LANCZOS, reducing_gap=3.0)
+    names = {}
+    for field, (suffix, size, crop) in DERIVATIVES.items():
+        if crop:
+            resized = ImageOps.fit(image, size, Image.Resampling.LANCZOS)
+        else:
+            resized = image.copy()
+            resized.thumbnail(size, Image.Resampling.LANCZOS)
+        target = derivative_name(name, suffix)
+        default_storage.delete(target)  # Same naam rahe, storage _abc123 suffix na lagaye
+        names[field] = default_storage.save(target, ContentFile(_encode(resized)))
+    return names
+
+
+def make_derivatives(name):
+    """
+    Render every DERIVATIVES size of the stored photo `name` and save them to
+    default_storage. Returns {field: stored name}, or None if it is not an image.
+    Runs in the worker processes, so it only touches files, never the database.
+    """
+    largest = max(size for _, size, _ in DERIVATIVES.values())
+    try:
+        with default_storage.open(name, "rb") as file:
+            image = _load(file, largest)
+    except (OSError, Image.DecompressionBombError, SyntaxError, ValueError) as e:
+        logger.warning("Cannot make derivatives of %s: %s", name, e)
+        return None
+    return _save_derivatives(image, name)
+
+
+def init_worker():
+    # spawn/forkserver wale worker me Django setup nahi hota
+    import django
+
+    django.setup()
+
+
+def photo_pool():
+    """Shared process pool (PHOTO_WORKERS processes); None means generate inline."""
+    global _pool
+    workers = photo_setting("WORKERS")
+    if not workers:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=workers, initializer=init_worker)
+        return _pool
+
+
+def store_derivatives(student_id, name, names):
+    """Save the derivative names, unless the student's photo changed meanwhile."""
+    from .models import Student
+
+    if names:
+        Student.objects.filter(pk=student_id, photo=name).update(**names)
+
+
+def _on_pool_thread(store, *args):
+    """
+    Run a done-callback's ORM write. It runs on the pool's own thread, outside any
+    request, so its connection is closed here like request_started/finished would.
+    """
+    close_old_connections()
+    try:
+        store(*args)
+    finally:
+        close_old_connections()
+
+
+def _stored(student_id, name):
+    def callback(future):
+        try:
+            _on_pool_thread(store_derivatives, student_id, name, future.result())
+        except Exception:
+            logger.exception("Photo derivatives of student %s failed", student_id)
+    return callback
+
+
+def queue_photo_derivatives(student_id, name):
+    """Generate the derivatives of a newly uploaded photo in the background pool."""
+    pool = photo_pool()
+    if pool is None:
+        store_derivatives(student_id, name, make_derivatives(name))
+        return
+    pool.submit(make_derivatives, name).add_done_callback(_stored(student_id, name))
+
+
+# ✅ Upload normalization: the request only checks the header and stores the
+# spooled file under MEDIA_ROOT as the photo; decoding, resizing and re-encoding
+# happen in the pool.
+class CappedUploadHandler(TemporaryFileUploadHandler):
+    """Spools uploads to a temp file and stops reading a file once it passes PHOTO_MAX_UPLOAD_SIZE."""
+
+    too_large = False
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > photo_setting("MAX_UPLOAD_SIZE"):
+            self.too_large = True
+            raise SkipFile()
+        return super().receive_data_chunk(raw_data, start)
+
+
+def upload_too_large_message():
+    return f"Photo is larger than {filesizeformat(photo_setting('MAX_UPLOAD_SIZE'))}."
+
+
+def check_upload(upload):
+    """Reject uploads over the size cap or that are not a supported image; reads only the header."""
+    if upload.size > photo_setting("MAX_UPLOAD_SIZE"):
+        raise PhotoRejected(upload_too_large_message())
+    try:
+        with Image.open(upload) as image:
+            image_format, (width, height) = image.format, image.size
+    except (OSError, Image.DecompressionBombError, SyntaxError, ValueError):
+        raise PhotoRejected("Photo is not a valid image.")
+    finally:
+        upload.seek(0)
+    if image_format not in UPLOAD_FORMATS:
+        raise PhotoRejected(f"Photo format {image_format} is not supported, upload a JPEG or PNG.")
+    if width * height > photo_setting("MAX_PIXELS"):
+        raise PhotoRejected("Photo resolution is too large.")
+
+
+def stage_upload(upload):
+    """
+    Save the check_upload()ed file as-is under MEDIA_ROOT (STAGED_PREFIX)
+    and return its storage name; a spooled temp file is moved, not copied.
+    """
+    stem, extension = os.path.splitext(os.path.basename(upload.name))
+    return default_storage.save(f"{STAGED_PREFIX}{stem or 'photo'}{extension.lower()}", upload)
+
+
+def normalize_photo(name):
+    """
+    Worker job: decode the staged upload `name`, apply its EXIF orientation, shrink
+    it to PHOTO_MAX_DIMENSION and re-encode it as a JPEG without any metadata,
+    lowering the quality until it is under PHOTO_MAX_BYTES. Saves the photo and
+    its derivatives and returns {field: stored name}, or None if it cannot be read.
+    The staged file is left alone; store_normalized_photo removes it.
+    """
+    max_dimension = photo_setting("MAX_DIMENSION")
+    try:
+        with default_storage.open(name, "rb") as file:
+            image = _load(file, (max_dimension, max_dimension))
+    except (OSError, Image.DecompressionBombError, SyntaxError, ValueError) as e:
+        logger.warning("Cannot normalize uploaded photo %s: %s", name, e)
+        return None
+
+    image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS, reducing_gap=3.0)
+    if image.mode != "RGB":
+        # Transparent PNG ka background white
+        background = Image.new("RGB", image.size, "white")
+        background.paste(image, mask=image.convert("RGBA").getchannel("A"))
+        image = background
+    for quality in STORED_QUALITIES:
+        out = io.BytesIO()
+        image.save(out, "JPEG", quality=quality, optimize=True, progressive=True)  # exif= nahi diya, metadata hat jaata hai
+        if out.tell() <= photo_setting("MAX_BYTES"):
+            break
+
+    stem = os.path.splitext(os.path.basename(name))[0] or "photo"
+    stored = default_storage.save(f"student_photos/{stem}.jpg", ContentFile(out.getvalue()))
+    return {"photo": stored, **_save_derivatives(image, stored)}
+
+
+def rebuild_photo(name):
+    """
+    Worker job of build_photo_derivatives: normalize a photo still staged under
+    STAGED_PREFIX (its upload was interrupted), otherwise only redo its derivatives.
+    """
+    if name.startswith(STAGED_PREFIX):
+        return normalize_photo(name)
+    return make_derivatives(name)
+
+
+def store_normalized_photo(student_id, staged, names):
+    from .models import Student
+
+    # Beech me kisi ne photo badal di ho to usko overwrite nahi karna
+    if names and Student.objects.filter(pk=student_id, photo=staged).update(**names):
+        default_storage.delete(staged)
+
+
+def queue_photo_upload(student_id, upload):
+    """
+    Store an already check_upload()ed file as the student's photo right away and
+    replace it with the normalized photo and its derivatives in the background
+    once the student row is committed. If the worker never finishes (restart,
+    crash) the student keeps the staged original until build_photo_derivatives
+    normalizes it.
+    """
+    from .models import Student
+
+    staged = stage_upload(upload)
+    # update(): post_save derivatives signal nahi chalna, normalize_photo derivatives bhi banata hai
+    Student.objects.filter(pk=student_id).update(photo=staged)
+
+    def submit():
+        pool = photo_pool()
+        if pool is None:
+            store_normalized_photo(student_id, staged, normalize_photo(staged))
+            return
+
+        def stored(future):
+            try:
+                _on_pool_thread(store_normalized_photo, student_id, staged, future.result())
+            except Exception:
+                logger.exception("Photo upload of student %s failed", student_id)
+
+        pool.submit(normalize_photo, staged).add_done_callback(stored)
+
+    transaction.on_commit(submit)
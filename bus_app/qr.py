@@ -0,0 +1,114 @@
+import hashlib
+import io
+
+import qrcode
+import qrcode.image.svg
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+
+# ✅ QR codes, generated once per (data, parameters) and cached under a hash of
+# exactly those inputs. The hash is also the ETag, so a revalidation (304) is
+# answered without rendering or even reading the cache.
+DEFAULTS = {
+    "TARGET_URL": "https://kanhaiyasoni.pythonanywhere.com/about/",  # what /generate-qr/ encodes
+    "SITE_URL": "https://kanhaiyasoni.pythonanywhere.com",  # prefix of the per-bus feedback links
+    "FORMAT": "png",  # png or svg
+    "BOX_SIZE": 10,  # pixels per module (PNG)
+    "BORDER": 4,  # quiet zone, in modules
+    "ERROR_CORRECTION": "M",  # L, M, Q or H
+    "MAX_AGE": 30 * 24 * 60 * 60,  # Cache-Control max-age, seconds
+    "CACHE_TIMEOUT": 7 * 24 * 60 * 60,  # server cache, seconds
+}
+ERROR_CORRECTIONS = {
+    "L": qrcode.constants.ERROR_CORRECT_L,
+    "M": qrcode.constants.ERROR_CORRECT_M,
+    "Q": qrcode.constants.ERROR_CORRECT_Q,
+    "H": qrcode.constants.ERROR_CORRECT_H,
+}
+CONTENT_TYPES = {"png": "image/png", "svg": "image/svg+xml"}
+MAX_BOX_SIZE = 40
+MAX_BORDER = 20
+
+
+def qr_setting(name):
+    return getattr(settings, f"QR_{name}", DEFAULTS[name])
+
+
+class QROptions:
+    """Validated encoding parameters; from_query() takes overrides from ?format=&size=&border=&ec=."""
+
+    def __init__(self, format=None, box_size=None, border=None, error_correction=None):
+        self.format = (format or qr_setting("FORMAT")).lower()
+        try:
+            self.box_size = int(qr_setting("BOX_SIZE") if box_size is None else box_size)
+            self.border = int(qr_setting("BORDER") if border is None else border)
+        except (TypeError, ValueError):
+            raise ValueError("QR size and border must be whole numbers.")
+        self.error_correction = (error_correction or qr_setting("ERROR_CORRECTION")).upper()
+        if self.format not in CONTENT_TYPES:
+            raise ValueError(f"Unsupported QR format {self.format!r}, use png or svg.")
+        if not 1 <= self.box_size <= MAX_BOX_SIZE:
+            raise ValueError(f"QR size must be between 1 and {MAX_BOX_SIZE}.")
+        if not 0 <= self.border <= MAX_BORDER:
+            raise ValueError(f"QR border must be between 0 and {MAX_BORDER}.")
+        if self.error_correction not in ERROR_CORRECTIONS:
+            raise ValueError("QR error correction must be L, M, Q or H.")
+
+    @classmethod
+    def from_query(cls, query):
+        return cls(query.get("format"), query.get("size"), query.get("border"), query.get("ec"))
+
+    @property
+    def content_type(self):
+        return CONTENT_TYPES[self.format]
+
+    def digest(self, data):
+        """Content address of the image for `data`: same inputs -> same bytes -> same hash."""
+        key = "\n".join(["qr-v1", self.format, str(self.box_size), str(self.border), self.error_correction, data])
+        return hashlib.sha256(key.encode()).hexdigest()
+
+
+def render_qr(data, options):
+    """Encode `data` as PNG or SVG bytes."""
+    qr = qrcode.QRCode(
+        error_correction=ERROR_CORRECTIONS[options.error_correction],
+        box_size=options.box_size,
+        border=options.border,
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+    out = io.BytesIO()
+    if options.format == "svg":
+        qr.make_image(image_factory=qrcode.image.svg.SvgPathImage).save(out)
+    else:
+        qr.make_image().save(out)  # 1-bit PNG
+    return out.getvalue()
+
+
+def qr_image(data, options=None):
+    """(image bytes, digest) for `data`, rendered only on a cache miss."""
+    options = options or QROptions()
+    digest = options.digest(data)
+    key = f"qr:{digest}"
+    body = cache.get(key)
+    if body is None:
+        body = render_qr(data, options)
+        cache.set(key, body, qr_setting("CACHE_TIMEOUT"))
+    return body, digest
+
+
+def qr_response(request, data, options=None):
+    """QR image response with a strong ETag and long Cache-Control; 304 when the client already has it."""
+    options = options or QROptions()
+    etag = '"%s"' % options.digest(data)[:32]
+    client_etags = parse_etags(request.headers.get("If-None-Match", ""))
+    if etag in client_etags or "*" in client_etags:
+        response = HttpResponseNotModified()
+    else:
+        body, _ = qr_image(data, options)
+        response = HttpResponse(body, content_type=options.content_type)
+    response["ETag"] = etag
+    response["Cache-Control"] = f"public, max-age={qr_setting('MAX_AGE')}"
+    return response
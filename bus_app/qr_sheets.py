@@ -0,0 +1,175 @@
+import io
+import os
+import zipfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
+from urllib.parse import urlencode
+
+from django.core.cache import cache
+from django.urls import reverse
+from PIL import features, Image, ImageDraw, ImageFont
+
+from .models import Bus
+from .photos import init_worker
+from .qr import QROptions, qr_setting, render_qr
+
+# ✅ Printable per-bus feedback QR codes: each bus gets a card with its own
+# /feedback/?bus=<identifier_number> link, laid out on A4 pages of a PDF.
+DPI = 200
+PAGE_SIZE = (1654, 2339)  # A4 at 200 dpi
+PAGE_MARGIN = 60
+GRIDS = {1: (1, 1), 2: (1, 2), 4: (2, 2), 6: (2, 3), 8: (2, 4)}  # cards per page -> (columns, rows)
+QUIET_ZONE = 4  # modules of white around the printed code
+PDF_CHUNK = 50  # pages held in memory (~0.5 MB each bilevel) before Pillow appends them to the PDF
+# Bilevel pages are stored losslessly as CCITT G4 (needs libtiff), grayscale ones would become JPEG
+PAGE_MODE = "1" if features.check("libtiff") else "L"
+
+
+def bus_feedback_url(identifier_number, site_url=None):
+    site_url = (site_url or qr_setting("SITE_URL")).rstrip("/")
+    return f"{site_url}{reverse('feedback_form')}?{urlencode({'bus': identifier_number})}"
+
+
+def bus_cards(buses, site_url=None):
+    """One card dict per bus that has an identifier_number (the feedback form selects buses by it)."""
+    rows = Bus.objects.filter(pk__in=[bus.pk if isinstance(bus, Bus) else bus for bus in buses]) \
+        if buses is not None else Bus.objects.all()
+    rows = rows.exclude(identifier_number__isnull=True).exclude(identifier_number="")
+    return [
+        {"identifier": identifier, "number": number, "route": route or "", "url": bus_feedback_url(identifier, site_url)}
+        for identifier, number, route in rows.order_by("identifier_number").values_list(
+            "identifier_number", "number", "current_route__name"
+        )
+    ]
+
+
+@lru_cache(maxsize=None)
+def _font(size):
+    return ImageFont.load_default(size=size)
+
+
+def _centered(draw, y, text, font, width):
+    left, top, right, bottom = draw.textbbox((0, 0), text, font=font)
+    draw.text(((width - (right - left)) / 2, y), text, font=font, fill=0)
+    return y + (bottom - top) + font.size // 2
+
+
+def module_options(error_correction):
+    """One pixel per module and the quiet zone drawn by the card, so the code scales to any card size."""
+    return QROptions(format="png", box_size=1, border=0, error_correction=error_correction)
+
+
+def render_card(card, size):
+    """One bus card (title, QR, bus number/route) as a grayscale image of `size`; card["qr"] is the module_options() PNG."""
+    width, height = size
+    image = Image.new("L", size, 255)
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((0, 0, width - 1, height - 1), outline=0, width=1)  # Kaatne ke liye patli line, bilevel me bhi dikhe
+
+    title_font, text_font = _font(max(height // 14, 14)), _font(max(height // 30, 10))
+    y = _centered(draw, height // 20, f"Bus {card['identifier']}", title_font, width)
+
+    # Module size poora pixel rahe taaki print me QR sharp aaye
+    with Image.open(io.BytesIO(card["qr"])) as code:
+        box = max(1, min(int(width * 0.8), int(height * 0.6)) // (code.width + 2 * QUIET_ZONE))
+        code = code.convert("L").resize((code.width * box, code.height * box), Image.Resampling.NEAREST)
+    image.paste(code, ((width - code.width) // 2, y + QUIET_ZONE * box))
+    y += code.height + 2 * QUIET_ZONE * box
+
+    for line in (card["number"], card["route"], "Scan to share your feedback"):
+        if line:
+            y = _centered(draw, y, line, text_font, width)
+    return image
+
+
+def render_page(cards, per_page):
+    """Worker job: one A4 page of cards as a zlib-compressed PAGE_MODE bitmap (cheap to send back from a worker)."""
+    columns, rows = GRIDS[per_page]
+    cell = ((PAGE_SIZE[0] - 2 * PAGE_MARGIN) // columns, (PAGE_SIZE[1] - 2 * PAGE_MARGIN) // rows)
+    page = Image.new("L", PAGE_SIZE, 255)
+    for index, card in enumerate(cards):
+        column, row = index % columns, index // columns
+        page.paste(render_card(card, cell), (PAGE_MARGIN + column * cell[0], PAGE_MARGIN + row * cell[1]))
+    # Seedha threshold, dithering nahi: QR pehle se pure black/white hai. Page zyada tar safed, level 1 kaafi
+    return zlib.compress(page.convert(PAGE_MODE, dither=Image.Dither.NONE).tobytes(), 1)
+
+
+def _map(function, items, pool=None):
+    """function(*item) for every item, in order, in `pool` when given; yields results as they come."""
+    # Chhote batch ke liye pool ka round trip mehenga, wahi process me bana lo
+    if pool is None or len(items) < 4:
+        for item in items:
+            yield function(*item)
+        return
+    yield from pool.map(function, *zip(*items), chunksize=max(1, len(items) // 16))
+
+
+def default_workers():
+    return os.cpu_count() or 1
+
+
+@contextmanager
+def worker_pool(workers):
+    """Process pool for one command run; None (render inline) for a single worker."""
+    if workers <= 1:
+        yield None
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+        yield pool
+
+
+def qr_codes(urls, options, pool=None):
+    """
+    Image bytes for every url, from the same content-addressed cache as qr_image();
+    only the misses are encoded, in `pool` when given, and then cached.
+    """
+    keys = [f"qr:{options.digest(url)}" for url in urls]
+    found = cache.get_many(keys)
+    missing = [(url, key) for url, key in zip(urls, keys) if key not in found]
+    if missing:
+        rendered = dict(zip(
+            (key for _, key in missing),
+            _map(render_qr, [(url, options) for url, _ in missing], pool),
+        ))
+        cache.set_many(rendered, qr_setting("CACHE_TIMEOUT"))
+        found.update(rendered)
+    return [found[key] for key in keys]
+
+
+def qr_sheet_pdf(cards, out, per_page=4, error_correction=None, pool=None):
+    """
+    Write a multi-page A4 PDF with `per_page` cards per page to `out`, a binary
+    file opened for reading and writing (Pillow appends every PDF_CHUNK pages,
+    so a fleet-sized sheet never sits in memory at once).
+    """
+    error_correction = error_correction or qr_setting("ERROR_CORRECTION")
+    codes = qr_codes([card["url"] for card in cards], module_options(error_correction), pool)
+    cards = [{**card, "qr": code} for card, code in zip(cards, codes)]
+    pages = [(cards[start:start + per_page], per_page) for start in range(0, len(cards), per_page)]
+
+    chunk, first = [], True
+    for bitmap in _map(render_page, pages or [([], per_page)], pool):
+        chunk.append(Image.frombytes(PAGE_MODE, PAGE_SIZE, zlib.decompress(bitmap)))
+        if len(chunk) == PDF_CHUNK:
+            _save_pages(chunk, out, append=not first)
+            chunk, first = [], False
+    if chunk:
+        _save_pages(chunk, out, append=not first)
+
+
+def _save_pages(pages, out, append):
+    head, *rest = pages
+    head.save(out, "PDF", resolution=DPI, save_all=True, append_images=rest, append=append)
+
+
+def qr_codes_zip(cards, out, image_format="png", error_correction=None, pool=None):
+    """Write a zip with one <identifier_number>.png/.svg QR code per card to the binary file `out`."""
+    options = QROptions(format=image_format, error_correction=error_correction)
+    codes = qr_codes([card["url"] for card in cards], options, pool)
+    # PNG pehle se compressed hai, SVG text hai
+    compression = zipfile.ZIP_DEFLATED if image_format == "svg" else zipfile.ZIP_STORED
+    with zipfile.ZipFile(out, "w", compression) as archive:
+        for card, body in zip(cards, codes):
+            archive.writestr(f"{card['identifier']}.{image_format}", body)
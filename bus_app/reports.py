@@ -0,0 +1,126 @@
+import threading
+
+from django.apps import apps as global_apps
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+
+# ✅ Reporting snapshot behind reports_view: one ReportStat row per (metric, key).
+# Signals mark the keys a change touches; they are recounted once when the
+# transaction commits, so the dashboard only reads precomputed rows.
+GENDERS = ("Male", "Female", "Other")
+TOTALS = {"buses": "Bus", "routes": "Route", "students": "Student", "schools": "School", "drivers": "Driver"}
+
+# metric -> (counted model, group-by field, labelling model or None, label field(s))
+# A (name, parent) pair of label fields is shown as "name (parent)", like Program/Stoppage __str__.
+GROUPED = {
+    "gender": ("Student", "gender", None, None),
+    "buses_per_route": ("Allotment", "route_id", "Route", "name"),
+    "students_per_bus": ("Student", "assigned_bus_id", "Bus", "number"),
+    "students_per_route": ("Student", "route_id", "Route", "name"),
+    "students_per_school": ("Student", "school_id", "School", "name"),
+    "students_per_program": ("Student", "program_id", "Program", ("name", "school__name")),
+    "students_per_stoppage": ("Student", "stoppage_id", "Stoppage", ("name", "route__name")),
+}
+METRICS = ("totals", *GROUPED)
+
+_pending = threading.local()
+
+
+def _model(apps, name):
+    return apps.get_model("bus_app", name)
+
+
+def total_rows(apps, keys=None):
+    for key, model_name in TOTALS.items():
+        if keys is None or key in keys:
+            yield key, key.title(), _model(apps, model_name).objects.count()
+
+
+def grouped_rows(apps, metric, keys=None):
+    model_name, field, label_model_name, label_field = GROUPED[metric]
+    rows = _model(apps, model_name).objects.exclude(**{f"{field}__isnull": True})
+    if keys is not None:
+        rows = rows.filter(**{f"{field}__in": keys})
+    counts = dict(rows.order_by().values_list(field).annotate(count=Count("pk")))
+
+    if label_model_name:
+        # Zero wale objects bhi dikhne chahiye (jaise Route.annotate(Count) me)
+        owners = _model(apps, label_model_name).objects.all()
+        if keys is not None:
+            owners = owners.filter(pk__in=keys)
+        label_fields = (label_field,) if isinstance(label_field, str) else label_field
+        for pk, label, *parent in owners.values_list("pk", *label_fields):
+            yield pk, f"{label} ({parent[0]})" if parent else label, counts.get(pk, 0)
+    else:  # gender
+        for gender in GENDERS:
+            if keys is None or gender in keys:
+                yield gender, gender, counts.get(gender, 0)
+
+
+def refresh_report(metric, keys=None, apps=global_apps):
+    """Recount `metric` for the given keys (every key when None) and store the rows."""
+    ReportStat = _model(apps, "ReportStat")
+    if keys is not None:
+        keys = {key for key in keys if key is not None and key != ""}
+        if not keys:
+            return
+    rows = total_rows(apps, keys) if metric == "totals" else grouped_rows(apps, metric, keys)
+    now = timezone.now()
+    stats = [
+        ReportStat(metric=metric, key=str(key), label=str(label or "")[:255], value=value, updated_at=now)
+        for key, label, value in rows
+    ]
+
+    with transaction.atomic():
+        stale = ReportStat.objects.filter(metric=metric)
+        if keys is not None:
+            stale = stale.filter(key__in=[str(key) for key in keys])
+        # Jo key ab exist nahi karti (deleted route/bus, program with 0 students) uski row hatao
+        stale.exclude(key__in=[stat.key for stat in stats]).delete()
+        ReportStat.objects.bulk_create(
+            stats, batch_size=500,
+            update_conflicts=True, unique_fields=["metric", "key"], update_fields=["label", "value", "updated_at"],
+        )
+
+
+def rebuild_reports(apps=global_apps, schema_editor=None):
+    with transaction.atomic():
+        for metric in METRICS:
+            refresh_report(metric, apps=apps)
+
+
+def mark_report_dirty(metric, keys):
+    """Queue a recount of `metric` for `keys`; all marks of one transaction are flushed together on commit."""
+    pending = getattr(_pending, "keys", None)
+    if pending is None:
+        pending = _pending.keys = {}
+    pending.setdefault(metric, set()).update(keys)
+    # Har mark pe register: rollback hua to bachi keys agle commit ke saath flush ho jaati hain
+    transaction.on_commit(flush_reports)
+
+
+def flush_reports():
+    pending = getattr(_pending, "keys", None)
+    if not pending:
+        return
+    _pending.keys = None
+    for metric, keys in pending.items():
+        refresh_report(metric, keys)
+
+
+def report_snapshot():
+    """All snapshot rows as {metric: [{"key", "label", "value"}, ...]} from a single query."""
+    ReportStat = _model(global_apps, "ReportStat")
+    snapshot = {metric: [] for metric in METRICS}
+    for row in ReportStat.objects.order_by("metric", "label", "key").values("metric", "key", "label", "value"):
+        snapshot.setdefault(row.pop("metric"), []).append(row)
+    return snapshot
+
+
+def report_etag(request, *args, **kwargs):
+    """ETag for the snapshot (last update + row count), cheap enough for wall displays polling every few seconds."""
+    ReportStat = _model(global_apps, "ReportStat")
+    stats = ReportStat.objects.aggregate(latest=Max("updated_at"), rows=Count("pk"))
+    latest = stats["latest"].timestamp() if stats["latest"] else 0
+    return f"{latest:.6f}-{stats['rows']}"
@@ -0,0 +1,165 @@
+import re
+
+from django.apps import apps as global_apps
+from django.db import connection, transaction
+from django.db.models.expressions import RawSQL
+
+# ✅ SQLite FTS5 full-text index behind the universal search boxes.
+# One row per searchable object; rowid = object id * 8 + kind code, so an object
+# is replaced/deleted by rowid without scanning the index.
+TABLE = "bus_app_search_index"
+KINDS = {"student": 1, "driver": 2, "bus": 3, "allotment": 4, "notice": 5}
+BATCH_SIZE = 2000
+
+CREATE_SQL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5("
+    "body, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+)
+
+_available = None
+
+
+def index_available():
+    global _available
+    if _available is None:
+        _available = connection.vendor == "sqlite" and TABLE in connection.introspection.table_names()
+    return _available
+
+
+def fts_query(text):
+    """User input -> FTS5 query: every word must match as a prefix ("ram nag" -> "ram"* "nag"*)."""
+    words = re.findall(r"\w+", text or "")
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def join_text(*parts):
+    return " ".join(str(part) for part in parts if part)
+
+
+# Each builder yields (object id, document text) for the given ids (all objects when None)
+def student_documents(apps, ids=None):
+    Student = apps.get_model("bus_app", "Student")
+    students = Student.objects.all() if ids is None else Student.objects.filter(pk__in=ids)
+    for pk, *fields in students.values_list("pk", "name", "roll_number", "crm_id", "school__name", "program__name").iterator(BATCH_SIZE):
+        yield pk, join_text(*fields)
+
+
+def driver_documents(apps, ids=None):
+    Driver = apps.get_model("bus_app", "Driver")
+    drivers = Driver.objects.all() if ids is None else Driver.objects.filter(pk__in=ids)
+    for pk, *fields in drivers.values_list("pk", "name", "D_license_number", "contact_number").iterator(BATCH_SIZE):
+        yield pk, join_text(*fields)
+
+
+def bus_documents(apps, ids=None):
+    Bus = apps.get_model("bus_app", "Bus")
+    buses = Bus.objects.all() if ids is None else Bus.objects.filter(pk__in=ids)
+    rows = buses.order_by("pk").values_list("pk", "number", "identifier_number", "allotments__route__name")
+    current, parts = None, []
+    for pk, number, identifier, route_name in rows.iterator(BATCH_SIZE):
+        if pk != current:
+            if current is not None:
+                yield current, join_text(*parts)
+            current, parts = pk, [number, identifier]
+        if route_name and route_name not in parts:
+            parts.append(route_name)
+    if current is not None:
+        yield current, join_text(*parts)
+
+
+def allotment_documents(apps, ids=None):
+    Allotment = apps.get_model("bus_app", "Allotment")
+    allotments = Allotment.objects.all() if ids is None else Allotment.objects.filter(pk__in=ids)
+    rows = allotments.values_list("pk", "bus__number", "bus__identifier_number", "driver__name", "route__name")
+    for pk, *fields in rows.iterator(BATCH_SIZE):
+        yield pk, join_text(*fields)
+
+
+def notice_documents(apps, ids=None):
+    Notice = apps.get_model("bus_app", "Notice")
+    notices = Notice.objects.all() if ids is None else Notice.objects.filter(pk__in=ids)
+    for pk, message in notices.values_list("pk", "message").iterator(BATCH_SIZE):
+        yield pk, message
+
+
+BUILDERS = {
+    "student": student_documents,
+    "driver": driver_documents,
+    "bus": bus_documents,
+    "allotment": allotment_documents,
+    "notice": notice_documents,
+}
+
+
+def _write(cursor, kind, documents):
+    code = KINDS[kind]
+    batch = []
+    written = 0
+    for pk, body in documents:
+        batch.append((pk * 8 + code, body))
+        if len(batch) >= BATCH_SIZE:
+            cursor.executemany(f"INSERT INTO {TABLE}(rowid, body) VALUES (%s, %s)", batch)
+            written += len(batch)
+            batch = []
+    if batch:
+        cursor.executemany(f"INSERT INTO {TABLE}(rowid, body) VALUES (%s, %s)", batch)
+        written += len(batch)
+    return written
+
+
+def index_objects(kind, ids, apps=global_apps):
+    """(Re)index the given objects of one kind; ids that no longer exist are removed."""
+    ids = [pk for pk in set(ids) if pk is not None]
+    if not ids or not index_available():
+        return
+    code = KINDS[kind]
+    with transaction.atomic(), connection.cursor() as cursor:
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            cursor.executemany(f"DELETE FROM {TABLE} WHERE rowid = %s", [(pk * 8 + code,) for pk in chunk])
+            _write(cursor, kind, BUILDERS[kind](apps, chunk))
+
+
+def remove_objects(kind, ids):
+    if not index_available():
+        return
+    code = KINDS[kind]
+    with connection.cursor() as cursor:
+        cursor.executemany(f"DELETE FROM {TABLE} WHERE rowid = %s", [(pk * 8 + code,) for pk in ids if pk is not None])
+
+
+def rebuild_index(apps=global_apps, schema_editor=None):
+    """Create the index if needed, drop every document and index all objects again. Returns {kind: count}."""
+    global _available
+    conn = schema_editor.connection if schema_editor else connection
+    if conn.vendor != "sqlite":
+        return {}
+    counts = {}
+    # Ek transaction me, warna SQLite har INSERT ko alag commit (fsync) karta hai
+    with transaction.atomic(using=conn.alias), conn.cursor() as cursor:
+        cursor.execute(CREATE_SQL)
+        cursor.execute(f"DELETE FROM {TABLE}")
+        for kind, builder in BUILDERS.items():
+            counts[kind] = _write(cursor, kind, builder(apps))
+        cursor.execute(f"INSERT INTO {TABLE}({TABLE}) VALUES ('optimize')")
+    _available = None
+    return counts
+
+
+def matching_ids(kind, text):
+    """Subquery of object ids of `kind` matching the search text, for pk__in filters."""
+    return RawSQL(
+        f"SELECT rowid / 8 FROM {TABLE} WHERE {TABLE} MATCH %s AND rowid %% 8 = %s",
+        (fts_query(text), KINDS[kind]),
+    )
+
+
+def relevance(model, kind, text):
+    """bm25 rank of each row for ordering (lower is better)."""
+    # MATCH ek hi baar chale: LIMIT -1 subquery ko flatten hone se rokta hai, SQLite use ek baar
+    # bana ke automatic index se dhoondta hai. Warna har row pe poora MATCH ("a"* = minutes).
+    return RawSQL(
+        f"SELECT ranked.rank FROM (SELECT rowid, rank FROM {TABLE} WHERE {TABLE} MATCH %s LIMIT -1) AS ranked "
+        f'WHERE ranked.rowid = "{model._meta.db_table}"."id" * 8 + %s',
+        (fts_query(text), KINDS[kind]),
+    )
@@ -0,0 +1,121 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+
+from .models import Bus, Seat
+from .seating import SEATS_LEFT, SEATS_RIGHT, bulk_seat_changes_active, defer_seat_counts
+
+# ✅ Seating chart grids behind bus_seating_chart, cached per bus.
+# A grid is built from one projected Seat query (no model instances, no per-seat
+# student lookups) and cached under the bus's seats_version. A change to a seat
+# of that bus or to an occupant's fee status bumps the version in the same
+# transaction, so every process (LocMem is per process) picks a fresh key and
+# the old grid simply expires.
+DEFAULTS = {
+    "CACHE_TIMEOUT": 24 * 60 * 60,  # seconds; grids of old versions are never read again and just expire
+    "WARM_BATCH_SIZE": 50,  # buses per query when warming the fleet
+    "WARM_PAUSE": 0.1,  # seconds between warm batches, so live requests get the database in between
+}
+AVAILABLE = "available"
+FEE_PAID = "occupied-fee-paid"
+FEE_UNPAID = "occupied-fee-unpaid"
+
+def seat_chart_setting(name):
+    return getattr(settings, f"SEAT_CHART_{name}", DEFAULTS[name])
+
+
+def _key(bus_id, version):
+    return f"seatchart:{bus_id}:{version}"
+
+
+def _status(student_id, fee_paid):
+    if student_id is None:
+        return AVAILABLE
+    return FEE_PAID if fee_paid else FEE_UNPAID
+
+
+def build_grid(seats, left=SEATS_LEFT, right=SEATS_RIGHT):
+    """
+    Rows of the chart from (seat id, seat number, status) in seat order: `left`
+    seats, an aisle gap, `right` seats; the last row may be shorter.
+    """
+    grid = []
+    row = []
+    for seat_id, number, status in seats:
+        if len(row) == left and right:  # Middle me gap add karo
+            row.append({"is_gap": True})
+        row.append({"id": seat_id, "number": number, "status": status})
+        if len(row) == left + right + bool(right):
+            grid.append(row)
+            row = []
+    if row:
+        grid.append(row)
+    return grid
+
+
+def build_charts(bus_ids):
+    """{bus id: grid} for `bus_ids` from a single query over Seat (ordered by the (bus, seat_number) index)."""
+    seats = {bus_id: [] for bus_id in bus_ids}
+    widths = {}
+    rows = (
+        Seat.objects.filter(bus_id__in=bus_ids)
+        .order_by("bus_id", "seat_number")
+        .values_list("bus_id", "pk", "seat_number", "student_id", "student__fee_paid", "bus__seats_left", "bus__seats_right")
+    )
+    for bus_id, seat_id, number, student_id, fee_paid, left, right in rows:
+        seats[bus_id].append((seat_id, number, _status(student_id, fee_paid)))
+        widths[bus_id] = (left, right)
+    return {bus_id: build_grid(bus_seats, *widths.get(bus_id, ())) for bus_id, bus_seats in seats.items()}
+
+
+def seating_chart(bus):
+    """The chart grid of `bus` (needs id and seats_version loaded), from the cache or built and cached."""
+    key = _key(bus.pk, bus.seats_version)
+    grid = cache.get(key)
+    if grid is None:
+        grid = build_charts([bus.pk])[bus.pk]
+        cache.set(key, grid, seat_chart_setting("CACHE_TIMEOUT"))
+    return grid
+
+
+def invalidate_seat_charts(bus_ids):
+    """Bump the seats_version of `bus_ids` (all buses when None) so their cached charts stop being used."""
+    buses = Bus.objects.all()
+    if bus_ids is not None:
+        bus_ids = {bus_id for bus_id in bus_ids if bus_id is not None}
+        # bulk_seat_changes() end me counters ke saath ek hi UPDATE chalata hai
+        if bulk_seat_changes_active():
+            defer_seat_counts(bus_ids)
+            return
+        if not bus_ids:
+            return
+        buses = buses.filter(pk__in=bus_ids)
+    # Isi transaction me: rollback hua to version bhi wapas, commit hua to har worker naya key padhega
+    buses.update(seats_version=F("seats_version") + 1)
+
+
+def warm_seat_charts(bus_ids=None, batch_size=None, pause=None, progress=None):
+    """
+    Rebuild and cache the charts of `bus_ids` (every bus when None), batch_size buses
+    per query with a pause after each batch. Returns the number of charts written.
+    """
+    batch_size = batch_size or seat_chart_setting("WARM_BATCH_SIZE")
+    pause = seat_chart_setting("WARM_PAUSE") if pause is None else pause
+    if bus_ids is None:
+        bus_ids = list(Bus.objects.order_by("pk").values_list("pk", flat=True))
+    written = 0
+    for start in range(0, len(bus_ids), batch_size):
+        versions = dict(Bus.objects.filter(pk__in=bus_ids[start:start + batch_size]).values_list("pk", "seats_version"))
+        charts = build_charts(list(versions))
+        cache.set_many(
+            {_key(bus_id, versions[bus_id]): grid for bus_id, grid in charts.items()},
+            seat_chart_setting("CACHE_TIMEOUT"),
+        )
+        written += len(charts)
+        if progress:
+            progress(written, len(bus_ids))
+        if pause and start + batch_size < len(bus_ids):
+            time.sleep(pause)
+    return written
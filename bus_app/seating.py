@@ -0,0 +1,203 @@
+import re
+import threading
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.db.models import Q
+
+from .models import Bus, Seat, Student
+from .reports import mark_report_dirty
+
+# ✅ Standard bus layout: 2 seats on the left, aisle, 3 seats on the right (Bus.seats_left/seats_right defaults)
+SEATS_LEFT = Bus._meta.get_field("seats_left").default
+SEATS_RIGHT = Bus._meta.get_field("seats_right").default
+
+_bulk_state = threading.local()
+
+
+class SeatLayoutError(Exception):
+    pass
+
+
+class SeatLayout:
+    """
+    Seat layout template for a bus: `rows` rows of left + aisle + right seats,
+    numbered 1..seat_count row by row (the order bus_seating_chart draws them).
+    """
+
+    def __init__(self, rows, left=SEATS_LEFT, right=SEATS_RIGHT):
+        if rows < 0 or left < 1 or right < 0:
+            raise SeatLayoutError("Invalid seat layout.")
+        self.rows = rows
+        self.left = left
+        self.right = right
+
+    @property
+    def seats_per_row(self):
+        return self.left + self.right
+
+    @property
+    def seat_count(self):
+        return self.rows * self.seats_per_row
+
+    @classmethod
+    def parse(cls, value):
+        """Parse a template like "10x2+3" (rows x left+right)."""
+        match = re.fullmatch(r"\s*(\d+)\s*x\s*(\d+)\s*\+\s*(\d+)\s*", value or "")
+        if not match:
+            raise SeatLayoutError(f"Invalid layout {value!r}, expected e.g. 10x2+3")
+        rows, left, right = (int(part) for part in match.groups())
+        return cls(rows, left, right)
+
+    def __str__(self):
+        return f"{self.rows}x{self.left}+{self.right}"
+
+
+def bulk_seat_changes_active():
+    return getattr(_bulk_state, "bus_ids", None) is not None
+
+
+def defer_seat_counts(bus_ids):
+    """Called by the Seat signals while bulk_seat_changes() is active."""
+    _bulk_state.bus_ids.update(bus_id for bus_id in bus_ids if bus_id is not None)
+
+
+@contextmanager
+def bulk_seat_changes():
+    """
+    Run many seat changes in one transaction and refresh the Bus seat
+    counters (and bump the seating chart versions) once at the end instead
+    of once per seat signal.
+
+    Yields a set; add the ids of buses touched by queryset.update()/bulk_create()
+    (which send no signals) so they get refreshed too.
+    """
+    if bulk_seat_changes_active():
+        yield _bulk_state.bus_ids
+        return
+
+    from .seat_charts import invalidate_seat_charts  # Circular import: seat_charts layout constants yahin se leta hai
+
+    _bulk_state.bus_ids = set()
+    try:
+        with transaction.atomic():
+            yield _bulk_state.bus_ids
+            bus_ids = _bulk_state.bus_ids
+            _bulk_state.bus_ids = None
+            Bus.refresh_seat_counts(bus_ids)
+            invalidate_seat_charts(bus_ids)
+    finally:
+        _bulk_state.bus_ids = None
+
+
+def occupied_seats_beyond(buses, seat_count):
+    """Occupied seats that would be removed by shrinking `buses` to seat_count."""
+    return Seat.objects.filter(
+        Q(seat_number__gt=seat_count) | Q(seat_number__isnull=True),
+        bus__in=buses,
+        student__isnull=False,
+    )
+
+
+def provision_seats(buses, seat_count):
+    """
+    Make every bus in `buses` have exactly seats 1..seat_count.
+
+    Missing seats are created with a single bulk_create and extra vacant seats
+    are deleted, so running it again is a no-op. Raises SeatLayoutError instead
+    of removing a seat that has a student on it. Returns (created, removed).
+    Given a SeatLayout, the buses also get its left/right widths for the chart.
+    """
+    layout = seat_count if isinstance(seat_count, SeatLayout) else None
+    if layout:
+        seat_count = layout.seat_count
+    bus_ids = [bus.pk if isinstance(bus, Bus) else bus for bus in buses]
+    if not bus_ids:
+        return 0, 0
+
+    with bulk_seat_changes() as touched:
+        blocked = occupied_seats_beyond(bus_ids, seat_count).select_related("bus")
+        blocked = list(blocked[:5])
+        if blocked:
+            names = ", ".join(f"{seat.bus.number} #{seat.seat_number}" for seat in blocked)
+            raise SeatLayoutError(f"Cannot remove occupied seats: {names}")
+
+        existing = set(
+            Seat.objects.filter(bus_id__in=bus_ids, seat_number__lte=seat_count)
+            .values_list("bus_id", "seat_number")
+        )
+        new_seats = [
+            Seat(bus_id=bus_id, seat_number=number)
+            for bus_id in bus_ids
+            for number in range(1, seat_count + 1)
+            if (bus_id, number) not in existing
+        ]
+        Seat.objects.bulk_create(new_seats, batch_size=1000)
+
+        _, deleted = Seat.objects.filter(
+            Q(seat_number__gt=seat_count) | Q(seat_number__isnull=True),
+            bus_id__in=bus_ids,
+        ).delete()
+        removed = deleted.get(Seat._meta.label, 0)
+
+        if layout:
+            Bus.objects.filter(pk__in=bus_ids).update(seats_left=layout.left, seats_right=layout.right)
+        touched.update(bus_ids)
+
+    return len(new_seats), removed
+
+
+def assign_seat_to_student(student, seat, replacing=None):
+    """
+    Give `seat` to `student` if it is still vacant (or, with `replacing`, still
+    held by that student id, who is moved out by the same claim).
+
+    The seat is claimed with a conditional UPDATE ... WHERE student_id IS NULL
+    (= replacing), so when two clerks pick the same seat only one UPDATE matches
+    a row and the other gets False ("seat taken") instead of silently overwriting
+    the winner; nobody loses a seat when the claim fails. The student's previous
+    seat, if any, is released in the same transaction.
+    """
+    with bulk_seat_changes() as touched:
+        expected = {"student_id": replacing} if replacing else {"student__isnull": True}
+        claimed = Seat.objects.filter(pk=seat.pk, **expected).update(student=student)
+        if not claimed:
+            # Apni hi seat dobara select ki ho to bhi success
+            return Seat.objects.filter(pk=seat.pk, student=student).exists()
+        if replacing and replacing != student.pk:
+            # Purane occupant ka assigned_* tabhi hatao jab claim jeet gaye
+            if Student.objects.filter(pk=replacing, assigned_seat=seat.pk).update(assigned_bus=None, assigned_seat=None):
+                mark_report_dirty("students_per_bus", [seat.bus_id])
+
+        previous = Seat.objects.filter(student=student).exclude(pk=seat.pk)
+        touched.update(previous.values_list("bus_id", flat=True))
+        previous.update(student=None)
+
+        Student.objects.filter(pk=student.pk).update(assigned_bus=seat.bus_id, assigned_seat=seat.pk)
+        touched.add(seat.bus_id)
+        # update() Student signals nahi bhejta
+        mark_report_dirty("students_per_bus", [student.assigned_bus_id, *touched])
+
+    seat.student = student
+    student.assigned_bus_id = seat.bus_id
+    student.assigned_seat_id = seat.pk
+    return True
+
+
+def release_seat(seat, student_id=None):
+    """
+    Vacate `seat` (only if `student_id` still holds it, when given) and clear the
+    occupant's assigned_bus/assigned_seat. Returns True if the seat was freed.
+    """
+    with bulk_seat_changes() as touched:
+        seats = Seat.objects.filter(pk=seat.pk, student__isnull=False)
+        if student_id is not None:
+            seats = seats.filter(student_id=student_id)
+        occupant_id = seats.values_list("student_id", flat=True).first()
+        if occupant_id is None or not seats.filter(student_id=occupant_id).update(student=None):
+            return False
+        if Student.objects.filter(pk=occupant_id, assigned_seat=seat.pk).update(assigned_bus=None, assigned_seat=None):
+            mark_report_dirty("students_per_bus", [seat.bus_id])
+        touched.add(seat.bus_id)
+    seat.student = None
+    return True
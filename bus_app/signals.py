@@ -1,9 +1,270 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_save, pre_save, post_delete, pre_delete
 from django.dispatch import receiver
-from .models import Seat
+from .models import Bus, Seat, Student, School, Program, Route, Stoppage, Driver, Allotment, Notice
+from .catalog import bump_catalog_version
+from .photos import queue_photo_derivatives
+from .reports import mark_report_dirty
+from .search import index_objects, remove_objects
+from .seat_charts import invalidate_seat_charts
+from .seating import bulk_seat_changes_active, defer_seat_counts
 from .views import send_seat_allotment_email  # Import email function
 
 @receiver(post_save, sender=Seat)
 def send_seat_allotment_email_signal(sender, instance, created, **kwargs):
     if created and instance.student:  # Jab seat assign ho tab email bhejo
-        send_seat_allotment_email(instance.student)
+        send_seat_allotment_email(instance.student, instance)
+
+
+# ✅ Seat occupancy counters on Bus
+def refresh_seat_counts(bus_ids):
+    # bulk_seat_changes() ke andar ek hi baar end me refresh hoga
+    if bulk_seat_changes_active():
+        defer_seat_counts(bus_ids)
+    else:
+        Bus.refresh_seat_counts(bus_ids)
+
+
+@receiver(pre_save, sender=Seat)
+def remember_previous_seat_bus(sender, instance, raw=False, **kwargs):
+    # Seat kisi dusri bus me shift ho to purani bus ke counters bhi refresh karne hain
+    if instance.pk and not raw:
+        instance._previous_bus_id = Seat.objects.filter(pk=instance.pk).values_list('bus_id', flat=True).first()
+
+
+@receiver(post_save, sender=Seat)
+@receiver(post_delete, sender=Seat)
+def refresh_bus_seat_counts_for_seat(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    bus_ids = [instance.bus_id, getattr(instance, '_previous_bus_id', None)]
+    refresh_seat_counts(bus_ids)
+    invalidate_seat_charts(bus_ids)
+
+
+@receiver(post_save, sender=Student)
+def refresh_bus_seat_counts_for_student(sender, instance, created, raw=False, **kwargs):
+    # Sirf gender change se section-wise counters badalte hain; baaki edits pe Seat query bhi nahi
+    previous = getattr(instance, '_previous_groups', None)
+    if raw or created or not previous or previous.get('gender') == instance.gender:
+        return
+    bus_ids = list(Seat.objects.filter(student=instance).values_list('bus_id', flat=True))
+    if bus_ids:
+        refresh_seat_counts(bus_ids)
+
+
+@receiver(pre_delete, sender=Student)
+def remember_student_seat_buses(sender, instance, **kwargs):
+    # Student delete hone par Seat.student SET_NULL bina signal ke hota hai
+    instance._seat_bus_ids = list(Seat.objects.filter(student=instance).values_list('bus_id', flat=True))
+
+
+@receiver(post_delete, sender=Student)
+def refresh_bus_seat_counts_after_student_delete(sender, instance, **kwargs):
+    refresh_seat_counts(getattr(instance, '_seat_bus_ids', []))
+    invalidate_seat_charts(getattr(instance, '_seat_bus_ids', []))
+
+
+@receiver(post_save, sender=Student)
+def invalidate_seat_charts_for_fee(sender, instance, created, raw=False, **kwargs):
+    # Chart me seat ka rang fee status se hai; baaki fields badalne par cache rehne do
+    previous = getattr(instance, '_previous_groups', None)
+    if raw or created or not previous or previous.get('fee_paid') == instance.fee_paid:
+        return
+    invalidate_seat_charts(Seat.objects.filter(student=instance).values_list('bus_id', flat=True))
+
+
+# ✅ Catalog cache (schools/programs/routes/stoppages) invalidation
+@receiver(post_save, sender=School)
+@receiver(post_delete, sender=School)
+@receiver(post_save, sender=Program)
+@receiver(post_delete, sender=Program)
+@receiver(post_save, sender=Route)
+@receiver(post_delete, sender=Route)
+@receiver(post_save, sender=Stoppage)
+@receiver(post_delete, sender=Stoppage)
+def invalidate_catalog_cache(sender, **kwargs):
+    bump_catalog_version()
+
+
+# ✅ Bus.current_route follows the latest Allotment
+@receiver(post_save, sender=Allotment)
+@receiver(post_delete, sender=Allotment)
+def refresh_bus_current_route(sender, instance, raw=False, **kwargs):
+    if not raw:
+        Bus.refresh_current_routes([instance.bus_id, getattr(instance, '_previous_bus_id', None)])
+
+
+# ✅ Full-text search index (search.py) sync
+SEARCH_KINDS = {Student: "student", Driver: "driver", Bus: "bus", Allotment: "allotment", Notice: "notice"}
+
+
+@receiver(post_save, sender=Student)
+@receiver(post_save, sender=Driver)
+@receiver(post_save, sender=Bus)
+@receiver(post_save, sender=Allotment)
+@receiver(post_save, sender=Notice)
+def update_search_index(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    index_objects(SEARCH_KINDS[sender], [instance.pk])
+    # Dusre objects ke documents me bhi iska naam/number hota hai
+    if sender is Driver or sender is Bus:
+        index_objects("allotment", instance.allotments.values_list('pk', flat=True))
+    elif sender is Allotment:
+        index_objects("bus", [instance.bus_id, getattr(instance, '_previous_bus_id', None)])
+
+
+@receiver(post_delete, sender=Student)
+@receiver(post_delete, sender=Driver)
+@receiver(post_delete, sender=Bus)
+@receiver(post_delete, sender=Allotment)
+@receiver(post_delete, sender=Notice)
+def remove_from_search_index(sender, instance, **kwargs):
+    remove_objects(SEARCH_KINDS[sender], [instance.pk])
+    if sender is Allotment:
+        index_objects("bus", [instance.bus_id])
+
+
+@receiver(post_save, sender=School)
+@receiver(post_save, sender=Program)
+def reindex_school_students(sender, instance, created=False, raw=False, **kwargs):
+    if not created and not raw:
+        index_objects("student", instance.students.values_list('pk', flat=True))
+
+
+@receiver(pre_delete, sender=School)
+@receiver(pre_delete, sender=Program)
+def remember_school_students(sender, instance, **kwargs):
+    # School/program delete par Student.school/program SET_NULL bina signal ke hota hai
+    instance._student_ids = list(instance.students.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=School)
+@receiver(post_delete, sender=Program)
+def reindex_students_after_school_delete(sender, instance, **kwargs):
+    index_objects("student", getattr(instance, '_student_ids', []))
+
+
+@receiver(post_save, sender=Route)
+def reindex_route_objects(sender, instance, created=False, raw=False, **kwargs):
+    if created or raw:
+        return
+    allotments = Allotment.objects.filter(route=instance)
+    index_objects("allotment", allotments.values_list('pk', flat=True))
+    index_objects("bus", allotments.values_list('bus_id', flat=True))
+
+
+# ✅ Reporting snapshot (reports.py): recount only the keys a change touches
+STUDENT_REPORT_METRICS = {
+    "gender": "gender",
+    "assigned_bus_id": "students_per_bus",
+    "route_id": "students_per_route",
+    "school_id": "students_per_school",
+    "program_id": "students_per_program",
+    "stoppage_id": "students_per_stoppage",
+}
+
+
+@receiver(pre_save, sender=Student)
+def remember_previous_student_groups(sender, instance, raw=False, **kwargs):
+    if instance.pk and not raw:
+        # Photo/fee bhi isi query me: derivatives sirf naye upload par, seat chart sirf fee badalne par,
+        # bus ke seat counters sirf gender badalne par
+        instance._previous_groups = Student.objects.filter(pk=instance.pk).values(*STUDENT_REPORT_METRICS, 'photo', 'fee_paid').first()
+
+
+@receiver(post_save, sender=Student)
+def update_student_reports(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_previous_groups', None) or {}
+    for field, metric in STUDENT_REPORT_METRICS.items():
+        value = getattr(instance, field)
+        if created or previous.get(field) != value:
+            mark_report_dirty(metric, [value, previous.get(field)])
+    if created:
+        mark_report_dirty("totals", ["students"])
+
+
+@receiver(post_delete, sender=Student)
+def update_reports_after_student_delete(sender, instance, **kwargs):
+    for field, metric in STUDENT_REPORT_METRICS.items():
+        mark_report_dirty(metric, [getattr(instance, field)])
+    mark_report_dirty("totals", ["students"])
+
+
+@receiver(pre_save, sender=Allotment)
+def remember_previous_allotment_route(sender, instance, raw=False, **kwargs):
+    if instance.pk and not raw:
+        instance._previous_route_id, instance._previous_bus_id = (
+            Allotment.objects.filter(pk=instance.pk).values_list('route_id', 'bus_id').first() or (None, None)
+        )
+
+
+@receiver(post_save, sender=Allotment)
+@receiver(post_delete, sender=Allotment)
+def update_allotment_reports(sender, instance, raw=False, **kwargs):
+    if not raw:
+        mark_report_dirty("buses_per_route", [instance.route_id, getattr(instance, '_previous_route_id', None)])
+
+
+# Naya/renamed/deleted object: totals aur uski apni report rows
+OWNER_REPORT_METRICS = {
+    Bus: ("buses", ["students_per_bus"]),
+    Route: ("routes", ["buses_per_route", "students_per_route"]),
+    School: ("schools", ["students_per_school"]),
+    Driver: ("drivers", []),
+    Program: (None, ["students_per_program"]),
+    Stoppage: (None, ["students_per_stoppage"]),
+}
+
+
+@receiver(post_save, sender=Bus)
+@receiver(post_delete, sender=Bus)
+@receiver(post_save, sender=Route)
+@receiver(post_delete, sender=Route)
+@receiver(post_save, sender=School)
+@receiver(post_delete, sender=School)
+@receiver(post_save, sender=Driver)
+@receiver(post_delete, sender=Driver)
+@receiver(post_save, sender=Program)
+@receiver(post_delete, sender=Program)
+@receiver(post_save, sender=Stoppage)
+@receiver(post_delete, sender=Stoppage)
+def update_owner_reports(sender, instance, created=True, raw=False, **kwargs):
+    if raw:
+        return
+    total, metrics = OWNER_REPORT_METRICS[sender]
+    if created and total:  # post_delete pe created nahi aata, wahan bhi total badalta hai
+        mark_report_dirty("totals", [total])
+    for metric in metrics:
+        mark_report_dirty(metric, [instance.pk])
+
+
+@receiver(post_save, sender=School)
+@receiver(post_save, sender=Route)
+def update_child_report_labels(sender, instance, created=False, raw=False, **kwargs):
+    # Program/stoppage label me school/route ka naam bhi hai, rename par woh rows bhi
+    if created or raw:
+        return
+    if sender is School:
+        mark_report_dirty("students_per_program", instance.programs.values_list('pk', flat=True))
+    else:
+        mark_report_dirty("students_per_stoppage", instance.stoppages.values_list('pk', flat=True))
+
+
+# ✅ Student photo thumbnail / medium derivatives (photos.py)
+@receiver(post_save, sender=Student)
+def update_photo_derivatives(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = (getattr(instance, '_previous_groups', None) or {}).get('photo') or ""
+    name = instance.photo.name or ""
+    if name == previous:
+        return
+    if not name:
+        Student.objects.filter(pk=instance.pk).update(photo_thumbnail="", photo_medium="")
+        return
+    # Commit ke baad: worker ko file aur row dono mil jaayein
+    transaction.on_commit(lambda: queue_photo_derivatives(instance.pk, name))
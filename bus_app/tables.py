@@ -0,0 +1,204 @@
+import base64
+import json
+from decimal import Decimal
+
+from django.core.exceptions import FieldError, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
+from django.http import JsonResponse
+
+from .search import fts_query, index_available, matching_ids, relevance
+
+# ✅ Shared server-side table layer for the list pages:
+# whitelisted sorting, query-string filters and keyset (seek) pagination.
+PAGE_SIZE = 50
+SORT_KEY = "_table_sort"
+
+
+def cursor_value(value):
+    # Full precision (DjangoJSONEncoder cuts datetimes to milliseconds)
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def encode_cursor(value, pk):
+    raw = json.dumps([cursor_value(value), pk])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        value, pk = json.loads(raw)
+        return value, int(pk)
+    except (ValueError, TypeError):
+        return None
+
+
+def cursor_sort_value(queryset, value):
+    """
+    The cursor's sort value as the SORT_KEY annotation's Python type. Raises
+    ValueError for a value that type cannot hold (tampered or stale cursor).
+    """
+    if value is None:
+        return None
+    try:
+        return queryset.query.annotations[SORT_KEY].output_field.to_python(value)
+    except (FieldError, ValidationError, TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor value {value!r}") from e
+
+
+def seek_filter(field, descending, value, pk):
+    """
+    Rows strictly after (value, pk) in ORDER BY field, pk. NULLs come first when
+    ascending and last when descending, matching order_by() below.
+    """
+    if not descending:
+        if value is None:
+            return Q(**{f"{field}__isnull": True, "pk__gt": pk}) | Q(**{f"{field}__isnull": False})
+        return Q(**{f"{field}__gt": value}) | Q(**{field: value, "pk__gt": pk})
+    if value is None:
+        return Q(**{f"{field}__isnull": True, "pk__lt": pk})
+    return Q(**{f"{field}__lt": value}) | Q(**{field: value, "pk__lt": pk}) | Q(**{f"{field}__isnull": True})
+
+
+class TablePage:
+    def __init__(self, request, rows, has_next, next_cursor, sort, descending, sort_fields):
+        self.request = request
+        self.rows = rows
+        self.has_next = has_next
+        self.next_cursor = next_cursor
+        self.sort = sort
+        self.descending = descending
+        self.sort_fields = sort_fields
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __bool__(self):
+        return bool(self.rows)
+
+    def url(self, **changes):
+        params = self.request.GET.copy()
+        for key, value in changes.items():
+            if value is None:
+                params.pop(key, None)
+            else:
+                params[key] = value
+        query = params.urlencode()
+        return f"{self.request.path}?{query}" if query else self.request.path
+
+    @property
+    def is_first_page(self):
+        return not self.request.GET.get("after")
+
+    @property
+    def next_url(self):
+        return self.url(after=self.next_cursor, format=None) if self.has_next else None
+
+    @property
+    def first_url(self):
+        return self.url(after=None, format=None)
+
+    @property
+    def sort_urls(self):
+        """?sort= link for every sortable column; clicking the active column flips the direction."""
+        urls = {}
+        for key in self.sort_fields:
+            value = f"-{key}" if key == self.sort and not self.descending else key
+            urls[key] = self.url(sort=value, after=None, format=None)
+        return urls
+
+    def json_response(self):
+        return JsonResponse({
+            "rows": self.rows,
+            "next": self.url(after=self.next_cursor) if self.has_next else None,
+        }, encoder=DjangoJSONEncoder)
+
+
+def wants_json(request):
+    return request.GET.get("format") == "json"
+
+
+def table_page(request, queryset, sort_fields, default_sort, filters=None, search_fields=(),
+               json_fields=None, page_size=PAGE_SIZE, search_kind=None):
+    """
+    One page of `queryset` for a list view.
+
+    - ?search=  full-text index lookup for search_kind (sortable by "relevance", the
+                default while searching), else (or when the text has no words)
+                ORs icontains over search_fields
+    - filters   maps query-string params to ORM lookups (exact match)
+    - ?sort=    a key of sort_fields, "-key" for descending
+    - ?after=   keyset cursor from the previous page, so page N costs the same as page 1
+    - ?format=json returns dicts of json_fields instead of model objects
+    """
+    joined = False  # Related table pe filter se duplicate rows aa sakti hain
+    search_query = request.GET.get("search", "").strip()
+    # Sirf punctuation ("-", "@@") me FTS ke liye koi word nahi, MATCH '' syntax error deta hai
+    if search_query and search_kind and fts_query(search_query) and index_available():
+        queryset = queryset.filter(pk__in=matching_ids(search_kind, search_query))
+        sort_fields = {**sort_fields, "relevance": relevance(queryset.model, search_kind, search_query)}
+        default_sort = "relevance"
+    elif search_query and search_fields:
+        condition = Q()
+        for lookup in search_fields:
+            condition |= Q(**{f"{lookup}__icontains": search_query})
+        queryset = queryset.filter(condition)
+        joined = any("__" in lookup for lookup in search_fields)
+
+    for param, lookup in (filters or {}).items():
+        value = request.GET.get(param)
+        if value:
+            queryset = queryset.filter(**{lookup: value})
+            joined = joined or "__" in lookup
+    if joined:
+        queryset = queryset.distinct()
+
+    sort = request.GET.get("sort") or default_sort
+    descending = sort.startswith("-")
+    sort = sort.lstrip("-")
+    if sort not in sort_fields:
+        sort = default_sort.lstrip("-")
+        descending = default_sort.startswith("-")
+    field = sort_fields[sort]
+
+    queryset = queryset.annotate(**{SORT_KEY: F(field) if isinstance(field, str) else field})
+    if descending:
+        queryset = queryset.order_by(F(SORT_KEY).desc(nulls_last=True), "-pk")
+    else:
+        queryset = queryset.order_by(F(SORT_KEY).asc(nulls_first=True), "pk")
+
+    cursor = decode_cursor(request.GET.get("after", ""))
+    if cursor:
+        value, pk = cursor
+        try:
+            value = cursor_sort_value(queryset, value)
+        except ValueError:
+            cursor = None  # Ched-chhaad wala ya purane sort ka cursor: 500 ke bajaye pehla page
+        else:
+            queryset = queryset.filter(seek_filter(SORT_KEY, descending, value, pk))
+
+    if wants_json(request) and json_fields:
+        rows = list(queryset.values("pk", SORT_KEY, *json_fields)[:page_size + 1])
+        sort_value = lambda row: row[SORT_KEY]
+        row_pk = lambda row: row["pk"]
+    else:
+        rows = list(queryset[:page_size + 1])
+        sort_value = lambda row: getattr(row, SORT_KEY)
+        row_pk = lambda row: row.pk
+
+    has_next = len(rows) > page_size
+    rows = rows[:page_size]
+    next_cursor = encode_cursor(sort_value(rows[-1]), row_pk(rows[-1])) if has_next else None
+    if wants_json(request) and json_fields:
+        for row in rows:
+            row.pop(SORT_KEY, None)
+
+    return TablePage(request, rows, has_next, next_cursor, sort, descending, sort_fields)
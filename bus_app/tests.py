@@ -1,3 +1,769 @@
-from django.test import TestCase
+import csv
+import os
+import shutil
+import tempfile
+import zipfile
+from concurrent.futures import Future
+from datetime import timedelta
+from io import BytesIO, StringIO
+from smtplib import SMTPException
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.mail.backends import locmem
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image, PdfParser
+
+from .allocation import allocate_seats
+from .catalog import catalog_version
+from .importer import import_students, read_rows
+from .metrics import QueryBudgetMixin
+from .reports import rebuild_reports
+from .models import (
+    Allotment, Bus, Driver, Notice, OutboxBatch, OutboxMessage, Program, ReportStat, Route, School, Seat, Stoppage, Student,
+)
+from .outbox import compiled_template, deliver_due_batches, queue_email
+from .photos import _stored
+from .qr import QROptions, render_qr
+from .qr_sheets import bus_cards, qr_codes_zip, qr_sheet_pdf
+from .search import matching_ids
+from .seat_charts import seating_chart
+from .tables import encode_cursor
+from .seating import SeatLayout, assign_seat_to_student, provision_seats, release_seat
+from .views import SUGGESTION_LIMIT
+
+
+class ListSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_superuser("admin", "admin@example.com", "password")
+        school = School.objects.create(name="School of Engineering")
+        Student.objects.create(name="Ravi Sharma", roll_number="R-001", email="ravi@example.com", school=school)
+        Driver.objects.create(name="Mohan Lal", address="Gwalior", D_license_number="DL-001",
+                              contact_number="9876543210", reference_by="Office")
+        Bus.objects.create(number="MP07-1", identifier_number="B-01")
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_punctuation_only_search_does_not_break_full_text_lists(self):
+        # Regression: "-" / "@@" / '"' se FTS query khaali banti thi aur MATCH '' se HTTP 500
+        for url_name in ("student_list", "driver_list", "bus_list"):
+            for text in ("-", "@@", '"'):
+                with self.subTest(url_name=url_name, search=text):
+                    response = self.client.get(reverse(url_name), {"search": text, "format": "json"})
+                    self.assertEqual(response.status_code, 200)
+
+    def test_punctuation_search_falls_back_to_icontains(self):
+        response = self.client.get(reverse("student_list"), {"search": "-", "format": "json"})
+        self.assertEqual([row["roll_number"] for row in response.json()["rows"]], ["R-001"])
+
+    def test_word_search_uses_the_index(self):
+        response = self.client.get(reverse("driver_list"), {"search": "moh", "format": "json"})
+        self.assertEqual([row["name"] for row in response.json()["rows"]], ["Mohan Lal"])
+
+
+class FilterSuggestionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_superuser("admin", "admin@example.com", "password")
+        Student.objects.bulk_create([
+            Student(name=f"Student {i:02d}", roll_number=f"R{i:02d}", email=f"s{i}@example.com") for i in range(30)
+        ])
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_list_page_does_not_render_every_value(self):
+        response = self.client.get(reverse("student_list"))
+        self.assertNotContains(response, '<option value="R29"')
+
+    def test_suggestions_are_prefix_matches_and_bounded(self):
+        url = reverse("filter_suggestions", args=["roll_number"])
+        self.assertEqual(len(self.client.get(url).json()["results"]), SUGGESTION_LIMIT)
+        self.assertEqual(self.client.get(url, {"q": "r2"}).json()["results"][0], {"id": "R20", "text": "R20"})
+
+    def test_suggestions_read_the_name_index_without_a_temp_btree(self):
+        with CaptureQueriesContext(connection) as captured:
+            self.client.get(reverse("filter_suggestions", args=["student_name"]), {"q": "stu"})
+        sql = next(query["sql"] for query in captured if "DISTINCT" in query["sql"])
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+            plan = [row[-1] for row in cursor.fetchall()]
+        self.assertFalse([detail for detail in plan if "TEMP B-TREE" in detail], plan)
+
+    def test_unknown_filter_is_404(self):
+        self.assertEqual(self.client.get(reverse("filter_suggestions", args=["email"])).status_code, 404)
+
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_superuser("admin", "admin@example.com", "password")
+        # Kai bus/route/student taaki N+1 query budget se upar chali jaaye
+        call_command("generate_campus", students=120, schools=2, programs=3, routes=4, stoppages=4, buses=5,
+                     notices=10, feedback=10, stdout=StringIO())
+        cls.bus = Bus.objects.filter(seats_occupied__gt=0).order_by("pk").first()
+        cls.student = Student.objects.filter(seats__isnull=False).order_by("pk").first()
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        cache.clear()  # Cached chart/catalog se budget chhupe nahi
+
+    def test_bus_list(self):
+        self.assertQueryBudget("bus_list")
+
+    def test_allot_bus(self):
+        self.assertQueryBudget("allot_bus", self.student.pk)
+
+    def test_reports(self):
+        self.assertQueryBudget("reports")
+
+    def test_bus_seating_chart(self):
+        self.assertQueryBudget("bus_seating_chart", bus_number=self.bus.number)
+
+    def test_check_query_budgets_rejects_unknown_path(self):
+        with self.assertRaisesMessage(CommandError, "/no-such-page/: no such URL."):
+            call_command("check_query_budgets", "/no-such-page/", stdout=StringIO())
+
+
+class SeatChartCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command("generate_campus", students=20, schools=1, programs=1, routes=1, stoppages=1, buses=1,
+                     seated=0.5, notices=0, feedback=0, stdout=StringIO())
+
+    def setUp(self):
+        cache.clear()
+
+    def statuses(self):
+        bus = Bus.objects.only("id", "seats_version").get()
+        return [cell["status"] for row in seating_chart(bus) for cell in row if not cell.get("is_gap")]
+
+    def test_seat_change_is_seen_without_dropping_the_cache(self):
+        # Dusra worker apna LocMem nahi chhoo sakta: naya version hi naya key deta hai
+        before = self.statuses()
+        seat = Seat.objects.filter(student__isnull=False).order_by("seat_number").first()
+        self.assertTrue(release_seat(seat))
+        after = self.statuses()
+        self.assertEqual(after.count("available"), before.count("available") + 1)
+
+    def test_fee_change_bumps_the_version(self):
+        version = Bus.objects.get().seats_version
+        student = Student.objects.filter(seats__isnull=False).first()
+        student.fee_paid = not student.fee_paid
+        student.save()
+        self.assertEqual(Bus.objects.get().seats_version, version + 1)
+
+
+class CatalogVersionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_reference_data_change_bumps_the_stored_version(self):
+        # Version DB me hai, isliye dusre worker ka LocMem bhi naya key padhta hai
+        before = catalog_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            school = School.objects.create(name="School of Law")
+        self.assertNotEqual(catalog_version(), before)
+        before = catalog_version()
+        school.name = "School of Legal Studies"
+        with self.captureOnCommitCallbacks(execute=True):
+            school.save()
+        self.assertNotEqual(catalog_version(), before)
+
+    def test_catalog_follows_a_change_without_dropping_the_cache(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            School.objects.create(name="School of Law")
+        self.assertEqual([name for name, _ in self.client.get(reverse("catalog")).json()["schools"]], ["School of Law"])
+        with self.captureOnCommitCallbacks(execute=True):
+            School.objects.create(name="School of Arts")
+        schools = [name for name, _ in self.client.get(reverse("catalog")).json()["schools"]]
+        self.assertEqual(schools, ["School of Arts", "School of Law"])
+
+    def test_warm_hit_makes_no_query(self):
+        School.objects.create(name="School of Law")
+        for url in (reverse("get_schools"), reverse("catalog"), f"{reverse('catalog')}?v={catalog_version()}"):
+            with self.subTest(url=url):
+                self.client.get(url)
+                with self.assertNumQueries(0):
+                    self.assertEqual(self.client.get(url).status_code, 200)
+
+
+class SeatLayoutTests(TestCase):
+    def setUp(self):
+        cache.clear()  # Test rollback se version wapas 0, purane test ka grid usi key pe na mile
+
+    def chart(self, bus):
+        bus.refresh_from_db()
+        return [["gap" if cell.get("is_gap") else cell["number"] for cell in row] for row in seating_chart(bus)]
+
+    def test_chart_follows_the_provisioned_layout(self):
+        bus = Bus.objects.create(number="MP07-2", identifier_number="B-02")
+        provision_seats([bus], SeatLayout.parse("2x2+2"))
+        self.assertEqual(self.chart(bus), [[1, 2, "gap", 3, 4], [5, 6, "gap", 7, 8]])
+        provision_seats([bus], SeatLayout.parse("3x1+0"))
+        self.assertEqual(self.chart(bus), [[1], [2], [3]])
+
+    def test_seat_count_keeps_the_layout(self):
+        bus = Bus.objects.create(number="MP07-3", identifier_number="B-03")
+        provision_seats([bus], 7)
+        self.assertEqual(self.chart(bus), [[1, 2, "gap", 3, 4, 5], [6, 7]])
+
+
+class PhotoUploadTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root, PHOTO_WORKERS=0)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def register(self, execute):
+        image = BytesIO()
+        Image.new("RGB", (64, 48), "red").save(image, "PNG")
+        with self.captureOnCommitCallbacks(execute=execute):
+            response = self.client.post(reverse("register_student"), {
+                "name": "Ravi Sharma", "roll_number": "R-001", "email": "ravi@example.com",
+                "contact_number": "9876543210", "gender": "Male",
+                "photo": SimpleUploadedFile("ravi.png", image.getvalue(), content_type="image/png"),
+            })
+        self.assertTrue(response.json()["success"])
+        return Student.objects.get(roll_number="R-001")
+
+    def test_upload_is_kept_on_the_student_until_it_is_normalized(self):
+        # Worker chalne se pehle process restart ho jaaye to bhi photo MEDIA_ROOT me student ke paas hai
+        student = self.register(execute=False)
+        self.assertTrue(student.photo.name.startswith("student_photos/uploads/"))
+        self.assertTrue(default_storage.exists(student.photo.name))
+        self.assertEqual(student.photo_thumbnail.name, "")
+
+    def test_normalized_photo_replaces_the_upload(self):
+        student = self.register(execute=True)
+        self.assertEqual(os.path.splitext(student.photo.name)[1], ".jpg")
+        self.assertNotEqual(student.photo_thumbnail.name, "")
+        self.assertEqual(os.listdir(os.path.join(self.media_root, "student_photos", "uploads")), [])
+
+    def test_backfill_normalizes_an_interrupted_upload(self):
+        student = self.register(execute=False)
+        staged = student.photo.name
+        call_command("build_photo_derivatives", workers=1, stdout=StringIO())
+
+        student.refresh_from_db()
+        self.assertEqual(os.path.dirname(student.photo.name), "student_photos")
+        self.assertEqual(os.path.splitext(student.photo.name)[1], ".jpg")
+        self.assertNotEqual(student.photo_thumbnail.name, "")
+        self.assertFalse(default_storage.exists(staged))
+
+    def test_pool_callback_closes_its_connection(self):
+        student = self.register(execute=False)
+        future = Future()
+        future.set_result({"photo_thumbnail": "student_photos/ravi.thumb.webp"})
+        with mock.patch("bus_app.photos.close_old_connections") as close_old_connections:
+            _stored(student.pk, student.photo.name)(future)
+        # Pool thread ka connection request cycle ke bahar hai, write ke pehle aur baad dono
+        self.assertEqual(close_old_connections.call_count, 2)
+        student.refresh_from_db()
+        self.assertEqual(student.photo_thumbnail.name, "student_photos/ravi.thumb.webp")
+
+
+class StudentSeatCounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.bus = Bus.objects.create(number="MP07-4", identifier_number="B-04")
+        provision_seats([cls.bus], 5)
+        cls.student = Student.objects.create(name="Ravi Sharma", roll_number="R-001", email="ravi@example.com")
+        assign_seat_to_student(cls.student, Seat.objects.get(bus=cls.bus, seat_number=1))
+
+    def test_other_edits_skip_the_seat_lookup(self):
+        student = Student.objects.get(pk=self.student.pk)
+        student.contact_number = "9876543210"
+        with CaptureQueriesContext(connection) as captured:
+            student.save()
+        self.assertFalse([query for query in captured if '"bus_app_seat"' in query["sql"]])
+
+    def test_gender_change_recounts_the_bus(self):
+        student = Student.objects.get(pk=self.student.pk)
+        student.gender = "Female"
+        student.save()
+        self.bus.refresh_from_db()
+        self.assertEqual((self.bus.seats_male, self.bus.seats_female), (0, 1))
+
+
+class CatalogEtagTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # gzip_page 200 bytes se chhota body compress nahi karta
+        for i in range(20):
+            School.objects.create(name=f"School of Engineering {i}")
+
+    def setUp(self):
+        cache.clear()
+
+    def test_gzipped_catalog_revalidates_with_the_emitted_etag(self):
+        response = self.client.get(reverse("catalog"), HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertTrue(response["ETag"].startswith("W/"))
+        again = self.client.get(reverse("catalog"), HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(again.status_code, 304)
+
+    def test_plain_endpoint_revalidates_with_a_strong_etag(self):
+        response = self.client.get(reverse("get_schools"))
+        again = self.client.get(reverse("get_schools"), HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(again.status_code, 304)
+
+
+class TamperedCursorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_superuser("admin", "admin@example.com", "password")
+        Route.objects.create(name="City Route", fare=10000)
+        Notice.objects.create(type="All", message="Buses leave at 8")
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_bad_cursor_serves_the_first_page(self):
+        for url_name, params in (
+            ("notice_list", {}),
+            ("route_list", {"sort": "fare"}),
+            ("allotment_list", {}),
+            ("student_list", {"sort": "program"}),
+        ):
+            for value in ("notadate", "2024-13-45", {"a": 1}, [1, 2]):
+                with self.subTest(url_name=url_name, value=value):
+                    response = self.client.get(reverse(url_name), {**params, "after": encode_cursor(value, 1)})
+                    self.assertEqual(response.status_code, 200)
+
+    def test_garbage_cursor_is_ignored(self):
+        response = self.client.get(reverse("notice_list"), {"after": "!!not-base64!!", "format": "json"})
+        self.assertEqual(response.status_code, 200)
+
+
+class ReportSnapshotTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.schools = [School.objects.create(name=f"School {i}") for i in range(2)]
+        cls.programs = [Program.objects.create(school=school, name=f"Program {i}") for i, school in enumerate(cls.schools * 2)]
+        cls.routes = [Route.objects.create(name=f"Route {i}", fare=10000) for i in range(2)]
+        cls.stoppages = [Stoppage.objects.create(route=route, name=f"Stop {i}") for i, route in enumerate(cls.routes * 2)]
+        cls.buses = [Bus.objects.create(number=f"MP07-{i}", identifier_number=f"B-{i}") for i in range(2)]
+        provision_seats(cls.buses, 4)
+        cls.driver = Driver.objects.create(name="Mohan Lal", address="Gwalior", D_license_number="DL-001",
+                                           contact_number="9876543210", reference_by="Office")
+
+    def snapshot(self):
+        return set(ReportStat.objects.values_list("metric", "key", "label", "value"))
+
+    def test_incremental_snapshot_matches_a_full_rebuild(self):
+        # Har operation commit hone par signals sirf touched keys recount karte hain
+        def step(action):
+            with self.captureOnCommitCallbacks(execute=True):
+                action()
+
+        students = []
+        for i in range(6):
+            step(lambda i=i: students.append(Student.objects.create(
+                name=f"Student {i}", roll_number=f"R{i}", email=f"s{i}@example.com",
+                gender=("Male", "Female", "Other")[i % 3], school=self.schools[i % 2], program=self.programs[i % 4],
+                route=self.routes[i % 2], stoppage=self.stoppages[i % 4],
+            )))
+        allotments = []
+        step(lambda: allotments.append(Allotment.objects.create(bus=self.buses[0], driver=self.driver, route=self.routes[0])))
+        step(lambda: assign_seat_to_student(students[0], Seat.objects.get(bus=self.buses[0], seat_number=1)))
+        step(lambda: assign_seat_to_student(students[1], Seat.objects.get(bus=self.buses[1], seat_number=2)))
+
+        def move_student():
+            students[2].gender, students[2].route, students[2].program = "Male", self.routes[0], self.programs[1]
+            students[2].save()
+        step(move_student)
+        step(lambda: students[3].delete())
+
+        def move_allotment():
+            allotments[0].route = self.routes[1]
+            allotments[0].save()
+        step(move_allotment)
+        step(lambda: Allotment.objects.create(bus=self.buses[1], driver=self.driver, route=self.routes[0]))
+
+        def rename_route():
+            self.routes[1].name = "Route One"
+            self.routes[1].save()
+        step(rename_route)
+        step(lambda: release_seat(Seat.objects.get(bus=self.buses[0], seat_number=1)))
+
+        incremental = self.snapshot()
+        self.assertIn(("students_per_route", str(self.routes[1].pk), "Route One", 2), incremental)
+        rebuild_reports()
+        self.assertEqual(incremental, self.snapshot())
+
+
+class SeatClaimTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_superuser("admin", "admin@example.com", "password")
+        cls.bus = Bus.objects.create(number="MP07-5", identifier_number="B-05")
+        provision_seats([cls.bus], 4)
+        cls.ravi, cls.sita, cls.amit = (
+            Student.objects.create(name=name, roll_number=f"R-{name}", email=f"{name}@example.com")
+            for name in ("ravi", "sita", "amit")
+        )
+
+    def seat(self, number):
+        return Seat.objects.get(bus=self.bus, seat_number=number)
+
+    def test_lost_claim_keeps_the_winner(self):
+        # Dono clerk ne seat 1 khaali dekhi; pehla jeet gaya, dusre ka UPDATE kisi row pe match nahi karta
+        stale = self.seat(1)
+        self.assertTrue(assign_seat_to_student(self.ravi, self.seat(1)))
+        self.assertFalse(assign_seat_to_student(self.sita, stale))
+        self.assertEqual(self.seat(1).student, self.ravi)
+        self.ravi.refresh_from_db()
+        self.sita.refresh_from_db()
+        self.assertEqual(self.ravi.assigned_seat_id, stale.pk)
+        self.assertIsNone(self.sita.assigned_seat_id)
+
+    def test_admin_reassign_keeps_everyone_seated_when_the_claim_fails(self):
+        self.client.force_login(self.user)
+        seat = self.seat(1)
+        assign_seat_to_student(self.ravi, seat)
+        assign_seat_to_student(self.sita, self.seat(2))
+        url = reverse("admin:bus_app_seat_change", args=[seat.pk])
+        form = self.client.get(url)  # Clerk ne form kholte waqt Ravi dekha
+        self.assertContains(form, f'<option value="{self.ravi.pk}" selected>')
+
+        # Meanwhile Ravi ne seat chhodi aur Amit ne le li
+        release_seat(seat)
+        assign_seat_to_student(self.amit, seat)
+        data = {"seat_number": 1, "bus": self.bus.pk, "student": self.sita.pk, "initial-student": self.ravi.pk}
+        self.client.post(url, data)
+        self.assertEqual(self.seat(1).student, self.amit)
+        self.assertEqual(self.seat(2).student, self.sita)
+        self.sita.refresh_from_db()
+        self.assertEqual(self.sita.assigned_seat_id, self.seat(2).pk)
+
+    def test_admin_reassign_moves_the_occupant_out(self):
+        self.client.force_login(self.user)
+        seat = self.seat(1)
+        assign_seat_to_student(self.ravi, seat)
+        url = reverse("admin:bus_app_seat_change", args=[seat.pk])
+        self.client.post(url, {"seat_number": 1, "bus": self.bus.pk, "student": self.sita.pk, "initial-student": self.ravi.pk})
+        self.assertEqual(self.seat(1).student, self.sita)
+        self.ravi.refresh_from_db()
+        self.assertIsNone(self.ravi.assigned_seat_id)
+        self.assertFalse(Seat.objects.filter(student=self.ravi).exists())
+
+
+class OutboxDedupeTests(TestCase):
+    def test_same_key_is_queued_once_within_the_window(self):
+        first = queue_email("Hello", "Body", ["a@example.com"], dedupe_key="notice:1")
+        self.assertIsNotNone(first)
+        self.assertIsNone(queue_email("Hello", "Body", ["a@example.com"], dedupe_key="notice:1"))
+        self.assertEqual(OutboxMessage.objects.filter(dedupe_key="notice:1").count(), 1)
+
+    def test_database_rejects_a_second_live_key(self):
+        # Check-then-insert race me dono sender insert tak pahunch jaye to bhi DB ek ko rokta hai
+        OutboxMessage.objects.create(subject="A", body="", dedupe_key="notice:1")
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            OutboxMessage.objects.create(subject="B", body="", dedupe_key="notice:1")
+        OutboxMessage.objects.create(subject="C", body="")
+        OutboxMessage.objects.create(subject="D", body="")
+
+    def test_key_is_reusable_after_the_window(self):
+        old = queue_email("Hello", "Body", ["a@example.com"], dedupe_key="notice:1")
+        OutboxMessage.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(hours=1))
+        new = queue_email("Hello", "Body", ["a@example.com"], dedupe_key="notice:1")
+        self.assertIsNotNone(new)
+        old.refresh_from_db()
+        self.assertEqual(old.dedupe_key, "")
+
+
+class FailingEmailBackend(locmem.EmailBackend):
+    def send_messages(self, messages):
+        raise SMTPException("Connection refused")
+
+
+@override_settings(OUTBOX_BATCH_SIZE=50, OUTBOX_RETRY_BACKOFF=60, OUTBOX_MAX_ATTEMPTS=3)
+class OutboxWorkerTests(TestCase):
+    def deliver(self, **kwargs):
+        return deliver_due_batches(sleep=lambda seconds: None, **kwargs)
+
+    def test_recipients_are_sent_as_bcc_batches(self):
+        recipients = [f"student{i}@example.com" for i in range(120)]
+        queue_email("Notice", "Body", recipients)
+        self.assertEqual(self.deliver(), {"sent": 3, "retry": 0, "failed": 0})
+
+        self.assertEqual([len(email.bcc) for email in mail.outbox], [50, 50, 20])
+        self.assertEqual(sorted(sum((email.bcc for email in mail.outbox), [])), sorted(recipients))
+        # Students ek doosre ka address na dekhe: "to" me sirf sender
+        for email in mail.outbox:
+            self.assertEqual(email.to, [settings.DEFAULT_FROM_EMAIL])
+        self.assertFalse(OutboxBatch.objects.exclude(status="sent").exists())
+
+    def test_expired_lease_is_picked_up_again(self):
+        queue_email("Notice", "Body", ["a@example.com"])
+        queue_email("Notice", "Body", ["b@example.com"])
+        stuck, busy = OutboxBatch.objects.order_by("pk")
+        # Pehla worker beech me mar gaya (lease khatam), doosra abhi bhej raha hai (lease baaki)
+        OutboxBatch.objects.filter(pk=stuck.pk).update(status="sending", next_attempt_at=timezone.now() - timedelta(minutes=1))
+        OutboxBatch.objects.filter(pk=busy.pk).update(status="sending", next_attempt_at=timezone.now() + timedelta(minutes=5))
+
+        self.assertEqual(self.deliver(), {"sent": 1, "retry": 0, "failed": 0})
+        self.assertEqual(mail.outbox[0].bcc, ["a@example.com"])
+        busy.refresh_from_db()
+        self.assertEqual(busy.status, "sending")
+
+    def test_failed_send_is_retried_with_backoff(self):
+        queue_email("Notice", "Body", ["a@example.com"])
+        batch = OutboxBatch.objects.get()
+
+        for attempt, backoff in ((1, 60), (2, 120)):
+            before = timezone.now()
+            self.assertEqual(self.deliver(connection=FailingEmailBackend()), {"sent": 0, "retry": 1, "failed": 0})
+            batch.refresh_from_db()
+            self.assertEqual((batch.status, batch.attempts), ("pending", attempt))
+            self.assertIn("Connection refused", batch.last_error)
+            self.assertGreaterEqual(batch.next_attempt_at, before + timedelta(seconds=backoff))
+            self.assertLess(batch.next_attempt_at, before + timedelta(seconds=backoff + 30))
+            # Backoff khatam hone se pehle dobara nahi uthta
+            self.assertEqual(self.deliver(connection=FailingEmailBackend()), {"sent": 0, "retry": 0, "failed": 0})
+            OutboxBatch.objects.filter(pk=batch.pk).update(next_attempt_at=timezone.now())
+
+        self.assertEqual(self.deliver(connection=FailingEmailBackend()), {"sent": 0, "retry": 0, "failed": 1})
+        batch.refresh_from_db()
+        self.assertEqual((batch.status, batch.attempts), ("failed", 3))
+        self.assertEqual(mail.outbox, [])
+
+    def test_seat_email_template_reloads_in_debug(self):
+        with override_settings(DEBUG=False):
+            self.assertIs(compiled_template("emails/seat_allotment.html"), compiled_template("emails/seat_allotment.html"))
+        with override_settings(DEBUG=True), mock.patch("bus_app.outbox.get_template") as get_template:
+            compiled_template("emails/seat_allotment.html")
+            compiled_template("emails/seat_allotment.html")
+        self.assertEqual(get_template.call_count, 2)
+
+
+class StudentImportTests(TestCase):
+    HEADER = "Student Name,Roll No,Gender,School,Course,Fee Paid,Email ID,Mobile,Route,Stop\n"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.school = School.objects.create(name="School of Engineering")
+        cls.program = Program.objects.create(school=cls.school, name="B.Tech")
+        cls.route = Route.objects.create(name="City Centre", fare=10000)
+        cls.stoppage = Stoppage.objects.create(route=cls.route, name="Phool Bagh")
+
+    def import_csv(self, text, **kwargs):
+        return import_students(read_rows(BytesIO(text.encode()), "students.csv"), **kwargs)
+
+    def test_valid_csv_is_imported(self):
+        result = self.import_csv(
+            self.HEADER
+            + "Ananya Verma,R-101,F,school of engineering,b.tech,yes,ananya@example.com,9876543210,City Centre,Phool Bagh\n"
+            + "Rahul Jain,R-102,,,,,rahul@example.com,,,\n"
+        )
+        self.assertEqual((result.rows, result.created, result.errors), (2, 2, []))
+        ananya = Student.objects.get(roll_number="R-101")
+        self.assertEqual(
+            (ananya.gender, ananya.school, ananya.program, ananya.fee_paid, ananya.route, ananya.stoppage),
+            ("Female", self.school, self.program, True, self.route, self.stoppage),
+        )
+        rahul = Student.objects.get(roll_number="R-102")
+        self.assertEqual((rahul.gender, rahul.contact_number, rahul.school), ("Male", "0000000000", None))
+
+    def test_invalid_rows_are_reported_and_the_rest_imported(self):
+        result = self.import_csv(
+            self.HEADER
+            + ",R-201,M,,,,noname@example.com,,,\n"
+            + "Bad Email,R-202,M,,,,not-an-email,,,\n"
+            + "Wrong School,R-203,M,School of Magic,,,magic@example.com,,,\n"
+            + "Wrong Stop,R-204,M,,,,stop@example.com,,City Centre,Lashkar\n"
+            + "Good Row,R-205,M,,,,good@example.com,,,\n"
+            + "Same Roll,R-205,M,,,,other@example.com,,,\n"
+        )
+        self.assertEqual((result.rows, result.created), (6, 1))
+        self.assertEqual([(row, student) for row, student, _ in result.errors], [
+            (2, "R-201"), (3, "R-202"), (4, "R-203"), (5, "R-204"), (7, "R-205"),
+        ])
+        self.assertIn("Unknown school", result.errors[2][2])
+        self.assertIn("already exists", result.errors[4][2])
+        self.assertEqual(list(Student.objects.values_list("roll_number", flat=True)), ["R-205"])
+
+        report = StringIO()
+        result.write_error_report(report)
+        self.assertEqual(report.getvalue().splitlines()[0], "Row,Student,Error")
+
+    def test_reimporting_the_same_file_creates_nothing(self):
+        text = self.HEADER + "".join(f"Student {i},R-{i},M,,,,s{i}@example.com,,,\n" for i in range(5))
+        self.assertEqual(self.import_csv(text, batch_size=2).created, 5)
+
+        result = self.import_csv(text, batch_size=2)
+        self.assertEqual((result.rows, result.created, len(result.errors)), (5, 0, 5))
+        self.assertEqual(Student.objects.count(), 5)
+
+    def test_bulk_import_refreshes_search_and_reports(self):
+        # bulk_create signals nahi bhejta, import khud index aur snapshot update karta hai
+        rebuild_reports()
+        self.import_csv(self.HEADER + "Ananya Verma,R-101,F,School of Engineering,B.Tech,,ananya@example.com,,,\n")
+        student = Student.objects.get(roll_number="R-101")
+
+        self.assertEqual(list(Student.objects.filter(pk__in=matching_ids("student", "ananya"))), [student])
+        stats = ReportStat.objects.values_list("value", flat=True)
+        self.assertEqual(stats.get(metric="totals", key="students"), 1)
+        self.assertEqual(stats.get(metric="students_per_school", key=str(self.school.pk)), 1)
+        self.assertEqual(stats.get(metric="gender", key="Female"), 1)
+
+
+class SeatAllocationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.route = Route.objects.create(name="City Centre", fare=10000)
+        cls.stoppage = Stoppage.objects.create(route=cls.route, name="Phool Bagh")
+        cls.bus = Bus.objects.create(number="MP07-1", identifier_number="B-01")
+        provision_seats([cls.bus], 6)
+        driver = Driver.objects.create(name="Mohan Lal", address="Gwalior", D_license_number="DL-001",
+                                       contact_number="9876543210", reference_by="Office")
+        Allotment.objects.create(bus=cls.bus, driver=driver, route=cls.route)
+
+    def add_students(self, genders):
+        start = Student.objects.count()
+        return [
+            Student.objects.create(
+                name=f"Student {i}", roll_number=f"R-{i}", email=f"s{i}@example.com", gender=gender,
+                route=self.route, stoppage=self.stoppage,
+            )
+            for i, gender in enumerate(genders, start=start)
+        ]
+
+    def seated_genders(self):
+        return list(Seat.objects.filter(bus=self.bus).order_by("seat_number").values_list("student__gender", flat=True))
+
+    def test_genders_get_contiguous_sections(self):
+        self.add_students(["Male", "Female", "Male", "Other", "Female", "Male"])
+        plan = allocate_seats(group_gender=True, send_emails=False)
+        self.assertEqual(plan.summary()["placed"], 6)
+        self.assertEqual(self.seated_genders(), ["Female", "Female", "Male", "Male", "Male", "Other"])
+
+    def test_students_beyond_capacity_are_left_unplaced(self):
+        students = self.add_students(["Male"] * 8)
+        plan = allocate_seats(send_emails=False)
+        self.assertEqual((plan.summary()["placed"], plan.summary()["utilization_after"]), (6, 100.0))
+        self.assertEqual([student for student, _ in plan.unplaced], students[6:])
+        self.assertEqual({reason for _, reason in plan.unplaced}, {"All buses serving this stoppage are full."})
+        self.assertEqual(Student.objects.filter(assigned_seat__isnull=True).count(), 2)
+
+    def test_already_seated_students_keep_their_seat(self):
+        seated, *others = self.add_students(["Male", "Female", "Female"])
+        seat = Seat.objects.get(bus=self.bus, seat_number=4)
+        assign_seat_to_student(seated, seat)
+
+        plan = allocate_seats(send_emails=False)
+        self.assertNotIn(seated, plan.students)
+        self.assertEqual([student for student, _ in plan.placements()], others)
+        self.assertEqual(Seat.objects.get(pk=seat.pk).student_id, seated.pk)
+        self.assertEqual(plan.summary()["occupied_before"], 1)
+
+    def test_emails_are_queued_only_when_asked(self):
+        self.add_students(["Male", "Female"])
+        allocate_seats(send_emails=False)
+        self.assertFalse(OutboxMessage.objects.exists())
+
+        Seat.objects.update(student=None)
+        Student.objects.update(assigned_bus=None, assigned_seat=None)
+        allocate_seats()
+        self.assertEqual(OutboxMessage.objects.filter(dedupe_key__startswith="seat-allotment:").count(), 2)
+
+
+class CsvExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_superuser("admin", "admin@example.com", "password")
+        school = School.objects.create(name="School of Engineering")
+        Student.objects.bulk_create([
+            Student(name=f"Student {i}", roll_number=f"R-{i}", email=f"s{i}@example.com", school=school) for i in range(25)
+        ])
+
+    def test_export_streams_the_header_and_every_selected_row(self):
+        self.client.force_login(self.user)
+        selected = list(Student.objects.order_by("pk").values_list("pk", flat=True)[:20])
+        response = self.client.post(reverse("admin:bus_app_student_changelist"), {
+            "action": "export_to_csv", "_selected_action": selected,
+        })
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Disposition"], "attachment; filename=student_backup.csv")
+
+        rows = list(csv.reader(b"".join(response.streaming_content).decode().splitlines()))
+        header, rows = rows[0], rows[1:]
+        self.assertEqual(header, [field.name for field in Student._meta.fields])
+        self.assertEqual(len(rows), 20)
+        self.assertEqual(rows[0][header.index("roll_number")], "R-0")
+        # FK ka label, pk nahi
+        self.assertEqual({row[header.index("school")] for row in rows}, {"School of Engineering"})
+
+
+@override_settings(QR_SITE_URL="https://buses.example.com/", PHOTO_WORKERS=0)
+class QrSheetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_superuser("admin", "admin@example.com", "password")
+        Bus.objects.bulk_create([Bus(number=f"MP07-{i}", identifier_number=f"B-{i:02d}") for i in range(10)])
+        Bus.objects.create(number="MP07-X")  # Identifier nahi, feedback form ise select nahi kar sakta
+
+    def setUp(self):
+        cache.clear()
+
+    def pages(self, pdf):
+        parser = PdfParser.PdfParser(buf=pdf)
+        return [parser.read_indirect(page)[b"MediaBox"] for page in parser.pages]
+
+    def test_each_code_encodes_the_bus_feedback_link(self):
+        cards = bus_cards(None)
+        self.assertEqual([card["identifier"] for card in cards], [f"B-{i:02d}" for i in range(10)])
+        self.assertEqual(cards[0]["url"], "https://buses.example.com/feedback/?bus=B-00")
+
+        out = BytesIO()
+        qr_codes_zip(cards, out)
+        with zipfile.ZipFile(out) as archive:
+            self.assertEqual(archive.read("B-03.png"), render_qr(cards[3]["url"], QROptions(format="png")))
+
+    def test_pdf_has_one_a4_page_per_group_of_cards(self):
+        out = tempfile.TemporaryFile()
+        self.addCleanup(out.close)
+        # Chunk boundary ke aar-paar bhi saare pages ek hi PDF me
+        with mock.patch("bus_app.qr_sheets.PDF_CHUNK", 2):
+            qr_sheet_pdf(bus_cards(None), out, per_page=4)
+        out.seek(0)
+        self.assertEqual(self.pages(out.read()), [[0, 0, 595.44, 842.04]] * 3)
+
+    def test_admin_action_renders_the_selected_buses(self):
+        self.client.force_login(self.user)
+        selected = list(Bus.objects.order_by("pk").values_list("pk", flat=True)[:5])
+        response = self.client.post(reverse("admin:bus_app_bus_changelist"), {
+            "action": "feedback_qr_sheet", "_selected_action": selected,
+        })
+        self.assertEqual(response["Content-Type"], "application/pdf")
+        self.assertEqual(len(self.pages(b"".join(response.streaming_content))), 2)
+
+
+class GenerateCampusTests(TestCase):
+    def test_seats_and_students_point_at_each_other(self):
+        Student.objects.create(name="Ravi Sharma", roll_number="R-001", email="ravi@example.com")  # Ids 1 se shuru na ho
+        call_command("generate_campus", students=130, schools=2, programs=2, routes=2, stoppages=3, buses=2,
+                     seated=0.9, notices=0, feedback=0, batch_size=40, stdout=StringIO())
+
+        seated = Student.objects.filter(assigned_seat__isnull=False)
+        self.assertEqual(seated.count(), 100)  # 117 ko seat chahiye par 2 buses x 50 seats hi hain
+        self.assertEqual(seated.filter(assigned_seat__student=F("pk"), assigned_seat__bus=F("assigned_bus")).count(), 100)
+        self.assertEqual(Seat.objects.filter(student__isnull=False).count(), 100)
+        self.assertEqual(sorted(Bus.objects.values_list("seats_occupied", flat=True)), [50, 50])
+        self.assertEqual(ReportStat.objects.get(metric="totals", key="students").value, 131)
@@ -33,6 +33,7 @@ urlpatterns = [
     path('api/get-programs/', get_programs, name='get_programs'),
     path('api/get-routes/', get_routes, name='get_routes'),
     path('api/get-stoppages/', get_stoppages, name='get_stoppages'),
+    path('api/catalog/', views.get_catalog, name='catalog'),
     path('api/register-student/', register_student, name='register_student'),
     path('success-page/', lambda request: render(request, 'success.html'), name='success_page'),
 
@@ -45,6 +46,7 @@ urlpatterns = [
 
     path('allotments/add/', views.add_allotment, name='add_allotment'), #add allotment
     path('ajax/get-stoppages/', views.get_stoppages_by_route, name='get_stoppages_by_route'), #ajax url for route-stopage filtering
+    path('ajax/filter-suggestions/<str:param>/', views.filter_suggestions, name='filter_suggestions'),  # list page dropdowns (select2)
     path('drivers/', views.driver_list, name='driver_list'), #driver_list
     path('drivers/<str:license_number>/', views.driver_detail, name='driver_detail'), #driver_details
 
@@ -67,6 +69,9 @@ urlpatterns = [
     path('thank-you/', views.thank_you_page, name='thank_you'),
     path('routes/edit/<int:route_id>/', views.edit_route, name='edit_route'),
     path('reports/', views.reports_view, name='reports'),
+    path('api/reports/', views.reports_api, name='reports_api'),
+    path('api/outbox-stats/', views.outbox_stats_view, name='outbox_stats'),
+    path('request-metrics/', views.request_metrics_view, name='request_metrics'),
 
 
 ]
@@ -1,9 +1,7 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponse
+from django.http import Http404, JsonResponse, HttpResponse
 from django.conf import settings
-from django.core.mail import EmailMessage
-import os, qrcode
 from django.views.decorators.csrf import csrf_exempt # type: ignore
 from .models import Bus, Seat, Student, Driver, Route, School, Program, Stoppage, Allotment, Notice, Feedback
 from .forms import StudentForm, DriverForm, MultipleSeatsForm
@@ -15,6 +13,20 @@ from .forms import NoticeForm
 from .forms import FeedbackForm
 from django.db.models import Q
 from django.db.models import Count
+from .seating import assign_seat_to_student
+from .seat_charts import seating_chart
+from .outbox import outbox_stats, queue_seat_allotment_email
+from .tables import table_page, wants_json
+from .catalog import build_catalog, catalog_response, catalog_url, catalog_version
+from .reports import report_etag, report_snapshot
+from .metrics import metrics_summary, reset_metrics
+from .qr import QROptions, qr_response, qr_setting
+from .photos import CappedUploadHandler, PhotoRejected, check_upload, queue_photo_upload, upload_too_large_message
+from django.contrib import admin
+from django.contrib.admin.views.decorators import staff_member_required
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
 
 # bus_app/views.py
 from django.shortcuts import render, redirect
@@ -52,45 +64,18 @@ def home(request):
 
 # ✅ Bus Seating Chart
 def bus_seating_chart(request, bus_number):
-    bus = get_object_or_404(Bus, number=bus_number)
-    seats = Seat.objects.filter(bus=bus).order_by('seat_number')
-
-    # ✅ Seat Layout (Left: 2, Gap: 1, Right: 3)
-    total_columns = 6  # 2 Left + 1 Gap + 3 Right
-    seating_chart = []
-    row = []
-    seat_index = 0
-
-    for seat in seats:
-        if seat_index % total_columns == 2:  # Middle me gap add karo
-            row.append({'is_gap': True})
-
-        row.append(seat)
-        seat_index += 1
-
-        if len(row) == total_columns:  # Row complete ho gyi
-            seating_chart.append(row)
-            row = []
-            seat_index = 0  # Next row ke liye seat count reset
-
-    if row:  # Last row incomplete ho to bhi add kar do
-        seating_chart.append(row)
-
-    return render(request, 'bus_seating_chart.html', {'bus': bus, 'seating_chart': seating_chart})
+    bus = get_object_or_404(Bus.objects.only('id', 'number', 'seats_version'), number=bus_number)
+    # ✅ Grid (bus ki seats_left, gap, seats_right) seat_charts.py ke per-bus cache se
+    return render(request, 'bus_seating_chart.html', {'bus': bus, 'seating_chart': seating_chart(bus)})
 
 
 def generate_qr(request):
-    # ✅ Hardcoded full URL
-    form_url = "https://kanhaiyasoni.pythonanywhere.com/about/"
-
-    qr = qrcode.make(form_url)
-
-    qr_path = os.path.join(settings.MEDIA_ROOT, "qr_code.png")
-    os.makedirs(os.path.dirname(qr_path), exist_ok=True)
-    qr.save(qr_path)
-
-    with open(qr_path, "rb") as image_file:
-        return HttpResponse(image_file.read(), content_type="image/png")
+    # ✅ Target URL aur encoding settings.QR_* se; image ek baar banke cache me
+    try:
+        options = QROptions.from_query(request.GET)
+    except ValueError as e:
+        return HttpResponse(str(e), status=400, content_type="text/plain")
+    return qr_response(request, qr_setting("TARGET_URL"), options)
 
 
 # ✅ Allot Bus to Student
@@ -108,9 +93,9 @@ def allot_bus(request, student_id):
         bus_details.append({
             'bus': bus,
             'route': route.name if route else "No Route",  # ✅ Fix: Route naam show hoga
-            'total_seats': bus.total_seats(),
+            'total_seats': bus.seats_total,  # ✅ Stored counters, no COUNT query per bus
             'vacant_seats': bus.vacant_seats(),
-            'occupied_seats': bus.occupied_seats()
+            'occupied_seats': bus.seats_occupied
         })
 
     return render(request, 'allot_bus.html', {'student': student, 'bus_details': bus_details})
@@ -124,54 +109,52 @@ def assign_seat(request, student_id, bus_id, seat_number):
 
 
     if request.method == 'POST':
-        seat.student = student
-        seat.save()
-
-        student.assigned_bus = bus
-        student.assigned_seat = seat
-        student.save()
+        if not assign_seat_to_student(student, seat):
+            messages.error(request, f"Seat {seat.seat_number} was just taken by another student. Please pick another seat.")
+            return redirect('select_seat', student_id=student.id, bus_id=bus.id)
 
-        send_seat_allotment_email(student)
+        send_seat_allotment_email(student, seat)
 
         return redirect('/buses/')
 
     return render(request, 'assign_seat.html', {'student': student, 'bus': bus, 'seat': seat})
 
 
-# ✅ Send Seat Allotment Email
-def send_seat_allotment_email(student):
-    subject = f"Bus Seat Allotment Confirmation for {student.name}"
+# ✅ Send Seat Allotment Email (queued in the outbox, send_outbox worker delivers it)
+def send_seat_allotment_email(student, seat=None):
+    seat = seat or student.assigned_seat
+    if not seat or not student.email:
+        return None
+    return queue_seat_allotment_email(student, seat)
 
-    route = student.assigned_bus.get_route()
-    message = f"""
-   <p>Dear <strong>{student.name}</strong>,</p>
 
-<p>We are pleased to inform you that your **seat has been successfully assigned** in the college transport system.</p>
+# ✅ Outbox queue depth / latency (for monitoring)
+def outbox_stats_view(request):
+    return JsonResponse(outbox_stats())
 
-<p><strong>🚌 Bus Details:</strong></p>
-<ul>
-    <li><strong>🚌Bus Number:</strong> {student.assigned_bus.identifier_number}</li>
-    <li><strong>📍 Route:</strong> {route.name if route else "Not Assigned"}</li>
-    <li><strong>💺 Assigned Seat:</strong> {student.assigned_seat.seat_number}</li>
-    <li><strong>🚍vehicle Number:</strong> {student.assigned_bus.number}</li>
-</ul>
 
-<p>For any queries regarding your bus assignment, please contact the **Transport Management Office**.</p>
-
-<p>We wish you a comfortable and safe journey!</p>
-
-<p>Best Regards,</p>
-<p><strong>🚍 Transport Management Team</strong><br>
-<strong>[I.T.M UNIVERSITY]</strong></p>
-"""
-
-    recipient_email = student.email
-    try:
-        email = EmailMessage(subject, message, settings.DEFAULT_FROM_EMAIL, [recipient_email])
-        email.content_subtype = "html"
-        email.send()
-    except Exception as e:
-        print(f"Error sending email: {e}")
+# ✅ Request metrics per view (admin page, recorded by RequestMetricsMiddleware)
+@staff_member_required
+def request_metrics_view(request):
+    if request.method == 'POST':
+        reset_metrics()
+        return redirect('request_metrics')
+
+    budgets = getattr(settings, 'QUERY_BUDGETS', {})
+    rows = metrics_summary()
+    for row in rows:
+        row['budget'] = budgets.get(row['name'])
+        row['over_budget'] = row['budget'] is not None and row['max_queries'] > row['budget']
+    enabled = getattr(settings, 'REQUEST_METRICS', False)
+    if wants_json(request):
+        return JsonResponse({'enabled': enabled, 'views': rows})
+
+    return render(request, 'admin/request_metrics.html', {
+        **admin.site.each_context(request),
+        'title': 'Request metrics',
+        'enabled': enabled,
+        'rows': rows,
+    })
 
 
 # ✅ Select Seat for Student
@@ -184,15 +167,12 @@ def select_seat(request, student_id, bus_id):
 
     if request.method == "POST":
         seat_id = request.POST.get("seat_id")
-        seat = get_object_or_404(Seat, id=seat_id)
-
-        # Assign seat to student
-        seat.student = student
-        seat.save()
+        seat = get_object_or_404(Seat, id=seat_id, bus=bus)
 
-        student.assigned_seat = seat
-        student.assigned_bus = bus
-        student.save()
+        # Assign seat to student (sirf tabhi jab seat abhi bhi khali ho)
+        if not assign_seat_to_student(student, seat):
+            messages.error(request, f"Seat {seat.seat_number} was just taken by another student. Please pick another seat.")
+            return redirect('select_seat', student_id=student.id, bus_id=bus.id)
 
         return redirect('admin:bus_app_student_changelist')
 
@@ -208,43 +188,54 @@ def get_seat_details(request, seat_id):
     seat = get_object_or_404(Seat, id=seat_id)
     return render(request, 'seat_details_modal.html', {'seat': seat})
 
+# ✅ Filter dropdowns of the list pages: select2 fetches a few matching values as
+# the user types, instead of the page carrying every distinct value as an <option>
+FILTER_SUGGESTIONS = {  # param -> (model, option value, option label)
+    'driver_name': (Driver, 'name', 'name'),
+    'license_number': (Driver, 'D_license_number', 'D_license_number'),
+    'contact_number': (Driver, 'contact_number', 'contact_number'),
+    'driver': (Driver, 'pk', 'name'),
+    'bus_no': (Bus, 'number', 'number'),
+    'bus_id': (Bus, 'identifier_number', 'identifier_number'),
+    'student_name': (Student, 'name', 'name'),
+    'roll_number': (Student, 'roll_number', 'roll_number'),
+}
+SUGGESTION_LIMIT = 20
+
+
+def filter_suggestions(request, param):
+    if param not in FILTER_SUGGESTIONS:
+        raise Http404("Unknown filter.")
+    model, value_field, label_field = FILTER_SUGGESTIONS[param]
+    values = model.objects.exclude(**{f'{label_field}__isnull': True}).exclude(**{label_field: ''})
+    term = request.GET.get('q', '').strip()
+    if term:
+        values = values.filter(**{f'{label_field}__istartswith': term})
+    # Label field indexed hai: index order me chalke pehle SUGGESTION_LIMIT pe ruk jaata hai.
+    # Value aur label ek hi column ho to ek hi baar select karo, warna "DISTINCT name, name" temp B-tree banata hai
+    fields = (label_field,) if value_field == label_field else (value_field, label_field)
+    values = values.order_by(label_field).values_list(*fields).distinct()[:SUGGESTION_LIMIT]
+    return JsonResponse({'results': [{'id': row[0], 'text': row[-1]} for row in values]})
+
+
 def driver_list(request):
-    # Fetch all drivers
-    drivers = Driver.objects.all()
-
-    # Fetch distinct driver names, license numbers, and contact numbers
-    driver_names = Driver.objects.values_list('name', flat=True).distinct()
-    license_numbers = Driver.objects.values_list('D_license_number', flat=True).distinct()
-    contact_numbers = Driver.objects.values_list('contact_number', flat=True).distinct()
-
-    # Get the search query and filter parameters from the GET request
-    search_query = request.GET.get('search', '')
-    name_filter = request.GET.get('driver_name')
-    license_filter = request.GET.get('license_number')
-    contact_filter = request.GET.get('contact_number')
-
-    # Apply universal search filter if search query exists
-    if search_query:
-        drivers = drivers.filter(
-            Q(name__icontains=search_query) |
-            Q(D_license_number__icontains=search_query) |
-            Q(contact_number__icontains=search_query)
-        )
-
-    # Apply dropdown filters
-    if name_filter:
-        drivers = drivers.filter(name=name_filter)
-    if license_filter:
-        drivers = drivers.filter(D_license_number=license_filter)
-    if contact_filter:
-        drivers = drivers.filter(contact_number=contact_filter)
+    # ✅ Search, dropdown filters, sorting and pagination via the shared table layer
+    drivers = table_page(
+        request, Driver.objects.all(),
+        sort_fields={'name': 'name', 'license': 'D_license_number', 'contact': 'contact_number'},
+        default_sort='name',
+        filters={'driver_name': 'name', 'license_number': 'D_license_number', 'contact_number': 'contact_number'},
+        search_fields=('name', 'D_license_number', 'contact_number'),
+        search_kind='driver',
+        json_fields=('name', 'D_license_number', 'contact_number'),
+    )
+    if wants_json(request):
+        return drivers.json_response()
 
     # Prepare context for the template
     context = {
         'drivers': drivers,
-        'driver_names': driver_names,
-        'license_numbers': license_numbers,
-        'contact_numbers': contact_numbers,
+        'table': drivers,
     }
 
     return render(request, 'driver_list.html', context)
@@ -286,7 +277,7 @@ def get_stoppages(request):
 
 def student_form(request):
     form = StudentForm()  # or PublicStudentForm()
-    return render(request, "student_form.html", {"form": form})
+    return render(request, "student_form.html", {"form": form, "catalog_url": catalog_url()})
 
 
 
@@ -299,34 +290,49 @@ def submit_student(request):
             return redirect("success")  # Redirect to success page
     else:
         form = StudentForm()
-    return render(request, "student_form.html", {"form": form})
+    return render(request, "student_form.html", {"form": form, "catalog_url": catalog_url()})
 
 # ✅ Success Page
 def success_page(request):
     return render(request, "success.html")
 
-# ✅ AJAX for Programs
+# ✅ AJAX for Programs (served from the versioned catalog cache)
 def get_schools(request):
-    schools = School.objects.values_list('name', flat=True)
-    return JsonResponse({'schools': list(schools)})
+    return catalog_response(request, "schools", lambda: {
+        'schools': list(School.objects.values_list('name', flat=True))
+    })
 
 def get_programs(request):
     school_name = request.GET.get('school', '')
-    programs = Program.objects.filter(school__name__iexact=school_name).values_list('name', flat=True)
-    return JsonResponse({'programs': list(programs)})
+    return catalog_response(request, f"programs:{school_name.lower()}", lambda: {
+        'programs': list(Program.objects.filter(school__name__iexact=school_name).values_list('name', flat=True))
+    })
 
 def get_routes(request):
-    routes = Route.objects.values_list('name', flat=True)
-    return JsonResponse({'routes': list(routes)})
+    return catalog_response(request, "routes", lambda: {
+        'routes': list(Route.objects.values_list('name', flat=True))
+    })
 
 def get_stoppages(request):
     route_name = request.GET.get('route', '')
-    stoppages = Stoppage.objects.filter(route__name__iexact=route_name).values_list('name', flat=True)
-    return JsonResponse({'stoppages': list(stoppages)})
+    return catalog_response(request, f"stoppages:{route_name.lower()}", lambda: {
+        'stoppages': list(Stoppage.objects.filter(route__name__iexact=route_name).values_list('name', flat=True))
+    })
+
+# ✅ Full School->Programs and Route->Stoppages tree for the registration form in one request
+@gzip_page
+def get_catalog(request):
+    # Sahi version wala URL kabhi change nahi hota, browser use saal bhar cache kar sakta hai
+    version = catalog_version()
+    max_age = 365 * 24 * 60 * 60 if request.GET.get('v') == version else None
+    return catalog_response(request, "bootstrap", lambda: build_catalog(version), max_age=max_age, version=version)
 
 @csrf_exempt
 def register_student(request):
     if request.method == "POST":
+        # Photo memory me nahi, seedha temp file pe spool ho (POST padhne se pehle set karna zaroori)
+        upload_handler = CappedUploadHandler(request)
+        request.upload_handlers = [upload_handler]
         try:
             name = request.POST.get("name").strip()
             roll_number = request.POST.get("roll_number", "").strip()
@@ -354,6 +360,15 @@ def register_student(request):
             if crm_id and Student.objects.filter(crm_id=crm_id).exists():
                 return JsonResponse({"success": False, "error": "CRM ID already exists!"}, status=400)
 
+            # 🖼️ Sirf header check, resize/re-encode background worker karega
+            if upload_handler.too_large:
+                return JsonResponse({"success": False, "error": upload_too_large_message()}, status=400)
+            if photo:
+                try:
+                    check_upload(photo)
+                except PhotoRejected as e:
+                    return JsonResponse({"success": False, "error": str(e)}, status=400)
+
             # 🏫 Fetch Related Objects
             school = School.objects.filter(name__iexact=school_name).first()
             program = Program.objects.filter(name__iexact=program_name, school=school).first()
@@ -374,8 +389,9 @@ def register_student(request):
                 route=route,
                 stoppage=stoppage,
                 gender=gender,
-                photo=photo
             )
+            if photo:
+                queue_photo_upload(student.pk, photo)
 
             return JsonResponse({"success": True, "message": "Student Registered Successfully!"})
 
@@ -389,49 +405,33 @@ def register_student(request):
 # bus list view
 
 def bus_list(request):
-    buses = Bus.objects.all()
-
-    # Get unique options for dropdowns
-    bus_numbers = Bus.objects.values_list('number', flat=True).distinct()
-    identifiers = Bus.objects.values_list('identifier_number', flat=True).distinct()
+    # Route dropdown chhota reference table hai; bus no./ID filter_suggestions se
     routes = Route.objects.values_list('name', flat=True).distinct()
 
-    # Get filters from request
-    number_filter = request.GET.get('bus_no')
-    identifier_filter = request.GET.get('bus_id')
-    route_filter = request.GET.get('route')
-    search_query = request.GET.get('search')
-
-    if number_filter:
-        buses = buses.filter(number=number_filter)
-    if identifier_filter:
-        buses = buses.filter(identifier_number=identifier_filter)
-    if route_filter:
-        buses = buses.filter(allotments__route__name=route_filter)
-
-    if search_query:
-        buses = buses.filter(
-            Q(number__icontains=search_query) |
-            Q(identifier_number__icontains=search_query) |
-            Q(allotments__route__name__icontains=search_query)
-        ).distinct()
+    buses = table_page(
+        request, Bus.objects.select_related('current_route'),
+        sort_fields={'number': 'number', 'identifier': 'identifier_number', 'route': 'current_route__name'},
+        default_sort='number',
+        filters={'bus_no': 'number', 'bus_id': 'identifier_number', 'route': 'current_route__name'},
+        search_fields=('number', 'identifier_number', 'current_route__name'),
+        search_kind='bus',
+        json_fields=('number', 'identifier_number', 'current_route__name'),
+    )
+    if wants_json(request):
+        return buses.json_response()
 
     # Prepare bus data with route name
     bus_data = []
     for bus in buses:
-        allotment = bus.allotments.select_related('route').first()
-        route_name = allotment.route.name if allotment and allotment.route else "N/A"
-
         bus_data.append({
             'number': bus.number,
             'identifier_number': bus.identifier_number,
-            'route': route_name,
+            'route': bus.current_route.name if bus.current_route else "N/A",
         })
 
     context = {
         'buses': bus_data,
-        'bus_numbers': bus_numbers,
-        'identifiers': identifiers,
+        'table': buses,
         'routes': routes,
     }
     return render(request, 'bus_list.html', context)
@@ -475,31 +475,24 @@ def edit_bus(request, number):
 
 # allotment list
 def allotment_list(request):
-    allotments = Allotment.objects.select_related('bus', 'driver', 'route').all()
-
-    bus_no = request.GET.get('bus_no')
-    driver_id = request.GET.get('driver')
-    route_id = request.GET.get('route')
-    search_query = request.GET.get('search')
-
-    if bus_no:
-        allotments = allotments.filter(bus__number=bus_no)
-    if driver_id:
-        allotments = allotments.filter(driver__id=driver_id)
-    if route_id:
-        allotments = allotments.filter(route__id=route_id)
-
-    if search_query:
-        allotments = allotments.filter(
-            Q(bus__number__icontains=search_query) |
-            Q(driver__name__icontains=search_query) |
-            Q(route__name__icontains=search_query)
-        ).distinct()
+    allotments = table_page(
+        request, Allotment.objects.select_related('bus', 'driver', 'route'),
+        sort_fields={'bus': 'bus__number', 'driver': 'driver__name', 'route': 'route__name', 'date': 'assigned_date'},
+        default_sort='-date',
+        filters={'bus_no': 'bus__number', 'driver': 'driver__id', 'route': 'route__id'},
+        search_fields=('bus__number', 'driver__name', 'route__name'),
+        search_kind='allotment',
+        json_fields=('bus__number', 'driver__name', 'route__name', 'assigned_date'),
+    )
+    if wants_json(request):
+        return allotments.json_response()
 
     context = {
         'allotments': allotments,
-        'bus_numbers': Bus.objects.values_list('number', flat=True).distinct(),
-        'drivers': Driver.objects.all(),
+        'table': allotments,
+        # Bus/driver dropdown filter_suggestions se; sirf chuna hua driver label ke liye
+        'selected_driver': Driver.objects.filter(pk=request.GET['driver']).first()
+        if request.GET.get('driver', '').isdigit() else None,
         'routes': Route.objects.all(),
     }
     return render(request, 'allotment_list.html', context)
@@ -555,35 +548,25 @@ def delete_driver(request, license_number):
 #student list
 
 def student_list(request):
-    students = Student.objects.all()
-
-    student_names = Student.objects.values_list('name', flat=True).distinct()
-    roll_numbers = Student.objects.values_list('roll_number', flat=True).distinct()
+    # School dropdown chhota reference table hai; name/roll number filter_suggestions se
     school_names = School.objects.values_list('name', flat=True).distinct()
 
-    # Universal search bar functionality
-    search_query = request.GET.get('search')
-    if search_query:
-        students = students.filter(
-            Q(name__icontains=search_query) |
-            Q(roll_number__icontains=search_query) |
-            Q(crm_id__icontains=search_query) |
-            Q(school__name__icontains=search_query) |
-            Q(program__icontains=search_query)
-        )
-
-    # Existing filters
-    if request.GET.get('student_name'):
-        students = students.filter(name=request.GET.get('student_name'))
-    if request.GET.get('roll_number'):
-        students = students.filter(roll_number=request.GET.get('roll_number'))
-    if request.GET.get('school_name'):
-        students = students.filter(school__name=request.GET.get('school_name'))
+    # Universal search bar + existing filters, ek page at a time
+    students = table_page(
+        request, Student.objects.select_related('school', 'program'),
+        sort_fields={'name': 'name', 'roll': 'roll_number', 'school': 'school__name', 'program': 'program__name'},
+        default_sort='name',
+        filters={'student_name': 'name', 'roll_number': 'roll_number', 'school_name': 'school__name'},
+        search_fields=('name', 'roll_number', 'crm_id', 'school__name', 'program__name'),
+        search_kind='student',
+        json_fields=('name', 'roll_number', 'crm_id', 'school__name', 'program__name'),
+    )
+    if wants_json(request):
+        return students.json_response()
 
     return render(request, 'student_list.html', {
         'students': students,
-        'student_names': student_names,
-        'roll_numbers': roll_numbers,
+        'table': students,
         'school_names': school_names,
     })
 
@@ -603,19 +586,23 @@ def add_student(request):
 
 def student_detail(request, id):
     # Get the student object, or return a 404 error if not found
-    student = get_object_or_404(Student, pk=id)
+    student = get_object_or_404(Student.objects.select_related('program', 'stoppage'), pk=id)
 
     # Render the template and pass the student object
     return render(request, 'student_detail.html', {'student': student})
 
 #route_list
 def route_list(request):
-    search_query = request.GET.get('search', '')
-    if search_query:
-        routes = Route.objects.filter(name__icontains=search_query)
-    else:
-        routes = Route.objects.all()
-    return render(request, 'route_list.html', {'routes': routes})
+    routes = table_page(
+        request, Route.objects.prefetch_related('stoppages'),
+        sort_fields={'name': 'name', 'fare': 'fare'},
+        default_sort='name',
+        search_fields=('name',),
+        json_fields=('name', 'fare'),
+    )
+    if wants_json(request):
+        return routes.json_response()
+    return render(request, 'route_list.html', {'routes': routes, 'table': routes})
 
 #add route
 def add_route(request):
@@ -645,13 +632,17 @@ def edit_route(request, route_id):
 
 #stoppage_list
 def stoppage_list(request):
-    search_query = request.GET.get('search', '')
-    if search_query:
-        stoppages = Stoppage.objects.filter(name__icontains=search_query)
-    else:
-        stoppages = Stoppage.objects.all()
-
-    return render(request, 'stoppage_list.html', {'stoppages': stoppages})
+    stoppages = table_page(
+        request, Stoppage.objects.select_related('route'),
+        sort_fields={'name': 'name', 'route': 'route__name'},
+        default_sort='name',
+        search_fields=('name',),
+        json_fields=('name', 'route__name'),
+    )
+    if wants_json(request):
+        return stoppages.json_response()
+
+    return render(request, 'stoppage_list.html', {'stoppages': stoppages, 'table': stoppages})
 #add stoppage
 def add_stoppage(request):
     if request.method == 'POST':
@@ -693,20 +684,25 @@ def delete_stoppage(request, pk):
 
 #for notices
 def notice_list(request):
-    search_query = request.GET.get('search', '')
-    if search_query:
-        notices = Notice.objects.filter(message__icontains=search_query)
-    else:
-        notices = Notice.objects.all().order_by('-created_at')  # latest first
-
-    return render(request, 'notice_list.html', {'notices': notices})
+    notices = table_page(
+        request, Notice.objects.select_related('bus', 'route'),
+        sort_fields={'created': 'created_at', 'type': 'type'},
+        default_sort='-created',  # latest first
+        search_fields=('message',),
+        search_kind='notice',
+        json_fields=('type', 'bus__number', 'route__name', 'message', 'created_at'),
+    )
+    if wants_json(request):
+        return notices.json_response()
+
+    return render(request, 'notice_list.html', {'notices': notices, 'table': notices})
 
 def add_notice(request):
     if request.method == 'POST':
         form = NoticeForm(request.POST)
         if form.is_valid():
             notice = form.save()
-            notice.send_notice()  # Send emails after saving
+            notice.send_notice()  # Queue emails, send_outbox worker delivers them
             return redirect('notice_list')
     else:
         form = NoticeForm()
@@ -740,7 +736,11 @@ def feedback_view(request):
             form.save()
             return render(request, 'thankyou.html')  # optional: make a nice thank-you page
     else:
-        form = FeedbackForm()
+        # Bus ke QR code se aaye to ?bus=<identifier_number> se bus pehle se select
+        bus_id = None
+        if request.GET.get('bus'):
+            bus_id = Bus.objects.filter(identifier_number=request.GET['bus']).values_list('pk', flat=True).first()
+        form = FeedbackForm(initial={'bus': bus_id} if bus_id else None)
     return render(request, 'feedback.html', {'form': form})
 
 
@@ -749,56 +749,59 @@ def thank_you_page(request):
 
 
 def feedback_list(request):
-    feedbacks = Feedback.objects.all().order_by('-submitted_at')
-    return render(request, 'feedback_list.html', {'feedbacks': feedbacks})
+    feedbacks = table_page(
+        request, Feedback.objects.select_related('bus'),
+        sort_fields={'submitted': 'submitted_at'},
+        default_sort='-submitted',
+        search_fields=('message',),
+        json_fields=('bus__identifier_number', 'message', 'submitted_at'),
+    )
+    if wants_json(request):
+        return feedbacks.json_response()
+    return render(request, 'feedback_list.html', {'feedbacks': feedbacks, 'table': feedbacks})
+
+REPORT_ASSIGNMENTS = 50  # rows in the assignments table
+
 
 def reports_view(request):
-    # 🔢 Total stats
-    total_buses = Bus.objects.count()
-    total_routes = Route.objects.count()
-    total_students = Student.objects.count()
-    total_schools = School.objects.count()
-    total_drivers = Driver.objects.count()
+    # Saare counts reports.py ke precomputed snapshot se, ek query me
+    snapshot = report_snapshot()
+    totals = {row['key']: row['value'] for row in snapshot['totals']}
 
     # 👨‍👩‍👧‍👦 Gender Distribution
-    gender_counts = Student.objects.values('gender').annotate(count=Count('id'))
     gender_summary = {'Male': 0, 'Female': 0, 'Other': 0}
-    for item in gender_counts:
-        gender_summary[item['gender']] = item['count']
-
-    # 🚌 Buses per Route (via Allotments)
-    buses_per_route = Route.objects.annotate(bus_count=Count('allotment'))
+    for row in snapshot['gender']:
+        gender_summary[row['key']] = row['value']
 
-    # 👨‍🎓 Students per Bus
-    students_per_bus = Bus.objects.annotate(student_count=Count('students'))
+    # 🏫 / 🧑‍💻 Top Schools and Programs by student count
+    by_count = lambda rows: sorted(rows, key=lambda row: -row['value'])[:3]
 
-    # 👨‍🎓 Students per Route
-    students_per_route = Route.objects.annotate(student_count=Count('students'))
-
-    # 🏫 Top Schools by student count
-    top_schools = School.objects.annotate(student_count=Count('students')).order_by('-student_count')[:3]
-
-    # 🧑‍💻 Top Programs by student count
-    top_programs = Student.objects.values('program').annotate(count=Count('id')).order_by('-count')[:3]
-
-    # 🧑‍✈️ All driver-bus-route assignments
-    driver_assignments = Allotment.objects.select_related('driver', 'bus', 'route')
+    # 🧑‍✈️ Latest driver-bus-route assignments
+    driver_assignments = Allotment.objects.select_related('driver', 'bus', 'route').order_by('-assigned_date', '-id')
 
     context = {
-        'total_buses': total_buses,
-        'total_routes': total_routes,
-        'total_students': total_students,
-        'total_schools': total_schools,
-        'total_drivers': total_drivers,
+        'total_buses': totals.get('buses', 0),
+        'total_routes': totals.get('routes', 0),
+        'total_students': totals.get('students', 0),
+        'total_schools': totals.get('schools', 0),
+        'total_drivers': totals.get('drivers', 0),
         'gender_summary': gender_summary,
-        'buses_per_route': buses_per_route,
-        'students_per_bus': students_per_bus,
-        'students_per_route': students_per_route,
-        'top_schools': top_schools,
-        'top_programs': top_programs,
-        'driver_assignments': driver_assignments,
+        'buses_per_route': snapshot['buses_per_route'],
+        'students_per_bus': snapshot['students_per_bus'],
+        'students_per_route': snapshot['students_per_route'],
+        'top_schools': by_count(snapshot['students_per_school']),
+        'top_programs': by_count(snapshot['students_per_program']),
+        'top_stoppages': by_count(snapshot['students_per_stoppage']),
+        'driver_assignments': driver_assignments[:REPORT_ASSIGNMENTS],
     }
 
     return render(request, 'reports.html', context)
 
 
+# ✅ Reports snapshot as JSON for wall displays (poll with If-None-Match, unchanged -> 304)
+@cache_control(no_cache=True)
+@condition(etag_func=report_etag)
+def reports_api(request):
+    return JsonResponse(report_snapshot())
+
+
@@ -43,6 +43,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'bus_app.middleware.RequestMetricsMiddleware',  # first, so it times everything below it
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -77,10 +78,34 @@ WSGI_APPLICATION = 'college_bus_management.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# ✅ Production SQLite profile, opt-in with DB_PROFILE=production in the environment of the web server.
+# Development, tests and every other manage.py run keep Django's defaults, so the committed db.sqlite3
+# is never switched to WAL. Compare both with `python manage.py db_benchmark`.
+# WAL needs a local disk (not NFS or other network filesystems).
+DB_PROFILE = os.environ.get('DB_PROFILE', 'default')
+SQLITE_PRAGMAS = [
+    'PRAGMA journal_mode=WAL',  # readers don't block the writer, and the writer doesn't block readers
+    'PRAGMA synchronous=NORMAL',  # safe with WAL, fsync only at checkpoints
+    'PRAGMA mmap_size=268435456',  # 256 MB of the file read through mmap
+    'PRAGMA cache_size=-32000',  # 32 MB page cache per connection
+    'PRAGMA temp_store=MEMORY',
+]
+
+SQLITE_PRODUCTION = {
+    'CONN_MAX_AGE': 600,  # seconds, keep the connection across requests instead of reconnecting per request
+    'CONN_HEALTH_CHECKS': True,
+    'OPTIONS': {
+        'timeout': 20,  # seconds, SQLite busy_timeout: wait for the write lock instead of "database is locked"
+        'transaction_mode': 'IMMEDIATE',  # atomic() takes the write lock at BEGIN, so it never fails halfway on a lock upgrade
+        'init_command': ';'.join(SQLITE_PRAGMAS),
+    },
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        **(SQLITE_PRODUCTION if DB_PROFILE == 'production' else {}),
     }
 }
 
@@ -138,10 +163,65 @@ EMAIL_HOST_USER = 'universityitm698@gmail.com'  # Apna Gmail ID daalo
 EMAIL_HOST_PASSWORD = 'rhkz hzaz ebre zndz'  # Jo App Password Google ne diya wo yahan daalo
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
 
+# ✅ Email outbox (delivered by `python manage.py send_outbox`)
+OUTBOX_BATCH_SIZE = 50  # BCC recipients per email, keep under the provider limit
+OUTBOX_SEND_INTERVAL = 1.0  # seconds between two batches
+OUTBOX_MAX_ATTEMPTS = 5
+OUTBOX_RETRY_BACKOFF = 60  # seconds, doubled after every failed attempt
+OUTBOX_DEDUPE_WINDOW = 600  # seconds, same seat confirmation is queued only once
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 
+# ✅ Cache (catalog endpoints, seating charts, QR codes). Entries are keyed on versions stored in the
+# database, so a per-process LocMem never serves data another worker has changed; a shared backend
+# (Redis/Memcached) only saves rebuilding the same entry in every process.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'college-bus',
+        'OPTIONS': {'MAX_ENTRIES': 10000},  # default 300 would evict a fleet's QR codes and seating charts
+    }
+}
+CATALOG_MAX_AGE = 300  # seconds browsers may reuse catalog responses before revalidating (ETag)
+CATALOG_CACHE_TIMEOUT = 24 * 60 * 60
+CATALOG_VERSION_TIMEOUT = 10  # seconds other worker processes may serve the previous catalog after a change
+
+# ✅ Request metrics: X-Query-Count / Server-Timing headers and the /request-metrics/ admin page
+REQUEST_METRICS = False  # opt-in, adds a little overhead to every request
+# Max SQL queries per URL name; checked by the middleware, `manage.py check_query_budgets`
+# and metrics.QueryBudgetMixin in tests
+QUERY_BUDGETS = {
+    'bus_list': 8,
+    'allot_bus': 6,
+    'reports': 4,
+    'bus_seating_chart': 4,
+}
+
+# ✅ Student photos (bus_app/photos.py): thumbnails and upload normalization run in
+# PHOTO_WORKERS background processes (0 = inline)
+PHOTO_WORKERS = 2
+PHOTO_MAX_UPLOAD_SIZE = 10 * 1024 * 1024  # bytes, larger registration uploads are rejected
+PHOTO_MAX_DIMENSION = 1600  # longest side of the stored photo, in pixels
+PHOTO_MAX_BYTES = 400 * 1024  # stored photo is re-encoded until it is at most this big
+
+# ✅ QR codes (bus_app/qr.py), cached per target URL + parameters under a content hash
+QR_TARGET_URL = 'https://kanhaiyasoni.pythonanywhere.com/about/'
+QR_SITE_URL = 'https://kanhaiyasoni.pythonanywhere.com'  # per-bus feedback QR codes point here
+QR_FORMAT = 'png'  # png or svg, ?format= overrides per request
+QR_BOX_SIZE = 10  # pixels per module, ?size=
+QR_BORDER = 4  # quiet zone in modules, ?border=
+QR_ERROR_CORRECTION = 'M'  # L/M/Q/H, ?ec=
+QR_MAX_AGE = 30 * 24 * 60 * 60  # seconds browsers may keep a QR image (revalidated by ETag after that)
+
+# ✅ Seating chart grids (bus_app/seat_charts.py), cached per bus under Bus.seats_version, which every
+# seat or fee status change bumps; the Bus admin action "Refresh seating charts" warms in batches with a pause
+SEAT_CHART_CACHE_TIMEOUT = 24 * 60 * 60
+SEAT_CHART_WARM_BATCH_SIZE = 50  # buses per query
+SEAT_CHART_WARM_PAUSE = 0.1  # seconds between batches
+
+
 LOGIN_URL = '/login/'
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/login/'